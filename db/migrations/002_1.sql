@@ -0,0 +1,9 @@
+---------------------------
+-- CALLS history index 1 of 4
+---------------------------
+-- Listings are keyset-paginated on (created_at, id), newest first. Unfiltered
+-- pages are a single range scan on this index.
+-- CONCURRENTLY cannot run inside a transaction block, so each index is its own
+-- migration. Run it with autocommit, e.g. psql -f.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calls_created_at_id
+  ON calls(created_at, id);
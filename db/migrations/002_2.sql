@@ -0,0 +1,7 @@
+---------------------------
+-- CALLS history index 2 of 4
+---------------------------
+-- Listings filtered by status.
+-- Run with autocommit, like 002_1.sql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calls_status_created_at_id
+  ON calls(status, created_at, id);
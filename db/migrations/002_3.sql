@@ -0,0 +1,7 @@
+---------------------------
+-- CALLS history index 3 of 4
+---------------------------
+-- Listings filtered by phone number, From side.
+-- Run with autocommit, like 002_1.sql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calls_from_number_created_at_id
+  ON calls(from_number, created_at, id);
@@ -0,0 +1,7 @@
+---------------------------
+-- CALLS history index 4 of 4
+---------------------------
+-- Listings filtered by phone number, To side.
+-- Run with autocommit, like 002_1.sql.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_calls_to_number_created_at_id
+  ON calls(to_number, created_at, id);
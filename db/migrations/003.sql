@@ -0,0 +1,15 @@
+---------------------------
+-- CALL_TURNS Table
+---------------------------
+-- Transcript lines captured during a call, written in batches by TranscriptWriter.
+CREATE TABLE call_turns (
+  id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+  call_sid VARCHAR(255) NOT NULL,
+  sequence INTEGER NOT NULL,
+  role VARCHAR(50) NOT NULL,
+  text TEXT NOT NULL,
+  created_at TIMESTAMPTZ NOT NULL DEFAULT timezone('utc', now())
+);
+
+-- A transcript is read back as one range scan in spoken order.
+CREATE INDEX idx_call_turns_call_sid_created_at ON call_turns(call_sid, created_at, sequence);
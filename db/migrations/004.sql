@@ -0,0 +1,13 @@
+---------------------------
+-- WEBHOOK_RESPONSES Table
+---------------------------
+-- Responses to Twilio webhooks, keyed on "CallSid:event", shared by every worker
+-- when WEBHOOK_DEDUP_BACKEND=postgres. Retries are answered from here instead of
+-- being handled again. Expired rows are deleted in the background.
+CREATE TABLE webhook_responses (
+  key VARCHAR(255) PRIMARY KEY,
+  response TEXT NOT NULL,
+  expires_at TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX idx_webhook_responses_expires_at ON webhook_responses(expires_at);
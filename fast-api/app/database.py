@@ -1,18 +1,143 @@
+import asyncio
 import os
+from contextlib import asynccontextmanager
+from sqlalchemy import Connection, Engine, text
+from sqlalchemy.engine import make_url, URL
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
 from sqlmodel import create_engine, SQLModel, Session
-from typing import Generator
+from sqlmodel.ext.asyncio.session import AsyncSession
+from typing import Any, AsyncGenerator, List, Union
+
+from app.utils.env import env_bool, env_int
 
 DATABASE_URL = os.environ["DATABASE_URL"]
 
-engine = create_engine(DATABASE_URL)
-print(f"DATABASE_URL: {DATABASE_URL}")
-print(f"engine: {engine}")
+# Async mode runs every query on the event loop through asyncpg. Sync mode keeps the
+# psycopg2 engine, and the repository pushes its blocking calls onto a worker thread.
+DATABASE_ASYNC = env_bool("DATABASE_ASYNC", True)
+DATABASE_POOL_SIZE = env_int("DATABASE_POOL_SIZE", 10)
+DATABASE_MAX_OVERFLOW = env_int("DATABASE_MAX_OVERFLOW", 20)
+DATABASE_POOL_PRE_PING = env_bool("DATABASE_POOL_PRE_PING", True)
+DATABASE_POOL_RECYCLE = env_int("DATABASE_POOL_RECYCLE", 1800)
+# Connections opened when a worker starts, so the first calls after a deploy do not
+# wait for one. Capped at DATABASE_POOL_SIZE, the most the pool keeps open.
+DATABASE_POOL_WARMUP = env_int("DATABASE_POOL_WARMUP", 2)
+
+DBSession = Union[Session, AsyncSession]
+
+
+def _engine_options(url: URL) -> dict[str, Any]:
+    options: dict[str, Any] = {"pool_pre_ping": DATABASE_POOL_PRE_PING}
+    if url.get_backend_name() != "sqlite":
+        options["pool_size"] = DATABASE_POOL_SIZE
+        options["max_overflow"] = DATABASE_MAX_OVERFLOW
+        options["pool_recycle"] = DATABASE_POOL_RECYCLE
+    return options
+
+
+def _async_url(url: URL) -> tuple[URL, dict[str, Any]]:
+    """
+    Point a postgres URL at the asyncpg driver. asyncpg does not understand libpq's
+    `sslmode` query parameter, so it is moved into the connect args instead.
+    """
+    connect_args: dict[str, Any] = {}
+    if url.get_backend_name() != "postgresql":
+        return url, connect_args
+
+    sslmode = url.query.get("sslmode")
+    if sslmode:
+        url = url.difference_update_query(["sslmode"])
+        connect_args["ssl"] = sslmode
+    return url.set(drivername="postgresql+asyncpg"), connect_args
+
+
+def _create_engine() -> Union[Engine, AsyncEngine]:
+    url = make_url(DATABASE_URL)
+    if DATABASE_ASYNC:
+        async_url, connect_args = _async_url(url)
+        return create_async_engine(
+            async_url, connect_args=connect_args, **_engine_options(async_url)
+        )
+    return create_engine(url, **_engine_options(url))
+
+
+engine = _create_engine()
+
+
+async def ping() -> None:
+    """
+    Runs `SELECT 1` on a pooled connection. Raises if the database is unreachable.
+    """
+    if isinstance(engine, AsyncEngine):
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    else:
+
+        def _ping() -> None:
+            with engine.connect() as connection:
+                connection.execute(text("SELECT 1"))
+
+        await asyncio.to_thread(_ping)
+
+
+async def warm_pool(connections: int = DATABASE_POOL_WARMUP) -> int:
+    """
+    Opens up to `connections` pooled connections at once and hands them back to the
+    pool, where they stay open. Returns how many were opened.
+    """
+    pool_size = getattr(engine.pool, "size", None)
+    if not callable(pool_size):
+        # e.g. NullPool for SQLite, which keeps nothing open.
+        return 0
+    connections = min(connections, pool_size())
+    if connections <= 0:
+        return 0
+    if isinstance(engine, AsyncEngine):
+        opened = [engine.connect() for _ in range(connections)]
+        results = await asyncio.gather(
+            *(connection.start() for connection in opened), return_exceptions=True
+        )
+        for connection, result in zip(opened, results):
+            if not isinstance(result, BaseException):
+                await connection.close()
+        for result in results:
+            if isinstance(result, BaseException):
+                raise result
+        return connections
+
+    def _warm_pool() -> int:
+        opened: List[Connection] = []
+        try:
+            for _ in range(connections):
+                opened.append(engine.connect())
+        finally:
+            for connection in opened:
+                connection.close()
+        return connections
+
+    return await asyncio.to_thread(_warm_pool)
+
+
+async def init_db() -> None:
+    # Registers the tables on SQLModel.metadata, whatever the caller has imported.
+    import app.models  # noqa: F401
+
+    if isinstance(engine, AsyncEngine):
+        async with engine.begin() as connection:
+            await connection.run_sync(SQLModel.metadata.create_all)
+    else:
+        SQLModel.metadata.create_all(engine)
 
 
-def init_db() -> None:
-    SQLModel.metadata.create_all(engine)
+async def get_session() -> AsyncGenerator[DBSession, None]:
+    if isinstance(engine, AsyncEngine):
+        async with AsyncSession(engine, expire_on_commit=False) as async_session:
+            yield async_session
+    else:
+        # Repository writes return rows via RETURNING, so keep them usable after commit.
+        with Session(engine, expire_on_commit=False) as session:
+            yield session
 
 
-def get_session() -> Generator[Session, None, None]:
-    with Session(engine) as session:
-        yield session
+# For background work that runs outside a request and its dependencies.
+session_scope = asynccontextmanager(get_session)
@@ -1,18 +1,106 @@
 from app.services.calls import CallService
+from app.services.call_status_writer import CallStatusWriter, call_status_writer
+from app.services.transcripts import TranscriptWriter, transcript_writer
+from app.services.database_health import DatabaseHealth, database_health
+from app.services.eleven_labs import ElevenLabsClientProvider, eleven_labs_client
+from app.services.webhook_dedup import WebhookDedupCache, webhook_dedup_cache
+from app.services.session_supervisor import SessionSupervisor, session_supervisor
+from app.services.conversation_registry import (
+    ConversationRegistry,
+    conversation_registry,
+)
 from fastapi import Depends, HTTPException, Request
-from sqlmodel import Session
-from app.database import get_session
+from typing import Optional
+from app.database import DBSession, get_session, session_scope
 from app.repositories.calls import CallRepository
+from app.utils.twilio_webhook import (
+    CallStatusWebhook,
+    IncomingCallWebhook,
+    read_webhook_params,
+)
 
 
-def get_call_repository(db_session: Session = Depends(get_session)) -> CallRepository:
+# These are `async def` so FastAPI resolves them on the event loop instead of
+# dispatching each one to the threadpool.
+async def get_call_repository(
+    db_session: DBSession = Depends(get_session),
+) -> CallRepository:
     return CallRepository(session=db_session)
 
 
-def get_call_service(
+async def get_conversation_registry() -> ConversationRegistry:
+    return conversation_registry
+
+
+async def get_call_status_writer() -> CallStatusWriter:
+    return call_status_writer
+
+
+async def get_transcript_writer() -> TranscriptWriter:
+    return transcript_writer
+
+
+async def get_database_health() -> DatabaseHealth:
+    return database_health
+
+
+async def get_eleven_labs_client() -> ElevenLabsClientProvider:
+    return eleven_labs_client
+
+
+async def get_webhook_dedup_cache() -> WebhookDedupCache:
+    return webhook_dedup_cache
+
+
+async def get_session_supervisor() -> SessionSupervisor:
+    return session_supervisor
+
+
+async def get_call_service(
     call_repository: CallRepository = Depends(get_call_repository),
+    registry: ConversationRegistry = Depends(get_conversation_registry),
+    status_writer: CallStatusWriter = Depends(get_call_status_writer),
+    transcripts: TranscriptWriter = Depends(get_transcript_writer),
+    eleven_labs: ElevenLabsClientProvider = Depends(get_eleven_labs_client),
+    supervisor: SessionSupervisor = Depends(get_session_supervisor),
 ) -> CallService:
-    return CallService(call_repository=call_repository)
+    return CallService(
+        call_repository=call_repository,
+        conversation_registry=registry,
+        status_writer=status_writer,
+        transcript_writer=transcripts,
+        eleven_labs_client=eleven_labs,
+        session_supervisor=supervisor,
+    )
+
+
+# Declared before any database dependency so a forged or oversized webhook is
+# rejected before a session is opened. None means a required field was missing.
+async def get_incoming_call_webhook(request: Request) -> Optional[IncomingCallWebhook]:
+    return IncomingCallWebhook.from_params(await read_webhook_params(request))
+
+
+async def get_call_status_webhook(request: Request) -> Optional[CallStatusWebhook]:
+    return CallStatusWebhook.from_params(await read_webhook_params(request))
+
+
+async def end_owned_session(call_sid: str, completed: bool = True) -> None:
+    """
+    Ends a conversation this worker owns after another worker received its
+    `stream-stopped` callback, or when the session supervisor reaps it. Runs outside
+    a request, so it opens its own session. `completed` is False when the call
+    resumed on another worker and is still live.
+    """
+    async with session_scope() as db_session:
+        call_service = CallService(
+            call_repository=CallRepository(session=db_session),
+            conversation_registry=conversation_registry,
+            status_writer=call_status_writer,
+            transcript_writer=transcript_writer,
+            eleven_labs_client=eleven_labs_client,
+            session_supervisor=session_supervisor,
+        )
+        await call_service._cleanup_handler(call_sid, completed=completed)
 
 
 def get_current_user(request: Request):
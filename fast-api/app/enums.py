@@ -6,3 +6,13 @@ class CallStatus(str, Enum):
     STREAMING = "STREAMING"
     COMPLETED = "COMPLETED"
     CANCELED = "CANCELED"  # Assuming we will get some failed/canceled status from Twilio or Eleven Labs if the call fails.
+
+
+class TurnRole(str, Enum):
+    AGENT = "AGENT"
+    USER = "USER"
+
+
+class ExportFormat(str, Enum):
+    NDJSON = "ndjson"
+    CSV = "csv"
@@ -1,18 +1,67 @@
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
 from fastapi import FastAPI
-from sqladmin import Admin
-from app.models import CallAdmin
+from app.utils.env import env_bool
 from app.utils.logger import setup_logging
 from app.database import engine
 from app.routers.calls import router as calls_router
 from app.routers.unprotected import router as unprotected_router
-from app.utils.sqladmin_auth import AdminAuth
+from app.routers.metrics import router as metrics_router
+from app.routers.health import router as health_router
 from fastapi.middleware.cors import CORSMiddleware
 from app.middleware.auth_middleware import AuthMiddleware
-import os
+from app.dependencies import end_owned_session
+from app.services.conversation_registry import conversation_registry
+from app.services.call_status_writer import call_status_writer
+from app.services.transcripts import transcript_writer
+from app.services.webhook_dedup import webhook_dedup_cache
+from app.services.eleven_labs import eleven_labs_client
+from app.services.database_health import database_health
+from app.services.session_supervisor import session_supervisor
+from app.services.call_stats import ADMIN_PERFORMANCE_MODE, call_stats
+from app.utils.jwks import jwks_key_set
 
 logger = setup_logging()
 
-app = FastAPI()
+# sqladmin and its templates are only imported when the dashboard is mounted. Set to
+# false in production to leave it out and start workers faster.
+ADMIN_ENABLED = env_bool("ADMIN_ENABLED", True)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+    logger.info(f"Database: {engine.url.render_as_string(hide_password=True)}")
+    # Loads the ElevenLabs SDK in the background; the first call waits for it.
+    await eleven_labs_client.start()
+    # Warms the connection pool and runs the first health check before serving.
+    await database_health.start()
+    await conversation_registry.start(end_session_handler=end_owned_session)
+    await session_supervisor.start(end_session_handler=end_owned_session)
+    await call_status_writer.start()
+    await transcript_writer.start()
+    await webhook_dedup_cache.start()
+    if jwks_key_set is not None:
+        await jwks_key_set.start()
+    # Aggregates for the admin dashboard, refreshed in the background.
+    if ADMIN_ENABLED and ADMIN_PERFORMANCE_MODE:
+        await call_stats.start()
+    yield
+    await call_stats.close()
+    if jwks_key_set is not None:
+        await jwks_key_set.close()
+    # Ends the calls still live while the database and writers are up, so they are
+    # recorded as completed.
+    await session_supervisor.close()
+    await conversation_registry.close()
+    await webhook_dedup_cache.close()
+    await eleven_labs_client.close()
+    await database_health.close()
+    await transcript_writer.close()
+    # Last, so status changes made while conversations were ending are written.
+    await call_status_writer.close()
+
+
+app = FastAPI(lifespan=lifespan)
 
 origins = ["*"]
 
@@ -28,8 +77,10 @@ app.add_middleware(AuthMiddleware)
 # Include your existing calls router (for Twilio endpoints).
 app.include_router(calls_router)
 app.include_router(unprotected_router)
+app.include_router(metrics_router)
+app.include_router(health_router)
+
+if ADMIN_ENABLED:
+    from app.admin import mount_admin
 
-# Admin Dashboard setup: https://aminalaee.dev/sqladmin/
-authentication_backend = AdminAuth(secret_key=os.environ["ADMIN_SECRET_KEY"])
-admin = Admin(app, engine, authentication_backend=authentication_backend)
-admin.add_view(CallAdmin)
+    mount_admin(app)
@@ -1,44 +1,210 @@
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
-from fastapi import HTTPException
+from collections import OrderedDict
+from typing import Any, Optional
+from starlette.datastructures import Headers
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from starlette.websockets import WebSocketClose
+from app.utils.env import env_float, env_int
+from app.utils.jwks import JWKSKeySet, jwks_key_set
+from app.utils.twilio_webhook import twilio_signature_validator
+import hashlib
 import os
+import time
 import jwt
 
+AUTH_TOKEN_CACHE_SIZE = env_int("AUTH_TOKEN_CACHE_SIZE", 10000)
+# Claims are trusted until the token's `exp`, but never for longer than this.
+AUTH_TOKEN_CACHE_MAX_TTL = env_float("AUTH_TOKEN_CACHE_MAX_TTL", 300.0)
 
-class AuthMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
+# Paths that skip JWT auth. Twilio connects the media stream websocket itself and
+# cannot present a Supabase token, and neither can a Prometheus scraper or a load
+# balancer's health probes.
+EXEMPT_PATH_PREFIXES = ("/unprotected", "/favicon.ico", "/media-stream-eleven")
+EXEMPT_PATHS = ("/metrics", "/health/live", "/health/ready")
+# Twilio webhooks carry a request signature instead of a JWT. They only skip JWT
+# auth when TWILIO_AUTH_TOKEN is set and that signature is being checked.
+TWILIO_WEBHOOK_PATHS = ("/incoming-call-eleven", "/call-status-eleven")
+
+# Algorithms accepted for keys from the JWKS. HS256 is only accepted with JWT_SECRET.
+ASYMMETRIC_ALGORITHMS = ("RS256", "ES256")
+
+
+class VerifiedTokenCache:
+    """
+    Bounded LRU of verified token claims, keyed by a hash of the token so raw tokens
+    are never held in memory. Entries expire at the token's `exp`.
+    """
+
+    def __init__(
+        self, max_size: int = AUTH_TOKEN_CACHE_SIZE, max_ttl: float = AUTH_TOKEN_CACHE_MAX_TTL
+    ) -> None:
+        self.max_size = max_size
+        self.max_ttl = max_ttl
+        self.entries: OrderedDict[bytes, tuple[float, dict[str, Any]]] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.verifications = 0
+        self.verify_seconds_total = 0.0
+        self.verify_seconds_max = 0.0
+
+    @staticmethod
+    def key(token: str) -> bytes:
+        return hashlib.sha256(token.encode("utf-8")).digest()
+
+    def get(self, key: bytes) -> Optional[dict[str, Any]]:
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, claims = entry
+        if expires_at <= time.time():
+            del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return claims
+
+    def put(self, key: bytes, claims: dict[str, Any]) -> None:
+        expires_at = time.time() + self.max_ttl
+        exp = claims.get("exp")
+        if isinstance(exp, (int, float)):
+            expires_at = min(expires_at, float(exp))
+        self.entries[key] = (expires_at, claims)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+
+    def record_verification(self, seconds: float) -> None:
+        self.verifications += 1
+        self.verify_seconds_total += seconds
+        self.verify_seconds_max = max(self.verify_seconds_max, seconds)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+            "verifications": self.verifications,
+            "verify_ms_avg": (
+                self.verify_seconds_total / self.verifications * 1000
+                if self.verifications
+                else 0.0
+            ),
+            "verify_ms_max": self.verify_seconds_max * 1000,
+        }
+
+
+verified_token_cache = VerifiedTokenCache()
+
+
+class AuthError(Exception):
+    def __init__(self, detail: str) -> None:
+        super().__init__(detail)
+        self.detail = detail
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI middleware that verifies the Supabase JWT on HTTP and websocket
+    connections and attaches its claims to `request.state.user`.
+
+    Legacy HS256 tokens are checked against JWT_SECRET, asymmetric (RS256/ES256)
+    tokens against the cached JWKS key named by the token's `kid`.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        cache: VerifiedTokenCache = verified_token_cache,
+        key_set: Optional[JWKSKeySet] = jwks_key_set,
+    ) -> None:
+        self.app = app
+        self.cache = cache
+        self.key_set = key_set
+        # Replace 'JWT_SECRET' with your Supabase JWT secret if different.
+        self.secret = os.environ.get("JWT_SECRET")
+        if not self.secret and self.key_set is None:
+            raise RuntimeError("Set JWT_SECRET and/or JWKS_URL to verify tokens")
+        self.audience = "authenticated"  # Adjust audience as needed.
+        self.exempt_paths: tuple[str, ...] = EXEMPT_PATHS
+        if twilio_signature_validator is not None:
+            self.exempt_paths += TWILIO_WEBHOOK_PATHS
+        self.decoder = jwt.PyJWT()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
 
         # Example how to bypass auth for a specific endpoint and preflight requests
+        path: str = scope["path"]
         if (
-            request.url.path.startswith("/unprotected") or request.url.path.startswith("/favicon.ico")
-            or request.method == "OPTIONS"
+            path.startswith(EXEMPT_PATH_PREFIXES)
+            or path in self.exempt_paths
+            or scope.get("method") == "OPTIONS"
         ):
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
-        auth_header = request.headers.get("Authorization")
+        try:
+            claims = self.authenticate(Headers(scope=scope).get("authorization"))
+        except AuthError as e:
+            if scope["type"] == "websocket":
+                await WebSocketClose(code=1008, reason=e.detail)(scope, receive, send)
+            else:
+                await JSONResponse({"detail": e.detail}, status_code=401)(scope, receive, send)
+            return
+
+        # Attach the decoded token payload to the request for downstream usage.
+        scope.setdefault("state", {})["user"] = claims
+        await self.app(scope, receive, send)
+
+    def authenticate(self, auth_header: Optional[str]) -> dict[str, Any]:
         if not auth_header or not auth_header.startswith("Bearer "):
-            raise HTTPException(
-                status_code=401, detail="Missing or invalid authorization header"
-            )
+            raise AuthError("Missing or invalid authorization header")
 
         # Extract the token from the header.
-        token = auth_header.split(" ")[1]
+        token = auth_header[len("Bearer ") :]
+        key = self.cache.key(token)
+        claims = self.cache.get(key)
+        if claims is not None:
+            return claims
 
+        started = time.perf_counter()
         try:
+            verification_key, algorithm = self.verification_key(token)
             # Decode and verify the JWT token.
-            # Replace 'JWT_SECRET' with your Supabase JWT secret if different.
-            decoded_token = jwt.decode(
+            claims = self.decoder.decode(
                 token,
-                os.environ["JWT_SECRET"],
-                algorithms=["HS256"],
-                audience="authenticated",  # Adjust audience as needed.
+                verification_key,
+                algorithms=[algorithm],
+                audience=self.audience,
             )
         except jwt.ExpiredSignatureError:
-            raise HTTPException(status_code=401, detail="Token expired")
+            raise AuthError("Token expired")
         except jwt.InvalidTokenError:
-            raise HTTPException(status_code=401, detail="Invalid token")
+            raise AuthError("Invalid token")
+        finally:
+            self.cache.record_verification(time.perf_counter() - started)
 
-        # Attach the decoded token payload to the request for downstream usage.
-        request.state.user = decoded_token
+        self.cache.put(key, claims)
+        return claims
 
-        return await call_next(request)
+    def verification_key(self, token: str) -> tuple[Any, str]:
+        header = jwt.get_unverified_header(token)
+        algorithm = header.get("alg")
+        if algorithm == "HS256" and self.secret:
+            return self.secret, algorithm
+        if algorithm in ASYMMETRIC_ALGORITHMS and self.key_set is not None:
+            signing_key = self.key_set.get(header.get("kid"))
+            if signing_key is None:
+                raise AuthError("Unknown signing key")
+            return signing_key.key, signing_key.algorithm_name
+        raise AuthError("Invalid token")
@@ -1,39 +1,63 @@
 import datetime
 from uuid import UUID, uuid4
-from sqladmin import ModelView
+from sqlalchemy import DateTime, Index
 from sqlmodel import Field, SQLModel
 from typing import Optional
 
-from app.enums import CallStatus
+from app.enums import CallStatus, TurnRole
 
 
 # ORM model
 class Call(SQLModel, table=True):
     __tablename__ = "calls"
+    # Every listing is ordered by (created_at, id) so it can be keyset-paginated, and
+    # each filter leads a composite index ending in that ordering. Mirrored in 002_*.sql.
+    __table_args__ = (
+        Index("idx_calls_created_at_id", "created_at", "id"),
+        Index("idx_calls_status_created_at_id", "status", "created_at", "id"),
+        Index("idx_calls_from_number_created_at_id", "from_number", "created_at", "id"),
+        Index("idx_calls_to_number_created_at_id", "to_number", "created_at", "id"),
+    )
     id: UUID = Field(default_factory=uuid4, primary_key=True)
     created_at: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
     )
     updated_at: datetime.datetime = Field(
-        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc)
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
     )
-    sid: str
+    sid: str = Field(unique=True)
     from_number: str
     to_number: str
     status: CallStatus = Field(default=CallStatus.INITIALIZED)
     eleven_labs_conversation_id: Optional[str] = None
 
 
-# Admin Dashboard ModelView. This can be modified so that only certain fields are displayed or modifiable.
-class CallAdmin(ModelView, model=Call):
-    column_list = [
-        Call.id,
-        Call.sid,
-        Call.from_number,
-        Call.to_number,
-        Call.created_at,
-        Call.updated_at,
-        Call.status,
-        Call.eleven_labs_conversation_id,
-    ]
-    name_plural = "Calls"
+# Projection returned by the call history API; only these columns are selected.
+class CallSummary(SQLModel):
+    id: UUID
+    sid: str
+    from_number: str
+    to_number: str
+    status: CallStatus
+    created_at: datetime.datetime
+
+
+# One line of a call's transcript, spoken by the caller or the agent.
+class CallTurn(SQLModel, table=True):
+    __tablename__ = "call_turns"
+    __table_args__ = (
+        Index("idx_call_turns_call_sid_created_at", "call_sid", "created_at", "sequence"),
+    )
+    id: UUID = Field(default_factory=uuid4, primary_key=True)
+    call_sid: str
+    # Order of the turn within the call, assigned as turns are captured.
+    sequence: int
+    role: TurnRole
+    text: str
+    created_at: datetime.datetime = Field(
+        default_factory=lambda: datetime.datetime.now(datetime.timezone.utc),
+        sa_type=DateTime(timezone=True),  # type: ignore[call-overload]
+    )
+
@@ -0,0 +1,52 @@
+from typing import Any, AsyncIterator, Callable, List, Optional, Sequence, TypeVar, cast
+from sqlalchemy import RowMapping
+from sqlmodel import Session
+from sqlmodel.ext.asyncio.session import AsyncSession
+from starlette.concurrency import run_in_threadpool
+from app.database import DBSession
+
+T = TypeVar("T")
+
+
+class BaseRepository:
+    def __init__(self, session: DBSession):
+        self.session = session
+
+    async def _run(self, operation: Callable[[Session], T]) -> T:
+        """
+        Runs a unit of ORM work without blocking the event loop. Async sessions run it
+        on the asyncpg connection, sync sessions run it on the threadpool.
+        """
+        if isinstance(self.session, AsyncSession):
+            # sqlmodel's AsyncSession wraps a sqlmodel Session, so `exec` is available.
+            return await self.session.run_sync(
+                lambda sync_session: operation(cast(Session, sync_session))
+            )
+        return await run_in_threadpool(operation, self.session)
+
+    async def _stream(self, statement: Any) -> AsyncIterator[List[dict[str, Any]]]:
+        """
+        Yields the rows of a Core select as batches of column mappings, read through a
+        server-side cursor. The batch size is the statement's `yield_per` option.
+        """
+        if isinstance(self.session, AsyncSession):
+            result = await self.session.stream(statement)
+            async for partition in result.mappings().partitions():
+                yield [dict(row) for row in partition]
+            return
+
+        session = self.session
+        partitions = iter(
+            await run_in_threadpool(
+                lambda: session.connection().execute(statement).mappings().partitions()
+            )
+        )
+
+        def next_partition() -> Optional[Sequence[RowMapping]]:
+            return next(partitions, None)
+
+        while True:
+            batch = await run_in_threadpool(next_partition)
+            if batch is None:
+                return
+            yield [dict(row) for row in batch]
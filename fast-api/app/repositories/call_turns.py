@@ -0,0 +1,39 @@
+from typing import Any, AsyncIterator, List
+from sqlmodel import Session
+from sqlalchemy import Table, insert
+from sqlalchemy import select as sa_select
+from app.repositories.base import BaseRepository
+from app.models import CallTurn
+
+call_turns_table: Table = CallTurn.__table__  # type: ignore[attr-defined]
+
+
+class CallTurnRepository(BaseRepository):
+    async def add_turns(self, turns: List[dict[str, Any]]) -> None:
+        """
+        Inserts many transcript turns with one executemany INSERT.
+        """
+        if not turns:
+            return
+
+        def _add_turns(session: Session) -> None:
+            session.connection().execute(insert(call_turns_table), turns)
+            session.commit()
+
+        await self._run(_add_turns)
+
+    async def stream_turns(
+        self, call_sid: str, batch_size: int = 500
+    ) -> AsyncIterator[List[dict[str, Any]]]:
+        """
+        Yields a call's transcript in spoken order, as batches of column mappings.
+        """
+        columns = call_turns_table.c
+        statement = (
+            sa_select(columns.sequence, columns.role, columns.text, columns.created_at)
+            .where(columns.call_sid == call_sid)
+            .order_by(columns.created_at, columns.sequence)
+            .execution_options(yield_per=batch_size)
+        )
+        async for rows in self._stream(statement):
+            yield rows
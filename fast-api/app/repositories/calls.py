@@ -1,55 +1,362 @@
-from typing import Optional, List
+import datetime
+from typing import Any, AsyncIterator, Optional, List
 from uuid import UUID
-from sqlmodel import Session, select
-from app.models import Call
-from sqlalchemy import text
+from sqlmodel import Session, col, select
+from app.repositories.base import BaseRepository
+from app.models import Call, CallSummary
+from app.enums import CallStatus
+from sqlalchemy import (
+    String,
+    Table,
+    bindparam,
+    cast,
+    func,
+    insert,
+    literal,
+    or_,
+    text,
+    tuple_,
+    union_all,
+    update,
+)
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy import select as sa_select
+from sqlalchemy.dialects import postgresql, sqlite
 
+# Core table for statements that bypass the ORM unit of work.
+calls_table: Table = Call.__table__  # type: ignore[attr-defined]
 
-class CallRepository:
-    def __init__(self, session: Session):
-        self.session = session
+# Columns refreshed when an insert hits an existing SID. Status is left alone so a
+# retried webhook cannot move a live call back to INITIALIZED.
+UPSERT_UPDATE_COLUMNS = ("from_number", "to_number", "updated_at")
+# Dialects with INSERT ... ON CONFLICT. Others insert row by row instead.
+UPSERT_DIALECTS = ("postgresql", "sqlite")
 
-    def health_check(self) -> bool:
+
+def _upsert_calls_statement(dialect_name: str, rows: List[dict[str, Any]]) -> Any:
+    """
+    INSERT ... ON CONFLICT (sid) DO UPDATE ... RETURNING for the given rows, so
+    duplicate Twilio webhooks return the existing call instead of failing.
+    """
+    if dialect_name == "postgresql":
+        statement: Any = postgresql.insert(Call).values(rows)
+    elif dialect_name == "sqlite":
+        statement = sqlite.insert(Call).values(rows)
+    else:
+        raise ValueError(f"INSERT ... ON CONFLICT is not supported on {dialect_name}")
+
+    return (
+        statement.on_conflict_do_update(
+            index_elements=[calls_table.c.sid],
+            set_={column: statement.excluded[column] for column in UPSERT_UPDATE_COLUMNS},
+        )
+        .returning(Call)
+        .execution_options(populate_existing=True)
+    )
+
+
+def _insert_or_update_calls(session: Session, rows: List[dict[str, Any]]) -> List[Call]:
+    """
+    The same upsert for dialects without ON CONFLICT: each row is inserted in its
+    own savepoint and, if its SID is already stored, updated instead. The stored
+    rows are then read back by SID.
+    """
+    for row in rows:
         try:
+            with session.begin_nested():
+                session.execute(insert(Call).values(row))
+        except IntegrityError:
+            session.execute(
+                update(Call)
+                .where(col(Call.sid) == row["sid"])
+                .values({column: row[column] for column in UPSERT_UPDATE_COLUMNS})
+            )
+    statement = (
+        select(Call)
+        .where(col(Call.sid).in_([row["sid"] for row in rows]))
+        .execution_options(populate_existing=True)
+    )
+    by_sid = {call.sid: call for call in session.exec(statement).all()}
+    return [by_sid[row["sid"]] for row in rows]
+
+
+# Row estimate the planner would use: the live-tuple density from the last ANALYZE
+# scaled to the table's current size, so it keeps up with inserts between ANALYZEs.
+# NULL until the table has been analyzed.
+APPROXIMATE_COUNT_QUERY = text(
+    """
+    SELECT CASE WHEN c.reltuples < 0 OR c.relpages = 0 THEN NULL
+      ELSE (c.reltuples / c.relpages
+        * (pg_relation_size(c.oid) / current_setting('block_size')::int))::bigint
+    END
+    FROM pg_class c WHERE c.oid = to_regclass(:table)
+    """
+)
+
+
+def _hour_expression(dialect_name: str) -> Any:
+    """
+    `created_at` truncated to the hour in UTC, as a datetime (postgres) or an ISO
+    string (SQLite).
+    """
+    if dialect_name == "postgresql":
+        return func.date_trunc("hour", func.timezone("UTC", calls_table.c.created_at))
+    return func.strftime("%Y-%m-%d %H:00:00", calls_table.c.created_at)
+
+
+class CallRepository(BaseRepository):
+    async def health_check(self) -> bool:
+        def _health_check(session: Session) -> bool:
             # Run a basic query to make sure this is working.
             statement = select(Call).limit(1)
-            results = self.session.exec(statement)
+            results = session.exec(statement)
             results.all()
             return True
+
+        try:
+            return await self._run(_health_check)
         except Exception:
             return False
 
-    def get_call(self, call_id: UUID) -> Optional[Call]:
-        call = self.session.get(Call, call_id)
-        return call
+    async def get_call(self, call_id: UUID) -> Optional[Call]:
+        return await self._run(lambda session: session.get(Call, call_id))
 
-    def get_call_by_sid(self, sid: str) -> Optional[Call]:
+    async def get_call_by_sid(self, sid: str) -> Optional[Call]:
         statement = select(Call).where(Call.sid == sid)
-        result = self.session.exec(statement).first()
-        return result
-
-    def create_call(self, call: Call) -> Call:
-        self.session.add(call)
-        self.session.commit()
-        self.session.refresh(call)
-        return call
-
-    def update_call(self, call_id: UUID, call_update: Call) -> Optional[Call]:
-        call = self.session.get(Call, call_id)
-        if not call:
-            return None
-
-        for key, value in call_update.model_dump(exclude_unset=True).items():
-            setattr(call, key, value)
-
-        self.session.commit()
-        self.session.refresh(call)
-        return call
-
-    def delete_call(self, call_id: UUID) -> bool:
-        call = self.session.get(Call, call_id)
-        if not call:
-            return False
-        self.session.delete(call)
-        self.session.commit()
-        return True
+        return await self._run(lambda session: session.exec(statement).first())
+
+    async def create_call(self, call: Call) -> Call:
+        """
+        Inserts the call, or returns the existing row if its SID is already stored.
+        """
+        calls = await self.create_calls([call])
+        return calls[0]
+
+    async def create_calls(self, calls: List[Call]) -> List[Call]:
+        """
+        Upserts many calls in a single statement and returns the stored rows.
+        """
+        if not calls:
+            return []
+        rows = [call.model_dump() for call in calls]
+
+        def _create_calls(session: Session) -> List[Call]:
+            dialect_name = session.get_bind().dialect.name
+            if dialect_name in UPSERT_DIALECTS:
+                statement = _upsert_calls_statement(dialect_name, rows)
+                created = list(session.scalars(statement).all())
+            else:
+                created = _insert_or_update_calls(session, rows)
+            session.commit()
+            return created
+
+        return await self._run(_create_calls)
+
+    async def update_call(self, call_id: UUID, call_update: Call) -> Optional[Call]:
+        values = call_update.model_dump(exclude_unset=True, exclude={"id"})
+        return await self._update_returning(col(Call.id) == call_id, values)
+
+    async def update_by_sid(self, sid: str, **fields: Any) -> Optional[Call]:
+        """
+        Updates a call by SID with one `UPDATE ... RETURNING`, no read beforehand.
+        Returns None if no call has that SID.
+        """
+        return await self._update_returning(col(Call.sid) == sid, fields)
+
+    async def _update_returning(
+        self, criteria: Any, values: dict[str, Any]
+    ) -> Optional[Call]:
+        values.setdefault("updated_at", datetime.datetime.now(datetime.timezone.utc))
+        statement = (
+            update(Call)
+            .where(criteria)
+            .values(values)
+            .returning(Call)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+
+        def _update(session: Session) -> Optional[Call]:
+            call = session.scalars(statement).first()
+            session.commit()
+            return call
+
+        return await self._run(_update)
+
+    async def list_calls(
+        self,
+        limit: int,
+        status: Optional[CallStatus] = None,
+        number: Optional[str] = None,
+        created_after: Optional[datetime.datetime] = None,
+        created_before: Optional[datetime.datetime] = None,
+        after: Optional[tuple[datetime.datetime, UUID]] = None,
+    ) -> List[CallSummary]:
+        """
+        Lists calls newest first with keyset pagination on (created_at, id). `after`
+        is the (created_at, id) of the last row of the previous page. Only the
+        CallSummary columns are selected.
+        """
+        columns = calls_table.c
+        statement = sa_select(*(columns[name] for name in CallSummary.model_fields))
+        if status is not None:
+            statement = statement.where(columns.status == status)
+        if number is not None:
+            statement = statement.where(
+                or_(columns.from_number == number, columns.to_number == number)
+            )
+        if created_after is not None:
+            statement = statement.where(columns.created_at >= created_after)
+        if created_before is not None:
+            statement = statement.where(columns.created_at < created_before)
+        if after is not None:
+            after_created_at, after_id = after
+            statement = statement.where(
+                tuple_(columns.created_at, columns.id)
+                < tuple_(literal(after_created_at), literal(after_id))
+            )
+        statement = statement.order_by(
+            columns.created_at.desc(), columns.id.desc()
+        ).limit(limit)
+
+        def _list_calls(session: Session) -> List[CallSummary]:
+            rows = session.connection().execute(statement).all()
+            return [CallSummary.model_validate(row._mapping) for row in rows]
+
+        return await self._run(_list_calls)
+
+    async def stream_calls(
+        self,
+        created_after: Optional[datetime.datetime] = None,
+        created_before: Optional[datetime.datetime] = None,
+        batch_size: int = 1000,
+    ) -> AsyncIterator[List[dict[str, Any]]]:
+        """
+        Yields every call created in the window, oldest first, as batches of column
+        mappings. Rows are read through a server-side cursor `batch_size` at a time,
+        so memory does not grow with the size of the window.
+        """
+        columns = calls_table.c
+        statement = sa_select(calls_table)
+        if created_after is not None:
+            statement = statement.where(columns.created_at >= created_after)
+        if created_before is not None:
+            statement = statement.where(columns.created_at < created_before)
+        statement = statement.order_by(columns.created_at, columns.id).execution_options(
+            yield_per=batch_size
+        )
+
+        async for rows in self._stream(statement):
+            yield rows
+
+    async def approximate_count(self) -> Optional[int]:
+        """
+        Estimated number of calls from the planner statistics in pg_class, without
+        scanning the table. None on other databases or before the first ANALYZE.
+        """
+
+        def _approximate_count(session: Session) -> Optional[int]:
+            if session.get_bind().dialect.name != "postgresql":
+                return None
+            return session.connection().execute(
+                APPROXIMATE_COUNT_QUERY, {"table": calls_table.name}
+            ).scalar()
+
+        return await self._run(_approximate_count)
+
+    async def count_calls(self) -> int:
+        statement = sa_select(func.count()).select_from(calls_table)
+        return await self._run(
+            lambda session: session.connection().execute(statement).scalar_one()
+        )
+
+    async def hourly_counts(
+        self, created_after: datetime.datetime
+    ) -> List[tuple[datetime.datetime, str, str, int]]:
+        """
+        Number of calls created since `created_after` for each hour and status,
+        each hour and from number, and each hour and to number, as
+        (hour, dimension, key, count) rows. `dimension` is "statuses",
+        "from_numbers" or "to_numbers".
+
+        The three groupings are separate, so there is a row per distinct value
+        rather than per combination of status and number pair. They are read in
+        one statement, each from one range of idx_calls_created_at_id.
+        """
+        columns = calls_table.c
+
+        def _hourly_counts(
+            session: Session,
+        ) -> List[tuple[datetime.datetime, str, str, int]]:
+            hour = _hour_expression(session.get_bind().dialect.name).label("hour")
+            statement = union_all(
+                *(
+                    sa_select(
+                        hour,
+                        literal(dimension).label("dimension"),
+                        cast(column, String).label("key"),
+                        func.count(),
+                    )
+                    .where(columns.created_at >= created_after)
+                    .group_by(hour, column)
+                    for dimension, column in (
+                        ("statuses", columns.status),
+                        ("from_numbers", columns.from_number),
+                        ("to_numbers", columns.to_number),
+                    )
+                )
+            )
+            counts = []
+            for hour_start, dimension, key, count in (
+                session.connection().execute(statement).all()
+            ):
+                if isinstance(hour_start, str):
+                    hour_start = datetime.datetime.fromisoformat(hour_start)
+                if hour_start.tzinfo is None:
+                    hour_start = hour_start.replace(tzinfo=datetime.timezone.utc)
+                counts.append((hour_start, dimension, key, count))
+            return counts
+
+        return await self._run(_hourly_counts)
+
+    async def update_calls_by_sid(self, updates: dict[str, dict[str, Any]]) -> None:
+        """
+        Applies many per-SID field updates in one transaction. Rows that set the same
+        columns share one executemany UPDATE, so a batch costs a statement per
+        distinct column set rather than a round trip per call.
+        """
+        if not updates:
+            return
+
+        now = datetime.datetime.now(datetime.timezone.utc)
+        groups: dict[tuple[str, ...], list[dict[str, Any]]] = {}
+        for sid, fields in updates.items():
+            columns = tuple(sorted(fields))
+            row = {f"{column}_": value for column, value in fields.items()}
+            groups.setdefault(columns, []).append({"sid_": sid, **row})
+
+        def _update_calls_by_sid(session: Session) -> None:
+            connection = session.connection()
+            for columns, rows in groups.items():
+                statement = (
+                    update(calls_table)
+                    .where(calls_table.c.sid == bindparam("sid_"))
+                    .values(
+                        {column: bindparam(f"{column}_") for column in columns}
+                        | {"updated_at": now}
+                    )
+                )
+                connection.execute(statement, rows)
+            session.commit()
+
+        await self._run(_update_calls_by_sid)
+
+    async def delete_call(self, call_id: UUID) -> bool:
+        def _delete_call(session: Session) -> bool:
+            call = session.get(Call, call_id)
+            if not call:
+                return False
+            session.delete(call)
+            session.commit()
+            return True
+
+        return await self._run(_delete_call)
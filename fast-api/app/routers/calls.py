@@ -1,9 +1,30 @@
-from app.dependencies import get_call_service, get_current_user_id
-from fastapi import APIRouter, Request, WebSocket, Depends
-from fastapi.responses import JSONResponse, HTMLResponse
+import datetime
+from typing import Optional
+from app.dependencies import (
+    get_call_service,
+    get_call_status_webhook,
+    get_current_user_id,
+    get_database_health,
+    get_incoming_call_webhook,
+    get_webhook_dedup_cache,
+)
+from app.enums import CallStatus, ExportFormat
+from fastapi import APIRouter, HTTPException, Query, Request, WebSocket, Depends
+from fastapi.responses import (
+    HTMLResponse,
+    JSONResponse,
+    Response,
+    StreamingResponse,
+)
+from app.services.database_health import DatabaseHealth
+from app.services.call_export import MEDIA_TYPES, export_calls, export_filename
+from app.services.transcripts import stream_transcript
+from app.services.webhook_dedup import WebhookDedupCache
+from app.utils.twilio_webhook import CallStatusWebhook, IncomingCallWebhook
 from app.services.calls import (
     CallService,
 )
+import json
 import logging
 
 logger = logging.getLogger(__name__)
@@ -27,48 +48,115 @@ async def health_check(user_id: str = Depends(get_current_user_id)):
 @router.get("/health-check")
 async def health_check_endpoint(
     request: Request,
+    health: DatabaseHealth = Depends(get_database_health),
+) -> JSONResponse:
+    # Last background check result; see /health/ready.
+    return JSONResponse(
+        {
+            "status": "up",
+            "database_check": health.healthy,
+            "request_host": request.url.hostname,
+        }
+    )
+
+
+@router.get("/calls")
+async def list_calls(
+    status: Optional[CallStatus] = None,
+    number: Optional[str] = None,
+    created_after: Optional[datetime.datetime] = None,
+    created_before: Optional[datetime.datetime] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500),
+    user_id: str = Depends(get_current_user_id),
     call_service: CallService = Depends(get_call_service),
 ) -> JSONResponse:
-    res = call_service.repository_health_check()
+    """
+    Call history, newest first. Pass `next_cursor` from a response as `cursor` to
+    fetch the following page.
+    """
+    try:
+        calls, next_cursor = await call_service.list_calls(
+            limit,
+            status=status,
+            number=number,
+            created_after=created_after,
+            created_before=created_before,
+            cursor=cursor,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return JSONResponse(
-        {"status": "up", "database_check": res, "request_host": request.url.hostname}
+        {
+            "calls": [call.model_dump(mode="json") for call in calls],
+            "next_cursor": next_cursor,
+        }
+    )
+
+
+@router.get("/calls/export")
+async def export_calls_endpoint(
+    format: ExportFormat = ExportFormat.NDJSON,
+    created_after: Optional[datetime.datetime] = None,
+    created_before: Optional[datetime.datetime] = None,
+    gzip: bool = False,
+    user_id: str = Depends(get_current_user_id),
+) -> StreamingResponse:
+    """
+    Streams every call in the window, oldest first, as NDJSON or CSV. With
+    `gzip=true` the body is a gzip file compressed on the fly.
+    """
+    filename = export_filename(format, gzip)
+    return StreamingResponse(
+        export_calls(
+            format,
+            created_after=created_after,
+            created_before=created_before,
+            compress=gzip,
+        ),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/calls/{call_sid}/transcript")
+async def call_transcript(
+    call_sid: str, user_id: str = Depends(get_current_user_id)
+) -> StreamingResponse:
+    """
+    Streams a call's transcript as NDJSON, one turn per line in spoken order. Turns
+    from a live call appear once they are flushed.
+    """
+    return StreamingResponse(
+        stream_transcript(call_sid), media_type=MEDIA_TYPES[ExportFormat.NDJSON]
     )
 
 
 @router.api_route("/incoming-call-eleven", methods=["GET", "POST"])
 async def handle_incoming_call(
-    request: Request, call_service: CallService = Depends(get_call_service)
+    request: Request,
+    webhook: Optional[IncomingCallWebhook] = Depends(get_incoming_call_webhook),
+    dedup_cache: WebhookDedupCache = Depends(get_webhook_dedup_cache),
+    call_service: CallService = Depends(get_call_service),
 ) -> HTMLResponse:
-    form_data = await request.form()
-    call_sid = form_data.get("CallSid")
-    from_number = form_data.get("From")
-    to_number = form_data.get("To")
-
-    # Combined check for all required fields and their types
-    if (
-        not call_sid
-        or not isinstance(call_sid, str)
-        or not from_number
-        or not isinstance(from_number, str)
-        or not to_number
-        or not isinstance(to_number, str)
-        or not request.url.hostname
-        or not isinstance(request.url.hostname, str)
-    ):
-        logger.error("Invalid or missing call data in twilio form {form_data}")
+    if webhook is None or not request.url.hostname:
+        logger.error("Invalid or missing call data in twilio webhook")
         return HTMLResponse(
             content="Invalid or missing call data. "
             "Please ensure Call SID, From number, To number, and hostname are provided and are of the correct type.",
             status_code=400,
         )
 
-    res = await call_service.handle_incoming_call(
-        call_sid,
-        from_number,
-        to_number,
-        request.url.hostname,
-    )
-    return HTMLResponse(content=str(res), media_type="application/xml")
+    hostname = request.url.hostname
+
+    async def handle() -> str:
+        return await call_service.handle_incoming_call(
+            webhook.call_sid, webhook.from_number, webhook.to_number, hostname
+        )
+
+    # Twilio retries on timeouts; a retry gets the TwiML already sent.
+    res = await dedup_cache.run(webhook.call_sid, "incoming-call", handle)
+    return HTMLResponse(content=res, media_type="application/xml")
 
 
 @router.websocket("/media-stream-eleven/{call_sid}")
@@ -82,19 +170,19 @@ async def handle_media_stream(
 
 @router.post("/call-status-eleven")
 async def call_status_eleven(
-    request: Request, call_service: CallService = Depends(get_call_service)
-) -> JSONResponse:
-    form_data = await request.form()
-
-    stream_event = form_data.get("StreamEvent")
-    call_sid = form_data.get("CallSid")
-    if (
-        not call_sid
-        or not isinstance(call_sid, str)
-        or not stream_event
-        or not isinstance(stream_event, str)
-    ):
+    webhook: Optional[CallStatusWebhook] = Depends(get_call_status_webhook),
+    dedup_cache: WebhookDedupCache = Depends(get_webhook_dedup_cache),
+    call_service: CallService = Depends(get_call_service),
+) -> Response:
+    if webhook is None:
         logger.error("Invalid request data")
         return JSONResponse({"success": False})
-    success = await call_service.handle_call_status(call_sid, stream_event)
-    return JSONResponse({"success": success})
+
+    async def handle() -> str:
+        success = await call_service.handle_call_status(
+            webhook.call_sid, webhook.stream_event
+        )
+        return json.dumps({"success": success}, separators=(",", ":"))
+
+    body = await dedup_cache.run(webhook.call_sid, webhook.stream_event, handle)
+    return Response(content=body, media_type="application/json")
@@ -0,0 +1,30 @@
+from app.dependencies import get_database_health
+from app.services.database_health import DatabaseHealth
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+# Probes are unauthenticated and only read state kept by the background check, so
+# they cost nothing on the database however often they run.
+@router.get("/live")
+async def liveness() -> JSONResponse:
+    """The worker is up and its event loop is responding."""
+    return JSONResponse({"status": "alive"})
+
+
+@router.get("/ready")
+async def readiness(
+    health: DatabaseHealth = Depends(get_database_health),
+) -> JSONResponse:
+    """The worker can reach its database, as of a recent background check."""
+    status = health.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
@@ -0,0 +1,42 @@
+from app.dependencies import get_current_user_id
+from app.middleware.auth_middleware import verified_token_cache
+from app.services.webhook_dedup import webhook_dedup_cache
+from app.services.session_supervisor import session_supervisor
+from app.utils.media_metrics import media_metrics
+from fastapi import APIRouter, Depends
+from fastapi.responses import JSONResponse, PlainTextResponse
+import logging
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter(
+    prefix="",
+    tags=["metrics"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+@router.get("/auth-stats")
+async def auth_stats(user_id: str = Depends(get_current_user_id)) -> JSONResponse:
+    return JSONResponse(content=verified_token_cache.stats())
+
+
+@router.get("/webhook-stats")
+async def webhook_stats(user_id: str = Depends(get_current_user_id)) -> JSONResponse:
+    return JSONResponse(content=webhook_dedup_cache.stats())
+
+
+@router.get("/session-stats")
+async def session_stats(user_id: str = Depends(get_current_user_id)) -> JSONResponse:
+    return JSONResponse(content=session_supervisor.stats())
+
+
+# Unauthenticated so Prometheus can scrape it; restrict access at the network level.
+@router.get("/metrics")
+async def metrics() -> PlainTextResponse:
+    return PlainTextResponse(
+        media_metrics.render()
+        + webhook_dedup_cache.render()
+        + session_supervisor.render(),
+        media_type="text/plain; version=0.0.4",
+    )
@@ -0,0 +1,97 @@
+import csv
+import datetime
+import io
+import json
+import zlib
+from enum import Enum
+from typing import Any, AsyncIterator, List, Optional
+from uuid import UUID
+
+from app.database import session_scope
+from app.enums import ExportFormat
+from app.repositories.calls import CallRepository, calls_table
+from app.utils.env import env_int
+
+# Rows fetched from the server-side cursor, and encoded into one chunk, at a time.
+CALL_EXPORT_BATCH_SIZE = env_int("CALL_EXPORT_BATCH_SIZE", 1000)
+
+EXPORT_COLUMNS: List[str] = list(calls_table.c.keys())
+
+MEDIA_TYPES = {
+    ExportFormat.NDJSON: "application/x-ndjson",
+    ExportFormat.CSV: "text/csv",
+}
+
+
+def _export_value(value: Any) -> Any:
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, Enum):
+        return value.value
+    return value
+
+
+def _encode_ndjson(rows: List[dict[str, Any]]) -> bytes:
+    lines = [
+        json.dumps(
+            {column: _export_value(row[column]) for column in EXPORT_COLUMNS},
+            separators=(",", ":"),
+        )
+        for row in rows
+    ]
+    lines.append("")
+    return "\n".join(lines).encode("utf-8")
+
+
+def _encode_csv(rows: List[dict[str, Any]]) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows(
+        [_export_value(row[column]) for column in EXPORT_COLUMNS] for row in rows
+    )
+    return buffer.getvalue().encode("utf-8")
+
+
+def export_filename(export_format: ExportFormat, compress: bool) -> str:
+    return f"calls.{export_format.value}" + (".gz" if compress else "")
+
+
+async def export_calls(
+    export_format: ExportFormat,
+    created_after: Optional[datetime.datetime] = None,
+    created_before: Optional[datetime.datetime] = None,
+    compress: bool = False,
+    batch_size: int = CALL_EXPORT_BATCH_SIZE,
+) -> AsyncIterator[bytes]:
+    """
+    Streams every call in the window as NDJSON or CSV, one encoded chunk per batch
+    of rows, optionally gzip-compressed as it goes. Only one batch is held in memory.
+
+    Opens its own session: a StreamingResponse body is consumed after the request's
+    dependencies have been torn down.
+    """
+    encode = _encode_ndjson if export_format == ExportFormat.NDJSON else _encode_csv
+    # wbits=31 writes a gzip header and trailer around the deflate stream.
+    compressor = zlib.compressobj(wbits=31) if compress else None
+
+    def output(chunk: bytes) -> bytes:
+        return compressor.compress(chunk) if compressor else chunk
+
+    if export_format == ExportFormat.CSV:
+        yield output(_encode_csv([dict(zip(EXPORT_COLUMNS, EXPORT_COLUMNS))]))
+
+    async with session_scope() as session:
+        batches = CallRepository(session).stream_calls(
+            created_after=created_after,
+            created_before=created_before,
+            batch_size=batch_size,
+        )
+        async for rows in batches:
+            chunk = output(encode(rows))
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
@@ -0,0 +1,156 @@
+import asyncio
+import datetime
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any, Optional
+from app.database import session_scope
+from app.repositories.calls import CallRepository
+from app.utils.env import env_bool, env_float, env_int
+import logging
+
+logger = logging.getLogger(__name__)
+
+# The admin dashboard shows cached aggregates and the call list uses estimated row
+# counts and only loads indexed columns. Set to false for exact counts.
+ADMIN_PERFORMANCE_MODE = env_bool("ADMIN_PERFORMANCE_MODE", True)
+CALL_STATS_REFRESH_INTERVAL = env_float("CALL_STATS_REFRESH_INTERVAL", 30.0)
+CALL_STATS_WINDOW_HOURS = env_int("CALL_STATS_WINDOW_HOURS", 24)
+# Calls only change status while they are live, which Twilio caps at 4 hours, so
+# older hours are settled and never read again.
+CALL_STATS_RESCAN_HOURS = env_int("CALL_STATS_RESCAN_HOURS", 5)
+CALL_STATS_TOP_NUMBERS = 10
+
+HOUR = datetime.timedelta(hours=1)
+
+
+# Field names match the dimensions of CallRepository.hourly_counts rows.
+@dataclass(slots=True)
+class HourlyCallCounts:
+    statuses: Counter[str] = field(default_factory=Counter)
+    from_numbers: Counter[str] = field(default_factory=Counter)
+    to_numbers: Counter[str] = field(default_factory=Counter)
+
+
+class CallStatsCache:
+    """
+    Call counts per hour, status and number over the last `window_hours`, kept in
+    memory for the admin dashboard, plus an estimate of the total number of calls.
+
+    A background task refreshes them every `interval` seconds. The first refresh
+    reads the whole window; after that only the last `rescan_hours` are read again,
+    in one statement over an index range on created_at, and the hours before are
+    kept as they are. Statuses and numbers are grouped separately, so a refresh
+    returns a row per hour and distinct value, not per call.
+
+    Every worker keeps and refreshes its own cache, so the database sees one
+    refresh per worker per interval.
+    """
+
+    def __init__(
+        self,
+        interval: float = CALL_STATS_REFRESH_INTERVAL,
+        window_hours: int = CALL_STATS_WINDOW_HOURS,
+        rescan_hours: int = CALL_STATS_RESCAN_HOURS,
+    ) -> None:
+        self.interval = interval
+        self.window_hours = max(window_hours, 1)
+        self.rescan_hours = max(min(rescan_hours, self.window_hours), 1)
+        self.hours: dict[datetime.datetime, HourlyCallCounts] = {}
+        self.row_count: Optional[int] = None
+        self.row_count_estimated = False
+        self.refreshed_at: Optional[float] = None
+        self.refresh_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        self.task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        self.task = asyncio.get_running_loop().create_task(self._refresh_periodically())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as e:
+                logger.error("Call stats refresh failed: %r", e)
+                self.error = repr(e)
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self) -> None:
+        started = time.monotonic()
+        now = datetime.datetime.now(datetime.timezone.utc)
+        current_hour = now.replace(minute=0, second=0, microsecond=0)
+        window_start = current_hour - (self.window_hours - 1) * HOUR
+        rescan_start = current_hour - (self.rescan_hours - 1) * HOUR
+        since = max(window_start, rescan_start) if self.hours else window_start
+
+        async with session_scope() as db_session:
+            repository = CallRepository(session=db_session)
+            rows = await repository.hourly_counts(since)
+            row_count = await repository.approximate_count()
+            self.row_count_estimated = row_count is not None
+            if row_count is None:
+                row_count = await repository.count_calls()
+
+        fresh: dict[datetime.datetime, HourlyCallCounts] = {}
+        for hour, dimension, key, count in rows:
+            counts = fresh.setdefault(hour, HourlyCallCounts())
+            getattr(counts, dimension)[key] += count
+        hours = {
+            hour: counts
+            for hour, counts in self.hours.items()
+            if window_start <= hour < since
+        }
+        hours.update(fresh)
+        self.hours = hours
+        self.row_count = row_count
+        self.error = None
+        self.refreshed_at = time.monotonic()
+        self.refresh_seconds = self.refreshed_at - started
+
+    def stats(self) -> dict[str, Any]:
+        statuses: Counter[str] = Counter()
+        from_numbers: Counter[str] = Counter()
+        to_numbers: Counter[str] = Counter()
+        per_hour = []
+        for hour in sorted(self.hours, reverse=True):
+            counts = self.hours[hour]
+            statuses.update(counts.statuses)
+            from_numbers.update(counts.from_numbers)
+            to_numbers.update(counts.to_numbers)
+            per_hour.append(
+                {
+                    "hour": hour.isoformat(),
+                    "calls": sum(counts.statuses.values()),
+                    "statuses": dict(counts.statuses),
+                }
+            )
+        return {
+            "total_calls": self.row_count,
+            "total_calls_estimated": self.row_count_estimated,
+            "window_hours": self.window_hours,
+            "window_calls": sum(statuses.values()),
+            "per_status": dict(statuses.most_common()),
+            "per_hour": per_hour,
+            "top_from_numbers": from_numbers.most_common(CALL_STATS_TOP_NUMBERS),
+            "top_to_numbers": to_numbers.most_common(CALL_STATS_TOP_NUMBERS),
+            "refreshed_seconds_ago": (
+                round(time.monotonic() - self.refreshed_at, 3)
+                if self.refreshed_at is not None
+                else None
+            ),
+            "refresh_ms": (
+                round(self.refresh_seconds * 1000, 3)
+                if self.refresh_seconds is not None
+                else None
+            ),
+            "error": self.error,
+        }
+
+
+call_stats = CallStatsCache()
@@ -0,0 +1,81 @@
+import asyncio
+from typing import Any, Optional
+from app.database import session_scope
+from app.repositories.calls import CallRepository
+from app.utils.env import env_bool, env_float, env_int
+import logging
+
+logger = logging.getLogger(__name__)
+
+# With write-behind on, status changes are queued and flushed in batches instead of
+# being written from the call path one round trip at a time.
+CALL_STATUS_WRITE_BEHIND = env_bool("CALL_STATUS_WRITE_BEHIND", True)
+CALL_STATUS_FLUSH_INTERVAL = env_float("CALL_STATUS_FLUSH_INTERVAL", 0.5)
+# Flush early once this many calls have pending changes.
+CALL_STATUS_MAX_BATCH = env_int("CALL_STATUS_MAX_BATCH", 500)
+
+
+class CallStatusWriter:
+    """
+    Write-behind buffer for `Call` status and conversation id changes.
+
+    Updates are coalesced per SID (the latest value of each field wins) and flushed
+    as one batched UPDATE per interval. Pending changes are flushed on shutdown.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = CALL_STATUS_WRITE_BEHIND,
+        flush_interval: float = CALL_STATUS_FLUSH_INTERVAL,
+        max_batch: int = CALL_STATUS_MAX_BATCH,
+    ) -> None:
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.pending: dict[str, dict[str, Any]] = {}
+        self.flush_requested = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        if self.enabled:
+            self.task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+
+    def enqueue(self, call_sid: str, **fields: Any) -> None:
+        self.pending.setdefault(call_sid, {}).update(fields)
+        if len(self.pending) >= self.max_batch:
+            self.flush_requested.set()
+
+    async def flush(self) -> None:
+        async with self.flush_lock:
+            if not self.pending:
+                return
+            batch, self.pending = self.pending, {}
+            try:
+                async with session_scope() as session:
+                    await CallRepository(session=session).update_calls_by_sid(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} call status updates: {e}")
+                # Keep the batch for the next flush, without clobbering newer changes.
+                for call_sid, fields in batch.items():
+                    self.pending[call_sid] = {**fields, **self.pending.get(call_sid, {})}
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self.flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            await self.flush()
+
+
+call_status_writer = CallStatusWriter()
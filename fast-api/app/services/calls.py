@@ -1,58 +1,139 @@
-import json
-import traceback
+import base64
+import binascii
+import datetime
 import os
-import signal
+import time
 import uuid
+from typing import Any, List, Optional
 
-from app.models import Call
+from app.models import Call, CallSummary
 from app.repositories.calls import CallRepository
 from fastapi import Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import HTMLResponse
-from twilio.twiml.voice_response import VoiceResponse, Connect
-from elevenlabs import ElevenLabs
-from elevenlabs.conversational_ai.conversation import Conversation
-from app.utils.twilio_audio_interface import TwilioAudioInterface
-from app.enums import CallStatus
+from app.utils.media_codec import StopEvent, get_media_codec
+from app.utils.media_metrics import CallMediaMetrics, media_metrics
+from app.utils.twiml import render_media_stream_twiml
+from app.utils.logger import call_log_sampler, call_sid_context, log_sampled
+from app.services.conversation_registry import ConversationRegistry
+from app.services.call_status_writer import CallStatusWriter
+from app.services.transcripts import TranscriptWriter
+from app.services.eleven_labs import ElevenLabsClientProvider
+from app.services.session_supervisor import SessionSupervisor
+from app.enums import CallStatus, TurnRole
 import logging
 
 logger = logging.getLogger(__name__)
 
-GLOBAL_CONVERSATION_STORE: dict[str, Conversation] = (
-    {}
-)  # TODO: This works, but there MUST be a way to store the conversation state in the database. This is a temporary solution.
+
+def encode_cursor(call: CallSummary) -> str:
+    """
+    Opaque page cursor holding the (created_at, id) of the last call on a page.
+    """
+    raw = f"{call.created_at.isoformat()}|{call.id}"
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> tuple[datetime.datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("utf-8")
+        created_at, call_id = raw.split("|", 1)
+        return datetime.datetime.fromisoformat(created_at), uuid.UUID(call_id)
+    except (binascii.Error, UnicodeError, ValueError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
 
 
 class CallService:
 
-    def __init__(self, call_repository: CallRepository) -> None:
+    def __init__(
+        self,
+        call_repository: CallRepository,
+        conversation_registry: ConversationRegistry,
+        status_writer: CallStatusWriter,
+        transcript_writer: TranscriptWriter,
+        eleven_labs_client: ElevenLabsClientProvider,
+        session_supervisor: SessionSupervisor,
+    ) -> None:
         self.eleven_labs_agent_id = os.environ["ELEVENLABS_AGENT_ID"]
-        self.eleven_labs_client = ElevenLabs()
-        self.conversation_store: dict[str, Conversation] = GLOBAL_CONVERSATION_STORE
+        self.eleven_labs_client = eleven_labs_client
+        self.conversation_registry = conversation_registry
+        self.status_writer = status_writer
+        self.transcript_writer = transcript_writer
         self.call_repository = call_repository
+        self.session_supervisor = session_supervisor
 
-    def _cleanup_handler(self, call_sid: str) -> None:
+    async def _update_call_status(self, call_sid: str, **fields: Any) -> None:
         """
-        Cleanup function to handle the termination of a conversation session.
+        Records a status change for a call, queued for the next batched flush when
+        write-behind is on, written straight away otherwise.
         """
-        conversation = self.conversation_store.pop(call_sid, None)
+        if self.status_writer.enabled:
+            self.status_writer.enqueue(call_sid, **fields)
+        else:
+            await self.call_repository.update_by_sid(call_sid, **fields)
+
+    def _record_turn(self, call_sid: str, role: TurnRole, text: str) -> None:
+        """
+        Conversation callback, run on the ElevenLabs thread. Only buffers the turn.
+        """
+        log_sampled(
+            logger, logging.INFO, call_sid, "%s said: %s", role.value.capitalize(), text
+        )
+        self.transcript_writer.record(call_sid, role, text)
+
+    async def _cleanup_handler(self, call_sid: str, completed: bool = True) -> None:
+        """
+        Cleanup function to handle the termination of a conversation session. The
+        call is left as it is when `completed` is False, because it carries on with
+        another worker.
+        """
+        conversation = self.conversation_registry.pop(call_sid)
         if conversation:
             conversation.end_session()  # type: ignore
-            logger.info(f"Cleaned up conversation for Call SID: {call_sid}")
-            call = self.call_repository.get_call_by_sid(call_sid)
-            if call:
-                call.eleven_labs_conversation_id = conversation._conversation_id
-                call.status = CallStatus.COMPLETED
-                self.call_repository.update_call(call.id, call)
+            logger.info("Cleaned up conversation for Call SID: %s", call_sid)
+            if completed:
+                await self._update_call_status(
+                    call_sid,
+                    status=CallStatus.COMPLETED,
+                    eleven_labs_conversation_id=conversation._conversation_id,
+                )
+            await self.transcript_writer.end_call(call_sid)
 
-    def repository_health_check(self) -> bool:
-        return self.call_repository.health_check()
+    async def list_calls(
+        self,
+        limit: int,
+        status: Optional[CallStatus] = None,
+        number: Optional[str] = None,
+        created_after: Optional[datetime.datetime] = None,
+        created_before: Optional[datetime.datetime] = None,
+        cursor: Optional[str] = None,
+    ) -> tuple[List[CallSummary], Optional[str]]:
+        """
+        Returns a page of calls, newest first, and the cursor for the next page (None
+        on the last page). Raises ValueError for a malformed cursor.
+        """
+        after = decode_cursor(cursor) if cursor else None
+        # Fetch one extra row to know whether another page exists.
+        calls = await self.call_repository.list_calls(
+            limit + 1,
+            status=status,
+            number=number,
+            created_after=created_after,
+            created_before=created_before,
+            after=after,
+        )
+        if len(calls) <= limit:
+            return calls, None
+        calls = calls[:limit]
+        return calls, encode_cursor(calls[-1])
 
     async def handle_incoming_call(
         self, call_sid: str, from_number: str, to_number: str, request_host: str
-    ) -> VoiceResponse:
+    ) -> str:
         """
-        Handles incoming calls from Twilio and initiates a VoiceResponse with a media stream.
+        Handles incoming calls from Twilio and returns the TwiML that connects the call
+        to a media stream.
         """
+        call_sid_context.set(call_sid)
         call = Call(
             id=uuid.uuid4(),
             sid=call_sid,
@@ -60,79 +141,158 @@ class CallService:
             to_number=to_number,
             status=CallStatus.INITIALIZED,
         )
-        self.call_repository.create_call(call)
-
-        voice_response = VoiceResponse()
-        connect = Connect()
-        connect.stream(
-            url=f"wss://{request_host}/media-stream-eleven/{call_sid}",
-            status_callback=f"https://{request_host}/call-status-eleven",
-            status_callback_method="POST",
-        )
-        voice_response.append(connect)
-        return voice_response
+        await self.call_repository.create_call(call)
+        return render_media_stream_twiml(call_sid, request_host)
 
     async def handle_media_stream(self, websocket: WebSocket, call_sid: str) -> None:
         """
         Handles the WebSocket media stream for a specific call SID.
         """
+        # Both pull in the ElevenLabs SDK, which is kept out of app startup.
+        from elevenlabs.conversational_ai.conversation import Conversation
+        from app.utils.twilio_audio_interface import TwilioAudioInterface
+
+        call_sid_context.set(call_sid)
         await websocket.accept()
-        logger.info(f"WebSocket connection established for Call SID: {call_sid}")
-        audio_interface = TwilioAudioInterface(websocket)
+        logger.info("WebSocket connection established for Call SID: %s", call_sid)
 
-        # Register signal handler for graceful shutdown (only once is needed)
-        try:
-            signal.signal(
-                signal.SIGINT, lambda sig, frame: self._cleanup_handler(call_sid)
-            )
-        except ValueError as e:
-            logger.info(f"Could not set signal handler: {e}")
+        async def close() -> None:
+            await websocket.close(code=1000)
 
-        try:
-            conversation = Conversation(
-                client=self.eleven_labs_client,
-                agent_id=self.eleven_labs_agent_id,
-                requires_auth=False,
+        session = self.session_supervisor.resume(call_sid, close)
+        resumed = session is not None
+        if session is not None and session.audio_interface is not None:
+            # Twilio reconnected within the resume grace window, so the agent session
+            # carries on and the audio buffered meanwhile is sent once the stream starts.
+            audio_interface = session.audio_interface
+            audio_interface.attach(websocket)
+            logger.info("Resumed media stream for Call SID: %s", call_sid)
+        else:
+            audio_interface = TwilioAudioInterface(
+                websocket,
+                codec=get_media_codec(),
+                call_sid=call_sid,
+                resumable=self.session_supervisor.resume_grace > 0,
+            )
+            media_metrics.call_started()
+            # Reaped if it goes quiet or runs too long, and ended on shutdown.
+            session = self.session_supervisor.track(
+                call_sid,
+                close,
                 audio_interface=audio_interface,
-                callback_agent_response=lambda text: logger.info(f"Agent said: {text}"),
-                callback_user_transcript=lambda text: logger.info(f"User said: {text}"),
+                finish=lambda: self._finish_media_stream(
+                    call_sid, audio_interface.metrics
+                ),
             )
-            conversation.start_session()  # type: ignore
-            logger.info(f"Conversation session started for Call SID: {call_sid}")
+        codec = audio_interface.codec
+        metrics = audio_interface.metrics
+        connection = session.connection
+        # Twilio sends `stop` when the call ends. A websocket that goes away without
+        # it has dropped, and the call can still resume.
+        stopped = False
+        dropped = False
+        # Logged once it is known whether the call is kept for resume.
+        disconnect: Optional[WebSocketDisconnect] = None
 
-            call_obj = self.call_repository.get_call_by_sid(call_sid)
-            if call_obj:
-                call_obj.status = CallStatus.STREAMING
-                self.call_repository.update_call(call_obj.id, call_obj)
+        try:
+            if not resumed:
+                conversation = Conversation(
+                    client=await self.eleven_labs_client.get(),
+                    agent_id=self.eleven_labs_agent_id,
+                    requires_auth=False,
+                    audio_interface=audio_interface,
+                    callback_agent_response=lambda text: self._record_turn(
+                        call_sid, TurnRole.AGENT, text
+                    ),
+                    callback_user_transcript=lambda text: self._record_turn(
+                        call_sid, TurnRole.USER, text
+                    ),
+                )
+                conversation.start_session()  # type: ignore
+                # Registered straight away so cleanup can find it if anything below
+                # fails.
+                self.conversation_registry.register(call_sid, conversation)
+                logger.info("Conversation session started for Call SID: %s", call_sid)
 
-            self.conversation_store[call_sid] = conversation
+                await self._update_call_status(call_sid, status=CallStatus.STREAMING)
 
             async for message in websocket.iter_text():
+                if session.connection != connection:
+                    # A reconnected websocket has taken over this call.
+                    break
+                session.last_activity = time.monotonic()
                 if not message:
                     continue
-                data = json.loads(message)
-                await audio_interface.handle_twilio_message(data)
+                started = time.perf_counter()
+                event = codec.decode(message)
+                metrics.message_decode.observe(time.perf_counter() - started)
+                if isinstance(event, StopEvent):
+                    stopped = True
+                await audio_interface.handle_twilio_message(event)
+            dropped = not stopped
 
         except WebSocketDisconnect as e:
-            logger.error(f"WebSocketDisconnect for Call SID {call_sid}: {e}")
-            self._cleanup_handler(call_sid)
+            disconnect = e
+            dropped = not stopped
 
         except Exception as e:
-            logger.error(
-                f"Error in media stream WebSocket for Call SID {call_sid}: {e}"
+            # The traceback is formatted by the log writer, not on the event loop.
+            logger.exception(
+                "Error in media stream WebSocket for Call SID %s: %s", call_sid, e
+            )
+
+        finally:
+            if session.connection != connection:
+                logger.info("Media stream for Call SID %s was taken over", call_sid)
+            elif dropped and self.session_supervisor.detach(call_sid):
+                audio_interface.detach()
+                logger.info(
+                    "Media stream for Call SID %s dropped, keeping the conversation "
+                    "for %.0f s",
+                    call_sid,
+                    self.session_supervisor.resume_grace,
+                )
+            else:
+                if disconnect is not None:
+                    logger.error(
+                        "WebSocketDisconnect for Call SID %s: %s", call_sid, disconnect
+                    )
+                # Also reached when Twilio closes the stream normally, which ends
+                # `iter_text` without an exception and used to leave the session open.
+                try:
+                    await self._cleanup_handler(call_sid)
+                except Exception:
+                    logger.exception("Cleanup failed for Call SID %s", call_sid)
+                self.session_supervisor.untrack(session)
+
+    def _finish_media_stream(self, call_sid: str, metrics: CallMediaMetrics) -> None:
+        """
+        Records a call's media stats once its session ends, after any resumes.
+        """
+        media_metrics.call_finished(metrics)
+        suppressed = call_log_sampler.end_call(call_sid)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("Media stats for Call SID %s: %s", call_sid, metrics.summary())
+        if suppressed:
+            logger.info(
+                "Suppressed %d log records for Call SID %s", suppressed, call_sid
             )
-            traceback.print_exc()
-            self._cleanup_handler(call_sid)
 
     async def handle_call_status(self, call_sid: str, stream_event: str) -> bool:
         """
         Handles status callbacks from Twilio when the call ends or changes state.
         """
-        logger.info(f"Stream Event: {stream_event}")
+        call_sid_context.set(call_sid)
+        logger.info("Stream Event: %s", stream_event)
         if stream_event == "stream-stopped":
             logger.info(
-                f"Stream stopped for Call SID: {call_sid}. Triggering conversation cleanup."
+                "Stream stopped for Call SID: %s. Triggering conversation cleanup.",
+                call_sid,
             )
-            self._cleanup_handler(call_sid)
+            if self.conversation_registry.is_local(call_sid):
+                await self._cleanup_handler(call_sid)
+            else:
+                # The websocket for this call lives on another worker.
+                await self.conversation_registry.request_end_session(call_sid)
 
         return True
@@ -0,0 +1,184 @@
+import asyncio
+import os
+from typing import TYPE_CHECKING, Any, Coroutine, Optional, Protocol
+from sqlalchemy.engine import make_url
+import logging
+
+if TYPE_CHECKING:
+    from elevenlabs.conversational_ai.conversation import Conversation
+
+logger = logging.getLogger(__name__)
+
+# memory keeps everything in this process and only works with a single worker.
+# postgres routes commands between workers with LISTEN/NOTIFY on DATABASE_URL.
+CONVERSATION_REGISTRY = os.environ.get("CONVERSATION_REGISTRY", "memory")
+CONVERSATION_REGISTRY_CHANNEL = os.environ.get(
+    "CONVERSATION_REGISTRY_CHANNEL", "conversation_commands"
+)
+RECONNECT_DELAY_SECONDS = 1.0
+
+
+
+class EndSessionHandler(Protocol):
+    """
+    Ends a conversation this worker owns. `completed` is False when the call carries
+    on elsewhere, so it must not be recorded as completed.
+    """
+
+    def __call__(
+        self, call_sid: str, completed: bool = True
+    ) -> Coroutine[Any, Any, None]: ...
+
+
+class ConversationRegistry:
+    """
+    Tracks the live ElevenLabs conversations owned by this worker.
+
+    A conversation can only be ended by the worker holding its websocket. This base
+    registry is in-process: a request to end a call owned by another worker has
+    nowhere to go and is dropped.
+
+    `claimed_elsewhere` holds local calls another worker has since registered a
+    conversation for, e.g. when Twilio reconnects a dropped media stream to a
+    different worker. The session supervisor ends the local copy.
+    """
+
+    def __init__(self) -> None:
+        self.conversations: dict[str, "Conversation"] = {}
+        self.claimed_elsewhere: set[str] = set()
+        self.end_session_handler: Optional[EndSessionHandler] = None
+        self.tasks: set[asyncio.Task[None]] = set()
+
+    async def start(self, end_session_handler: EndSessionHandler) -> None:
+        self.end_session_handler = end_session_handler
+
+    async def close(self) -> None:
+        for task in list(self.tasks):
+            task.cancel()
+
+    def register(self, call_sid: str, conversation: "Conversation") -> None:
+        self.conversations[call_sid] = conversation
+
+    def pop(self, call_sid: str) -> Optional["Conversation"]:
+        self.claimed_elsewhere.discard(call_sid)
+        return self.conversations.pop(call_sid, None)
+
+    def is_local(self, call_sid: str) -> bool:
+        return call_sid in self.conversations
+
+    async def request_end_session(self, call_sid: str) -> None:
+        """
+        Asks whichever worker owns `call_sid` to end its conversation.
+        """
+        logger.info(f"No conversation registered for Call SID: {call_sid}")
+
+    def _handle_end_session(self, call_sid: str) -> None:
+        if not self.is_local(call_sid) or self.end_session_handler is None:
+            return
+        task = asyncio.get_running_loop().create_task(self.end_session_handler(call_sid))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+
+class PostgresConversationRegistry(ConversationRegistry):
+    """
+    Cross-process registry. Every worker LISTENs on one channel; an end request is
+    published with NOTIFY and acted on only by the worker that owns the call. Each
+    registration is announced as a claim, so a worker still holding the same call
+    learns that it has moved.
+    """
+
+    def __init__(self, dsn: str, channel: str = CONVERSATION_REGISTRY_CHANNEL) -> None:
+        super().__init__()
+        self.dsn = dsn
+        self.channel = channel
+        self.connection: Any = None
+        self.lock = asyncio.Lock()
+        self.closing = False
+
+    async def start(self, end_session_handler: EndSessionHandler) -> None:
+        await super().start(end_session_handler)
+        await self._connect()
+
+    async def close(self) -> None:
+        self.closing = True
+        await super().close()
+        if self.connection is not None and not self.connection.is_closed():
+            await self.connection.close()
+        self.connection = None
+
+    async def _connect(self) -> None:
+        import asyncpg
+
+        self.connection = await asyncpg.connect(self.dsn)
+        self.connection.add_termination_listener(self._on_connection_lost)
+        await self.connection.add_listener(self.channel, self._on_notification)
+        logger.info(f"Conversation registry listening on channel {self.channel}")
+
+    def _on_connection_lost(self, connection: Any) -> None:
+        if self.closing:
+            return
+        logger.error("Conversation registry lost its database connection, reconnecting")
+        task = asyncio.get_running_loop().create_task(self._reconnect())
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _reconnect(self) -> None:
+        while not self.closing:
+            try:
+                async with self.lock:
+                    await self._connect()
+                return
+            except Exception as e:
+                logger.error(f"Conversation registry reconnect failed: {e}")
+                await asyncio.sleep(RECONNECT_DELAY_SECONDS)
+
+    def _on_notification(
+        self, connection: Any, pid: int, channel: str, payload: str
+    ) -> None:
+        command, _, call_sid = payload.partition(":")
+        if command == "end":
+            self._handle_end_session(call_sid)
+        elif (
+            command == "claim"
+            and pid != connection.get_server_pid()
+            and self.is_local(call_sid)
+        ):
+            logger.info(f"Call SID {call_sid} was claimed by another worker")
+            self.claimed_elsewhere.add(call_sid)
+
+    def register(self, call_sid: str, conversation: "Conversation") -> None:
+        super().register(call_sid, conversation)
+        task = asyncio.get_running_loop().create_task(self._claim(call_sid))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _claim(self, call_sid: str) -> None:
+        try:
+            await self._notify("claim", call_sid)
+        except Exception as e:
+            logger.error(f"Failed to announce Call SID {call_sid}: {e}")
+
+    async def request_end_session(self, call_sid: str) -> None:
+        await self._notify("end", call_sid)
+
+    async def _notify(self, command: str, call_sid: str) -> None:
+        # Sent on the listening connection, so a worker can skip its own claims.
+        async with self.lock:
+            if self.connection is None or self.connection.is_closed():
+                await self._connect()
+            await self.connection.execute(
+                "SELECT pg_notify($1, $2)", self.channel, f"{command}:{call_sid}"
+            )
+
+
+def create_conversation_registry(
+    backend: str = CONVERSATION_REGISTRY,
+) -> ConversationRegistry:
+    if backend == "postgres":
+        url = make_url(os.environ["DATABASE_URL"]).set(drivername="postgresql")
+        return PostgresConversationRegistry(url.render_as_string(hide_password=False))
+    return ConversationRegistry()
+
+
+conversation_registry = create_conversation_registry()
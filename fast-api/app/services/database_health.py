@@ -0,0 +1,108 @@
+import asyncio
+import time
+from typing import Any, Optional
+from app.database import ping, warm_pool
+from app.utils.env import env_float
+import logging
+
+logger = logging.getLogger(__name__)
+
+HEALTH_CHECK_INTERVAL = env_float("HEALTH_CHECK_INTERVAL", 5.0)
+HEALTH_CHECK_TIMEOUT = env_float("HEALTH_CHECK_TIMEOUT", 2.0)
+# A worker stops reporting ready when its last successful check is older than this,
+# which also covers the checker itself being stuck.
+HEALTH_CHECK_MAX_STALENESS = env_float("HEALTH_CHECK_MAX_STALENESS", 15.0)
+
+
+class DatabaseHealth:
+    """
+    Database health for this worker, checked with `SELECT 1` by a background task
+    every `interval` seconds. Probes read the last result from memory, so they
+    never touch the database however often they arrive.
+    """
+
+    def __init__(
+        self,
+        interval: float = HEALTH_CHECK_INTERVAL,
+        timeout: float = HEALTH_CHECK_TIMEOUT,
+        max_staleness: float = HEALTH_CHECK_MAX_STALENESS,
+    ) -> None:
+        self.interval = interval
+        self.timeout = timeout
+        self.max_staleness = max_staleness
+        self.healthy = False
+        self.checked_at: Optional[float] = None
+        self.healthy_at: Optional[float] = None
+        self.latency: Optional[float] = None
+        self.error: Optional[str] = None
+        self.warmed_connections = 0
+        self.task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        """
+        Opens the warmup connections and runs the first check, so a worker that can
+        reach its database is ready as soon as it starts serving.
+        """
+        try:
+            self.warmed_connections = await asyncio.wait_for(
+                warm_pool(), self.timeout
+            )
+            logger.info(f"Opened {self.warmed_connections} database connections")
+        except Exception as e:
+            logger.error(f"Database pool warmup failed: {e!r}")
+        await self.check()
+        self.task = asyncio.get_running_loop().create_task(self._check_periodically())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    async def check(self) -> bool:
+        started = time.monotonic()
+        try:
+            await asyncio.wait_for(ping(), self.timeout)
+        except Exception as e:
+            if self.healthy or self.checked_at is None:
+                logger.error(f"Database health check failed: {e!r}")
+            self.healthy = False
+            self.error = repr(e)
+        else:
+            if not self.healthy and self.checked_at is not None:
+                logger.info("Database health check recovered")
+            self.healthy = True
+            self.error = None
+            self.healthy_at = time.monotonic()
+            self.latency = self.healthy_at - started
+        self.checked_at = time.monotonic()
+        return self.healthy
+
+    async def _check_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    def is_ready(self) -> bool:
+        return (
+            self.healthy
+            and self.healthy_at is not None
+            and time.monotonic() - self.healthy_at <= self.max_staleness
+        )
+
+    def status(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "ready": self.is_ready(),
+            "database_check": self.healthy,
+            "checked_seconds_ago": (
+                round(now - self.checked_at, 3) if self.checked_at is not None else None
+            ),
+            "latency_ms": (
+                round(self.latency * 1000, 3) if self.latency is not None else None
+            ),
+            "error": self.error,
+            "warmed_connections": self.warmed_connections,
+        }
+
+
+database_health = DatabaseHealth()
@@ -0,0 +1,53 @@
+import asyncio
+from typing import TYPE_CHECKING, Optional
+import logging
+
+if TYPE_CHECKING:
+    from elevenlabs import ElevenLabs
+
+logger = logging.getLogger(__name__)
+
+
+def _create_client() -> "ElevenLabs":
+    # The SDK takes a few hundred milliseconds to import, so it is only imported
+    # here, on a worker thread.
+    from elevenlabs import ElevenLabs
+    import elevenlabs.conversational_ai.conversation  # noqa: F401
+
+    return ElevenLabs()
+
+
+class ElevenLabsClientProvider:
+    """
+    Holds the one ElevenLabs client shared by every call on this worker.
+
+    The client is created when the app starts, on a thread, so the worker can serve
+    requests while the SDK loads. A media stream that starts before it is ready
+    waits for it.
+    """
+
+    def __init__(self) -> None:
+        self.loading: Optional[asyncio.Task["ElevenLabs"]] = None
+
+    async def start(self) -> None:
+        if self.loading is None:
+            self.loading = asyncio.get_running_loop().create_task(
+                asyncio.to_thread(_create_client)
+            )
+
+    async def close(self) -> None:
+        self.loading = None
+
+    async def get(self) -> "ElevenLabs":
+        await self.start()
+        assert self.loading is not None
+        try:
+            return await asyncio.shield(self.loading)
+        except Exception as e:
+            logger.error(f"Could not create the ElevenLabs client: {e}")
+            # Try again on the next call.
+            self.loading = None
+            raise
+
+
+eleven_labs_client = ElevenLabsClientProvider()
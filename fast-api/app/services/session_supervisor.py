@@ -0,0 +1,360 @@
+import asyncio
+import time
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, List, Optional
+from app.services.conversation_registry import (
+    ConversationRegistry,
+    EndSessionHandler,
+    conversation_registry,
+)
+from app.utils.env import env_float
+import logging
+
+if TYPE_CHECKING:
+    from app.utils.twilio_audio_interface import TwilioAudioInterface
+
+logger = logging.getLogger(__name__)
+
+# Twilio sends a media frame every 20 ms for as long as a call is up, so a stream
+# that has been silent this long is dead.
+SESSION_IDLE_TIMEOUT = env_float("SESSION_IDLE_TIMEOUT", 30.0)
+# Twilio ends calls after 4 hours.
+SESSION_MAX_DURATION = env_float("SESSION_MAX_DURATION", 14400.0)
+SESSION_REAP_INTERVAL = env_float("SESSION_REAP_INTERVAL", 5.0)
+# How long shutdown waits for the remaining sessions to end.
+SESSION_SHUTDOWN_TIMEOUT = env_float("SESSION_SHUTDOWN_TIMEOUT", 10.0)
+# Seconds a call whose media stream websocket dropped keeps its ElevenLabs
+# conversation, waiting for Twilio to reconnect. 0 ends the call straight away.
+SESSION_RESUME_GRACE = env_float("SESSION_RESUME_GRACE", 0.0)
+
+CloseHandler = Callable[[], Awaitable[None]]
+
+
+@dataclass(slots=True)
+class LiveSession:
+    call_sid: str
+    # Closes the media stream websocket, so the handler stops reading from it.
+    close: CloseHandler
+    audio_interface: Optional["TwilioAudioInterface"] = None
+    # Called once when the session is untracked, to record the call's media stats.
+    finish: Optional[Callable[[], None]] = None
+    started_at: float = field(default_factory=time.monotonic)
+    # Updated by the media stream handler for every message from Twilio.
+    last_activity: float = field(default_factory=time.monotonic)
+    # When the websocket dropped, while waiting for the call to resume.
+    detached_at: Optional[float] = None
+    # Incremented each time a new websocket takes over the session.
+    connection: int = 0
+    ending: bool = False
+
+
+class SessionSupervisor:
+    """
+    Tracks the media streams and ElevenLabs conversations live on this worker.
+
+    Cleanup normally happens when the websocket closes or Twilio reports the stream
+    stopped. A background task catches what those miss: sessions idle for longer
+    than `idle_timeout` or older than `max_duration` are reaped, and conversations
+    still registered with no media stream handling them are counted as leaked and
+    ended. On shutdown every remaining session is ended at once.
+
+    With a `resume_grace`, a session whose websocket drops is detached instead of
+    ended. A websocket reconnecting for the same call within the grace window takes
+    it over, keeping the conversation; otherwise it is reaped when the window ends.
+    If the reconnect reached another worker instead, which then claimed the call in
+    the registry, the local conversation is ended without marking the call
+    completed.
+    """
+
+    def __init__(
+        self,
+        registry: ConversationRegistry,
+        idle_timeout: float = SESSION_IDLE_TIMEOUT,
+        max_duration: float = SESSION_MAX_DURATION,
+        interval: float = SESSION_REAP_INTERVAL,
+        shutdown_timeout: float = SESSION_SHUTDOWN_TIMEOUT,
+        resume_grace: float = SESSION_RESUME_GRACE,
+    ) -> None:
+        self.registry = registry
+        self.idle_timeout = idle_timeout
+        self.max_duration = max_duration
+        self.interval = interval
+        self.shutdown_timeout = shutdown_timeout
+        self.resume_grace = resume_grace
+        self.sessions: dict[str, LiveSession] = {}
+        self.end_session_handler: Optional[EndSessionHandler] = None
+        self.task: Optional[asyncio.Task[None]] = None
+        self.tasks: set[asyncio.Task[None]] = set()
+        self.reaped_idle = 0
+        self.reaped_max_duration = 0
+        self.leaked = 0
+        self.ended_on_shutdown = 0
+        self.resumed = 0
+        self.resume_expired = 0
+        self.handed_off = 0
+
+    async def start(self, end_session_handler: EndSessionHandler) -> None:
+        self.end_session_handler = end_session_handler
+        self.task = asyncio.get_running_loop().create_task(self._reap_periodically())
+
+    async def close(self) -> None:
+        """Ends every session still live, concurrently, within the shutdown timeout."""
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        call_sids = set(self.sessions) | set(self.registry.conversations)
+        if not call_sids:
+            return
+        logger.info("Ending %d live sessions on shutdown", len(call_sids))
+        self.ended_on_shutdown += len(call_sids)
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(self._end(sid) for sid in call_sids)),
+                self.shutdown_timeout,
+            )
+        except asyncio.TimeoutError:
+            logger.error(
+                "Timed out ending sessions on shutdown, %d still live",
+                len(self.registry.conversations),
+            )
+
+    def track(
+        self,
+        call_sid: str,
+        close: CloseHandler,
+        audio_interface: Optional["TwilioAudioInterface"] = None,
+        finish: Optional[Callable[[], None]] = None,
+    ) -> LiveSession:
+        session = LiveSession(
+            call_sid=call_sid,
+            close=close,
+            audio_interface=audio_interface,
+            finish=finish,
+        )
+        self.sessions[call_sid] = session
+        return session
+
+    def untrack(self, session: LiveSession) -> None:
+        if self.sessions.get(session.call_sid) is session:
+            del self.sessions[session.call_sid]
+        if session.finish is not None:
+            finish, session.finish = session.finish, None
+            finish()
+
+    def detach(self, call_sid: str) -> bool:
+        """
+        Keeps a call whose websocket dropped for the resume grace window. Returns
+        False when it should be ended now instead.
+        """
+        session = self.sessions.get(call_sid)
+        if (
+            self.resume_grace <= 0
+            or session is None
+            or session.ending
+            or not self.registry.is_local(call_sid)
+        ):
+            return False
+        session.detached_at = time.monotonic()
+        return True
+
+    def resume(self, call_sid: str, close: CloseHandler) -> Optional[LiveSession]:
+        """
+        Hands a call's session to a reconnecting websocket. Returns None when there
+        is no session to resume and a new conversation is needed.
+        """
+        session = self.sessions.get(call_sid)
+        if (
+            self.resume_grace <= 0
+            or session is None
+            or session.audio_interface is None
+            or session.ending
+            or not self.registry.is_local(call_sid)
+        ):
+            return None
+        if session.detached_at is None:
+            # The old websocket has not noticed the drop yet. Its handler stops once
+            # it sees the session has moved on.
+            session.audio_interface.detach()
+            task = asyncio.get_running_loop().create_task(
+                self._close(call_sid, session.close)
+            )
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+        session.close = close
+        session.connection += 1
+        session.detached_at = None
+        session.last_activity = time.monotonic()
+        self.resumed += 1
+        return session
+
+    async def reap(self) -> None:
+        now = time.monotonic()
+        expired: List[str] = []
+        handed_off: List[str] = []
+        for session in list(self.sessions.values()):
+            if session.ending:
+                continue
+            if session.call_sid in self.registry.claimed_elsewhere:
+                # The call reconnected to another worker, which now runs it.
+                logger.info(
+                    "Ending local session for Call SID %s, resumed on another worker",
+                    session.call_sid,
+                    extra={"call_sid": session.call_sid},
+                )
+                self.handed_off += 1
+                session.ending = True
+                handed_off.append(session.call_sid)
+                continue
+            if now - session.started_at > self.max_duration:
+                self.reaped_max_duration += 1
+                reason = "over the maximum duration"
+            elif session.detached_at is not None:
+                if not self.registry.is_local(session.call_sid):
+                    # Ended while detached, e.g. by Twilio's stream-stopped callback.
+                    self.untrack(session)
+                    continue
+                if now - session.detached_at <= self.resume_grace:
+                    continue
+                self.resume_expired += 1
+                reason = "not resumed within the grace window"
+            elif now - session.last_activity > self.idle_timeout:
+                self.reaped_idle += 1
+                reason = "idle"
+            else:
+                continue
+            logger.warning(
+                "Reaping session for Call SID %s: %s",
+                session.call_sid,
+                reason,
+                extra={"call_sid": session.call_sid},
+            )
+            session.ending = True
+            expired.append(session.call_sid)
+
+        # Conversations are registered after their session is tracked and popped
+        # before it is untracked, so one without a session has lost its handler.
+        for call_sid in list(self.registry.conversations):
+            if call_sid not in self.sessions:
+                self.leaked += 1
+                logger.error(
+                    "Ending leaked conversation for Call SID %s",
+                    call_sid,
+                    extra={"call_sid": call_sid},
+                )
+                expired.append(call_sid)
+
+        if expired or handed_off:
+            await asyncio.gather(
+                *(self._end(sid) for sid in expired),
+                *(self._end(sid, completed=False) for sid in handed_off),
+            )
+
+    async def _reap_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.reap()
+            except Exception:
+                logger.exception("Session reaper failed")
+
+    async def _end(self, call_sid: str, completed: bool = True) -> None:
+        """
+        Ends the conversation and records the call as completed through the same
+        handler used for calls ended from another worker, then closes the websocket.
+        A detached session has no handler left to untrack it, so it is untracked here.
+        """
+        try:
+            if self.end_session_handler is not None:
+                await self.end_session_handler(call_sid, completed=completed)
+        except Exception:
+            logger.exception("Failed to end session for Call SID %s", call_sid)
+            conversation = self.registry.pop(call_sid)
+            if conversation is not None:
+                conversation.end_session()  # type: ignore
+        session = self.sessions.get(call_sid)
+        if session is None:
+            return
+        if session.detached_at is not None:
+            self.untrack(session)
+        else:
+            await self._close(call_sid, session.close)
+
+    async def _close(self, call_sid: str, close: CloseHandler) -> None:
+        try:
+            await close()
+        except Exception as e:
+            logger.info("Could not close websocket for Call SID %s: %s", call_sid, e)
+
+    def stats(self) -> dict[str, Any]:
+        now = time.monotonic()
+        return {
+            "live": len(self.sessions),
+            "conversations": len(self.registry.conversations),
+            "reaped_idle": self.reaped_idle,
+            "reaped_max_duration": self.reaped_max_duration,
+            "leaked": self.leaked,
+            "ended_on_shutdown": self.ended_on_shutdown,
+            "detached": sum(s.detached_at is not None for s in self.sessions.values()),
+            "resumed": self.resumed,
+            "resume_expired": self.resume_expired,
+            "handed_off": self.handed_off,
+            "oldest_seconds": round(
+                max((now - s.started_at for s in self.sessions.values()), default=0.0),
+                3,
+            ),
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, kind, help_text, value in (
+            (
+                "twilio_sessions_live",
+                "gauge",
+                "Media streams tracked by this worker's session supervisor",
+                len(self.sessions),
+            ),
+            (
+                "twilio_sessions_reaped_idle_total",
+                "counter",
+                "Sessions ended for receiving no media within the idle timeout",
+                self.reaped_idle,
+            ),
+            (
+                "twilio_sessions_reaped_max_duration_total",
+                "counter",
+                "Sessions ended for running past the maximum duration",
+                self.reaped_max_duration,
+            ),
+            (
+                "twilio_sessions_leaked_total",
+                "counter",
+                "Conversations found still registered after their media stream ended",
+                self.leaked,
+            ),
+            (
+                "twilio_sessions_resumed_total",
+                "counter",
+                "Dropped media streams resumed by a reconnecting websocket",
+                self.resumed,
+            ),
+            (
+                "twilio_sessions_resume_expired_total",
+                "counter",
+                "Dropped media streams ended after the resume grace window",
+                self.resume_expired,
+            ),
+            (
+                "twilio_sessions_handed_off_total",
+                "counter",
+                "Dropped media streams that resumed on another worker",
+                self.handed_off,
+            ),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+session_supervisor = SessionSupervisor(registry=conversation_registry)
@@ -0,0 +1,136 @@
+import asyncio
+import datetime
+import json
+import threading
+import uuid
+from typing import Any, AsyncIterator, List, Optional
+from app.database import session_scope
+from app.enums import TurnRole
+from app.repositories.call_turns import CallTurnRepository
+from app.utils.env import env_bool, env_float, env_int
+import logging
+
+logger = logging.getLogger(__name__)
+
+TRANSCRIPT_CAPTURE = env_bool("TRANSCRIPT_CAPTURE", True)
+TRANSCRIPT_FLUSH_INTERVAL = env_float("TRANSCRIPT_FLUSH_INTERVAL", 1.0)
+# Flush early once this many turns are buffered.
+TRANSCRIPT_MAX_BATCH = env_int("TRANSCRIPT_MAX_BATCH", 200)
+
+
+class TranscriptWriter:
+    """
+    Buffers transcript turns in memory and bulk-inserts them into `call_turns` on an
+    interval, when the buffer fills, and when a call ends.
+
+    `record` is called from the ElevenLabs conversation thread, so it only appends
+    to the buffer under a lock and never touches the database or the event loop's
+    state directly.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = TRANSCRIPT_CAPTURE,
+        flush_interval: float = TRANSCRIPT_FLUSH_INTERVAL,
+        max_batch: int = TRANSCRIPT_MAX_BATCH,
+    ) -> None:
+        self.enabled = enabled
+        self.flush_interval = flush_interval
+        self.max_batch = max_batch
+        self.lock = threading.Lock()
+        self.pending: List[dict[str, Any]] = []
+        self.sequences: dict[str, int] = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.flush_requested = asyncio.Event()
+        self.flush_lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        if self.enabled:
+            self.loop = asyncio.get_running_loop()
+            self.task = asyncio.create_task(self._flush_periodically())
+
+    async def close(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+        await self.flush()
+        self.loop = None
+
+    def record(self, call_sid: str, role: TurnRole, text: str) -> None:
+        if not self.enabled:
+            return
+        with self.lock:
+            sequence = self.sequences.get(call_sid, 0)
+            self.sequences[call_sid] = sequence + 1
+            self.pending.append(
+                {
+                    "id": uuid.uuid4(),
+                    "call_sid": call_sid,
+                    "sequence": sequence,
+                    "role": role,
+                    "text": text,
+                    "created_at": datetime.datetime.now(datetime.timezone.utc),
+                }
+            )
+            full = len(self.pending) >= self.max_batch
+        if full and self.loop is not None:
+            self.loop.call_soon_threadsafe(self.flush_requested.set)
+
+    async def end_call(self, call_sid: str) -> None:
+        """
+        Writes out everything buffered so far once a call's conversation has ended.
+        """
+        with self.lock:
+            self.sequences.pop(call_sid, None)
+        await self.flush()
+
+    async def flush(self) -> None:
+        async with self.flush_lock:
+            with self.lock:
+                batch, self.pending = self.pending, []
+            if not batch:
+                return
+            try:
+                async with session_scope() as session:
+                    await CallTurnRepository(session=session).add_turns(batch)
+            except Exception as e:
+                logger.error(f"Failed to flush {len(batch)} transcript turns: {e}")
+                # Keep the batch, ahead of anything recorded since, for the next flush.
+                with self.lock:
+                    self.pending[:0] = batch
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self.flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self.flush_requested.clear()
+            await self.flush()
+
+
+transcript_writer = TranscriptWriter()
+
+
+async def stream_transcript(call_sid: str) -> AsyncIterator[bytes]:
+    """
+    Streams a call's stored transcript as NDJSON, one line per turn. Opens its own
+    session, like the call export, since the response outlives the request's.
+    """
+    async with session_scope() as session:
+        async for turns in CallTurnRepository(session=session).stream_turns(call_sid):
+            yield "".join(
+                json.dumps(
+                    {
+                        "sequence": turn["sequence"],
+                        "role": turn["role"].value,
+                        "text": turn["text"],
+                        "created_at": turn["created_at"].isoformat(),
+                    }
+                )
+                + "\n"
+                for turn in turns
+            ).encode("utf-8")
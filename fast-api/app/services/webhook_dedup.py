@@ -0,0 +1,251 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, List, Optional
+from sqlalchemy.engine import make_url
+from app.utils.env import env_bool, env_float, env_int
+import logging
+
+logger = logging.getLogger(__name__)
+
+WEBHOOK_DEDUP = env_bool("WEBHOOK_DEDUP", True)
+# memory remembers responses per worker. postgres also shares them between workers
+# through the webhook_responses table (db/migrations/004.sql).
+WEBHOOK_DEDUP_BACKEND = os.environ.get("WEBHOOK_DEDUP_BACKEND", "memory")
+# Twilio gives up retrying a webhook well within this.
+WEBHOOK_DEDUP_TTL = env_float("WEBHOOK_DEDUP_TTL", 600.0)
+WEBHOOK_DEDUP_MAX_ENTRIES = env_int("WEBHOOK_DEDUP_MAX_ENTRIES", 10000)
+WEBHOOK_DEDUP_POOL_SIZE = env_int("WEBHOOK_DEDUP_POOL_SIZE", 5)
+PRUNE_INTERVAL_SECONDS = 60.0
+
+DedupKey = tuple[str, str]
+WebhookHandler = Callable[[], Awaitable[str]]
+
+
+class WebhookDedupCache:
+    """
+    Remembers the response to each Twilio webhook, keyed on (CallSid, event), for
+    `ttl` seconds.
+
+    A retried webhook is answered with the stored response, and one that arrives
+    while the original is still being handled waits for it, so neither reaches the
+    database. Failed requests are not stored, so their retries run in full.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = WEBHOOK_DEDUP,
+        ttl: float = WEBHOOK_DEDUP_TTL,
+        max_entries: int = WEBHOOK_DEDUP_MAX_ENTRIES,
+    ) -> None:
+        self.enabled = enabled
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # Insertion ordered and every entry lives `ttl`, so the oldest is first.
+        self.entries: OrderedDict[DedupKey, tuple[float, str]] = OrderedDict()
+        self.pending: dict[DedupKey, asyncio.Future[None]] = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    async def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+    def _get_local(self, key: DedupKey) -> Optional[str]:
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        expires_at, response = entry
+        if expires_at <= time.monotonic():
+            del self.entries[key]
+            return None
+        return response
+
+    def _put_local(self, key: DedupKey, response: str) -> None:
+        now = time.monotonic()
+        self.entries.pop(key, None)
+        self.entries[key] = (now + self.ttl, response)
+        while self.entries:
+            oldest_key, (expires_at, _) = next(iter(self.entries.items()))
+            if expires_at > now and len(self.entries) <= self.max_entries:
+                break
+            del self.entries[oldest_key]
+            if expires_at > now:
+                self.evictions += 1
+
+    async def get(self, key: DedupKey) -> Optional[str]:
+        return self._get_local(key)
+
+    async def put(self, key: DedupKey, response: str) -> None:
+        self._put_local(key, response)
+
+    async def run(self, call_sid: str, event: str, handler: WebhookHandler) -> str:
+        """
+        Returns the stored response for (call_sid, event), or runs `handler` and
+        stores what it returns.
+        """
+        if not self.enabled:
+            return await handler()
+        key = (call_sid, event)
+        while True:
+            response = await self.get(key)
+            if response is not None:
+                self.hits += 1
+                return response
+            pending = self.pending.get(key)
+            if pending is None:
+                break
+            # Look again once the first request is done; if it failed, this one
+            # becomes the request that runs the handler.
+            await asyncio.shield(pending)
+
+        self.misses += 1
+        done = asyncio.get_running_loop().create_future()
+        self.pending[key] = done
+        try:
+            response = await handler()
+            await self.put(key, response)
+            return response
+        finally:
+            del self.pending[key]
+            done.set_result(None)
+
+    def stats(self) -> dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self.entries),
+            "max_size": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+        for name, kind, help_text, value in (
+            (
+                "twilio_webhook_dedup_hits_total",
+                "counter",
+                "Twilio webhooks answered from the dedup cache",
+                self.hits,
+            ),
+            (
+                "twilio_webhook_dedup_misses_total",
+                "counter",
+                "Twilio webhooks handled in full",
+                self.misses,
+            ),
+            (
+                "twilio_webhook_dedup_evictions_total",
+                "counter",
+                "Responses evicted from the dedup cache before their TTL",
+                self.evictions,
+            ),
+            (
+                "twilio_webhook_dedup_entries",
+                "gauge",
+                "Responses held in this worker's dedup cache",
+                len(self.entries),
+            ),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+class PostgresWebhookDedupCache(WebhookDedupCache):
+    """
+    Keeps the per-worker cache in front of a table shared by every worker, so a
+    retry routed to a different worker is still answered from cache. If the table
+    cannot be reached the webhook is handled as a miss.
+    """
+
+    def __init__(self, dsn: str, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self.dsn = dsn
+        self.pool: Any = None
+        self.prune_task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        import asyncpg
+
+        self.pool = await asyncpg.create_pool(
+            self.dsn, min_size=1, max_size=WEBHOOK_DEDUP_POOL_SIZE
+        )
+        self.prune_task = asyncio.get_running_loop().create_task(self._prune())
+
+    async def close(self) -> None:
+        if self.prune_task is not None:
+            self.prune_task.cancel()
+            self.prune_task = None
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @staticmethod
+    def _shared_key(key: DedupKey) -> str:
+        call_sid, event = key
+        return f"{call_sid}:{event}"
+
+    async def get(self, key: DedupKey) -> Optional[str]:
+        response = self._get_local(key)
+        if response is not None or self.pool is None:
+            return response
+        try:
+            response = await self.pool.fetchval(
+                "SELECT response FROM webhook_responses "
+                "WHERE key = $1 AND expires_at > now()",
+                self._shared_key(key),
+            )
+        except Exception as e:
+            logger.error(f"Webhook dedup lookup failed: {e}")
+            return None
+        if response is not None:
+            self._put_local(key, response)
+        return response
+
+    async def put(self, key: DedupKey, response: str) -> None:
+        self._put_local(key, response)
+        if self.pool is None:
+            return
+        try:
+            await self.pool.execute(
+                "INSERT INTO webhook_responses (key, response, expires_at) "
+                "VALUES ($1, $2, now() + make_interval(secs => $3)) "
+                "ON CONFLICT (key) DO UPDATE "
+                "SET response = EXCLUDED.response, expires_at = EXCLUDED.expires_at",
+                self._shared_key(key),
+                response,
+                self.ttl,
+            )
+        except Exception as e:
+            logger.error(f"Webhook dedup write failed: {e}")
+
+    async def _prune(self) -> None:
+        while True:
+            await asyncio.sleep(PRUNE_INTERVAL_SECONDS)
+            try:
+                await self.pool.execute(
+                    "DELETE FROM webhook_responses WHERE expires_at <= now()"
+                )
+            except Exception as e:
+                logger.error(f"Webhook dedup prune failed: {e}")
+
+
+def create_webhook_dedup_cache(
+    backend: str = WEBHOOK_DEDUP_BACKEND,
+) -> WebhookDedupCache:
+    if backend == "postgres" and WEBHOOK_DEDUP:
+        url = make_url(os.environ["DATABASE_URL"]).set(drivername="postgresql")
+        return PostgresWebhookDedupCache(url.render_as_string(hide_password=False))
+    return WebhookDedupCache()
+
+
+webhook_dedup_cache = create_webhook_dedup_cache()
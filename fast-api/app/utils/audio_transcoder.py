@@ -0,0 +1,265 @@
+import os
+from dataclasses import dataclass
+from typing import Any, Optional
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - only needed when formats differ
+    np = None  # type: ignore[assignment]
+
+# Twilio media streams are always 8 kHz mu-law. These are the formats the ElevenLabs
+# agent is configured with (user input and agent output audio format), e.g.
+# ulaw_8000, pcm_16000 or pcm_24000. Audio is converted when they differ.
+TWILIO_AUDIO_FORMAT = "ulaw_8000"
+ELEVENLABS_INPUT_AUDIO_FORMAT = os.environ.get(
+    "ELEVENLABS_INPUT_AUDIO_FORMAT", TWILIO_AUDIO_FORMAT
+)
+ELEVENLABS_OUTPUT_AUDIO_FORMAT = os.environ.get(
+    "ELEVENLABS_OUTPUT_AUDIO_FORMAT", TWILIO_AUDIO_FORMAT
+)
+
+# Prototype filter taps per polyphase branch, and the Kaiser window beta.
+RESAMPLER_TAPS_PER_PHASE = 16
+RESAMPLER_KAISER_BETA = 8.0
+# Samples per chunk the buffers are first sized for (100 ms at 24 kHz). They grow
+# once if a larger chunk arrives.
+INITIAL_CHUNK_SAMPLES = 2400
+
+# G.711 mu-law constants. Decoding works on 16-bit values, the reference encoder
+# on 14-bit ones.
+MULAW_DECODE_BIAS = 0x84
+MULAW_BIAS = 0x21
+MULAW_CLIP = 8159
+MULAW_SEGMENT_ENDS = (0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF)
+
+
+@dataclass(slots=True, frozen=True)
+class AudioFormat:
+    encoding: str  # "ulaw" or "pcm" (16-bit little-endian)
+    sample_rate: int
+
+    @classmethod
+    def parse(cls, name: str) -> "AudioFormat":
+        encoding, _, rate = name.partition("_")
+        if encoding not in ("ulaw", "pcm") or not rate.isdigit():
+            raise ValueError(f"Unsupported audio format: {name}")
+        if encoding == "ulaw" and rate != "8000":
+            raise ValueError(f"mu-law is only supported at 8000 Hz: {name}")
+        return cls(encoding=encoding, sample_rate=int(rate))
+
+
+def _mulaw_decode_table() -> Any:
+    codes = ~np.arange(256, dtype=np.int32) & 0xFF
+    sign = codes & 0x80
+    exponent = (codes >> 4) & 0x07
+    mantissa = codes & 0x0F
+    magnitude = (((mantissa << 3) + MULAW_DECODE_BIAS) << exponent) - MULAW_DECODE_BIAS
+    return np.where(sign != 0, -magnitude, magnitude).astype(np.int16)
+
+
+def _mulaw_encode_table() -> Any:
+    """
+    mu-law code for every 16-bit sample, indexed by the sample as uint16. Follows
+    the G.711 reference encoder (14-bit magnitudes), as `audioop.lin2ulaw` does.
+    """
+    samples = np.arange(65536, dtype=np.int32)
+    samples = np.where(samples >= 32768, samples - 65536, samples) >> 2
+    mask = np.where(samples < 0, 0x7F, 0xFF)
+    magnitude = np.minimum(np.abs(samples), MULAW_CLIP) + MULAW_BIAS
+    segment = np.searchsorted(MULAW_SEGMENT_ENDS, magnitude)
+    codes = np.where(
+        segment >= len(MULAW_SEGMENT_ENDS),
+        0x7F,
+        (segment << 4) | ((magnitude >> (segment + 1)) & 0x0F),
+    )
+    return ((codes ^ mask) & 0xFF).astype(np.uint8)
+
+
+_tables: Optional[tuple[Any, Any]] = None
+
+
+def _mulaw_tables() -> tuple[Any, Any]:
+    global _tables
+    if _tables is None:
+        _tables = (_mulaw_decode_table(), _mulaw_encode_table())
+    return _tables
+
+
+def _lowpass(taps: int, cutoff: float) -> Any:
+    """Kaiser-windowed sinc, `cutoff` in cycles per sample, unity DC gain."""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = 2 * cutoff * np.sinc(2 * cutoff * n) * np.kaiser(taps, RESAMPLER_KAISER_BETA)
+    return h / h.sum()
+
+
+class PolyphaseResampler:
+    """
+    Streaming integer-ratio resampler for 16-bit PCM, up by `up` or down by `down`.
+
+    Each output sample is a dot product of the newest input window with one
+    polyphase branch of a low-pass FIR, so a chunk is a single matrix product over
+    a strided view of the input. The input tail is kept between chunks, so chunk
+    boundaries are seamless. Work buffers are allocated once and reused.
+    """
+
+    def __init__(
+        self, up: int = 1, down: int = 1, taps_per_phase: int = RESAMPLER_TAPS_PER_PHASE
+    ) -> None:
+        if up < 1 or down < 1 or (up > 1 and down > 1):
+            raise ValueError("Only integer up- or downsampling is supported")
+        self.up = up
+        self.down = down
+        # Input samples each output depends on.
+        self.window = taps_per_phase * down
+        h = _lowpass(taps_per_phase * up * down, 0.5 / max(up, down)) * up
+        # Row j of `branches` weighs the j-th oldest sample of a window; column p
+        # gives output phase p.
+        if down == 1:
+            branches = h.reshape(taps_per_phase, up)[::-1]
+        else:
+            branches = h[::-1].reshape(self.window, 1)
+        self.branches = np.ascontiguousarray(branches, dtype=np.float32)
+        # The last `window - 1` input samples, plus up to `down - 1` not yet
+        # consumed by a decimated output.
+        self.history_length = self.window - 1
+        self._allocate(INITIAL_CHUNK_SAMPLES)
+        self.reset()
+
+    def _allocate(self, chunk: int) -> None:
+        self.capacity = chunk
+        self.samples = np.zeros(self.window - 1 + self.down - 1 + chunk, np.float32)
+        self.output = np.empty((chunk // self.down + 1, self.up), np.float32)
+        self.pcm = np.empty(self.output.size, np.int16)
+
+    def reset(self) -> None:
+        self.samples[:] = 0
+        self.history_length = self.window - 1
+
+    def process(self, pcm: Any) -> Any:
+        """
+        Resamples int16 `pcm`. Returns a view of an internal buffer, valid until the
+        next call.
+        """
+        count = len(pcm)
+        if count > self.capacity:
+            history = self.samples[: self.history_length].copy()
+            self._allocate(count)
+            self.samples[: len(history)] = history
+        end = self.history_length + count
+        self.samples[self.history_length : end] = pcm
+        outputs = (end - self.window) // self.down + 1
+        if outputs <= 0:
+            self.history_length = end
+            return self.pcm[:0]
+
+        windows = np.lib.stride_tricks.sliding_window_view(
+            self.samples[:end], self.window
+        )[:: self.down][:outputs]
+        output = self.output[:outputs]
+        np.matmul(windows, self.branches, out=output)
+        np.rint(output, out=output)
+        np.clip(output, -32768, 32767, out=output)
+        result = self.pcm[: output.size]
+        np.copyto(result, output.reshape(-1), casting="unsafe")
+
+        consumed = outputs * self.down
+        self.history_length = end - consumed
+        # Source and destination overlap only when history is longer than what
+        # was consumed, and copyto handles the overlap.
+        np.copyto(self.samples[: self.history_length], self.samples[consumed:end])
+        return result
+
+
+class AudioTranscoder:
+    """
+    Converts one direction of a call's audio between two formats: mu-law <-> PCM16
+    through lookup tables, and 8 kHz <-> 16/24 kHz with a `PolyphaseResampler`.
+    Identical formats pass straight through.
+
+    Not thread-safe; each direction of a call has its own transcoder, used from one
+    thread.
+    """
+
+    def __init__(self, source: AudioFormat, target: AudioFormat) -> None:
+        self.source = source
+        self.target = target
+        self.passthrough = source == target
+        self.resampler: Optional[PolyphaseResampler] = None
+        if self.passthrough:
+            return
+        if np is None:
+            raise RuntimeError(
+                f"numpy is required to convert {source} audio to {target}"
+            )
+        self.decode_table, self.encode_table = _mulaw_tables()
+        if source.sample_rate != target.sample_rate:
+            high = max(source.sample_rate, target.sample_rate)
+            low = min(source.sample_rate, target.sample_rate)
+            if high % low:
+                raise ValueError(
+                    f"Cannot resample {source.sample_rate} Hz to {target.sample_rate} Hz"
+                )
+            ratio = high // low
+            self.resampler = (
+                PolyphaseResampler(up=ratio)
+                if target.sample_rate > source.sample_rate
+                else PolyphaseResampler(down=ratio)
+            )
+        self.leftover = b""
+        self.pcm = np.empty(INITIAL_CHUNK_SAMPLES, np.int16)
+        self.ulaw = np.empty(INITIAL_CHUNK_SAMPLES, np.uint8)
+
+    def reset(self) -> None:
+        """Drops filter state, e.g. when queued audio is discarded."""
+        if self.resampler is not None:
+            self.resampler.reset()
+        if not self.passthrough:
+            self.leftover = b""
+
+    def convert(self, audio: bytes) -> bytes:
+        if self.passthrough:
+            return audio
+
+        if self.source.encoding == "ulaw":
+            codes = np.frombuffer(audio, np.uint8)
+            if len(codes) > len(self.pcm):
+                self.pcm = np.empty(len(codes), np.int16)
+            pcm = self.pcm[: len(codes)]
+            np.take(self.decode_table, codes, out=pcm)
+        else:
+            if self.leftover:
+                audio = self.leftover + audio
+                self.leftover = b""
+            if len(audio) % 2:
+                # A sample split across chunks; finish it with the next one.
+                self.leftover = audio[-1:]
+                audio = audio[:-1]
+            pcm = np.frombuffer(audio, "<i2")
+
+        if self.resampler is not None:
+            pcm = self.resampler.process(pcm)
+
+        if self.target.encoding == "ulaw":
+            if len(pcm) > len(self.ulaw):
+                self.ulaw = np.empty(len(pcm), np.uint8)
+            codes = self.ulaw[: len(pcm)]
+            np.take(self.encode_table, pcm.view(np.uint16), out=codes)
+            return codes.tobytes()
+        return pcm.astype("<i2", copy=False).tobytes()
+
+
+def create_transcoders(
+    input_format: str = ELEVENLABS_INPUT_AUDIO_FORMAT,
+    output_format: str = ELEVENLABS_OUTPUT_AUDIO_FORMAT,
+) -> tuple[AudioTranscoder, AudioTranscoder]:
+    """
+    Transcoders for caller audio going to the agent and agent audio going to Twilio.
+    """
+    twilio = AudioFormat.parse(TWILIO_AUDIO_FORMAT)
+    return (
+        AudioTranscoder(twilio, AudioFormat.parse(input_format)),
+        AudioTranscoder(AudioFormat.parse(output_format), twilio),
+    )
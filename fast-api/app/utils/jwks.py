@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+import time
+from typing import Any, Optional
+from urllib.parse import urlparse
+import jwt
+from app.utils.env import env_float
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Supabase publishes its signing keys at
+# https://{project-id}.supabase.co/auth/v1/.well-known/jwks.json
+# A local path or file:// URL can be used instead, e.g. for tests or air-gapped setups.
+JWKS_URL = os.environ.get("JWKS_URL")
+JWKS_REFRESH_INTERVAL = env_float("JWKS_REFRESH_INTERVAL", 600.0)
+# Unknown kids trigger a background refresh, at most this often.
+JWKS_MIN_REFRESH_INTERVAL = env_float("JWKS_MIN_REFRESH_INTERVAL", 30.0)
+JWKS_FETCH_TIMEOUT = env_float("JWKS_FETCH_TIMEOUT", 5.0)
+
+
+class JWKSKeySet:
+    """
+    Parsed signing keys from a JWKS document, indexed by `kid`.
+
+    Keys are only ever fetched by `refresh`, which runs at startup, on a background
+    interval and (rate limited, in the background) when a token names an unknown
+    `kid`. `get` never does I/O, so verification stays off the network.
+    """
+
+    def __init__(
+        self,
+        url: str,
+        refresh_interval: float = JWKS_REFRESH_INTERVAL,
+        min_refresh_interval: float = JWKS_MIN_REFRESH_INTERVAL,
+    ) -> None:
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.keys: dict[str, jwt.PyJWK] = {}
+        self.last_refresh = 0.0
+        self.refresh_task: Optional[asyncio.Task[None]] = None
+        self.background_task: Optional[asyncio.Task[None]] = None
+
+    async def start(self) -> None:
+        await self.refresh()
+        self.background_task = asyncio.create_task(self._refresh_periodically())
+
+    async def close(self) -> None:
+        for task in (self.background_task, self.refresh_task):
+            if task is not None:
+                task.cancel()
+
+    def get(self, kid: Optional[str]) -> Optional[jwt.PyJWK]:
+        key = self.keys.get(kid or "")
+        if key is None:
+            self._schedule_refresh()
+        return key
+
+    async def refresh(self) -> None:
+        self.last_refresh = time.monotonic()
+        try:
+            document = await self._load()
+            key_set = jwt.PyJWKSet.from_dict(document)
+        except Exception as e:
+            logger.error(f"Failed to load JWKS from {self.url}: {e}")
+            return
+        self.keys = {key.key_id: key for key in key_set.keys if key.key_id}
+        logger.info(f"Loaded {len(self.keys)} signing keys from JWKS")
+
+    async def _load(self) -> dict[str, Any]:
+        parsed = urlparse(self.url)
+        if parsed.scheme in ("http", "https"):
+            import httpx
+
+            async with httpx.AsyncClient(timeout=JWKS_FETCH_TIMEOUT) as client:
+                response = await client.get(self.url)
+                response.raise_for_status()
+                document: dict[str, Any] = response.json()
+                return document
+        path = parsed.path if parsed.scheme == "file" else self.url
+        contents = await asyncio.to_thread(_read_file, path)
+        file_document: dict[str, Any] = json.loads(contents)
+        return file_document
+
+    def _schedule_refresh(self) -> None:
+        if self.refresh_task is not None and not self.refresh_task.done():
+            return
+        if time.monotonic() - self.last_refresh < self.min_refresh_interval:
+            return
+        try:
+            self.refresh_task = asyncio.get_running_loop().create_task(self.refresh())
+        except RuntimeError:
+            pass  # No running loop, the periodic refresh will pick the key up.
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.refresh_interval)
+            await self.refresh()
+
+
+def _read_file(path: str) -> str:
+    with open(path) as f:
+        return f.read()
+
+
+jwks_key_set: Optional[JWKSKeySet] = JWKSKeySet(JWKS_URL) if JWKS_URL else None
@@ -1,22 +1,188 @@
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
+import os
+import queue
 import sys
-from typing import Literal
+import threading
+import time
+from contextvars import ContextVar
+from typing import Any, Optional
+from app.utils.env import env_float, env_int
 
+# text writes formatted lines to stdout from the logging thread, as before. queue
+# and json hand records to a background writer thread instead, so a slow stdout
+# never blocks the event loop or the ElevenLabs threads; json writes one JSON object
+# per line.
+LOG_MODE = os.environ.get("LOG_MODE", "text")
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+# Records waiting for the writer thread. When it is full new records are dropped
+# rather than blocking the caller.
+LOG_QUEUE_SIZE = env_int("LOG_QUEUE_SIZE", 10000)
+# Chatty per-call messages are rate limited to this many per second for each call
+# and message, after an initial burst.
+LOG_SAMPLE_RATE = env_float("LOG_SAMPLE_RATE", 1.0)
+LOG_SAMPLE_BURST = env_int("LOG_SAMPLE_BURST", 10)
 
-def setup_logging(level: Literal[20] = logging.INFO) -> logging.Logger:
+LOG_FORMAT = "%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+LOG_DATE_FORMAT = "%Y-%m-%dT%H:%M:%S%z"
+
+# Call SID of the request or media stream being handled, added to every record
+# logged from it. Threads do not inherit it, so code running on the ElevenLabs
+# threads passes `extra={"call_sid": ...}` instead.
+call_sid_context: ContextVar[Optional[str]] = ContextVar("call_sid", default=None)
+
+# Attributes every LogRecord has; anything else was passed in `extra`.
+_RECORD_ATTRIBUTES = frozenset(
+    logging.LogRecord("", 0, "", 0, "", None, None).__dict__
+) | {"message", "asctime"}
+
+
+class CallContextFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        if getattr(record, "call_sid", None) is None:
+            record.call_sid = call_sid_context.get()
+        return True
+
+
+class JSONFormatter(logging.Formatter):
+    """
+    One JSON object per record, with any `extra` fields such as `call_sid` as keys.
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: dict[str, Any] = {
+            "time": self.formatTime(record, self.datefmt),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for name, value in record.__dict__.items():
+            if name not in _RECORD_ATTRIBUTES and value is not None:
+                entry[name] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Only interpolates the message on the calling thread, leaving formatting and
+    tracebacks to the writer thread, and drops records when the queue is full.
+    """
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]") -> None:
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        # Arguments may be mutated once the caller moves on, so render them now.
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class CallLogSampler:
+    """
+    Token bucket per call and message. Lets the first `burst` records of a message
+    through, then `rate` per second, and counts the rest so the number suppressed
+    can be reported when the call ends.
+    """
+
+    def __init__(self, rate: float = LOG_SAMPLE_RATE, burst: int = LOG_SAMPLE_BURST):
+        self.rate = rate
+        self.burst = burst
+        self.lock = threading.Lock()
+        self.buckets: dict[str, dict[str, list[float]]] = {}
+        self.suppressed: dict[str, int] = {}
+
+    def allow(self, call_sid: str, message: str) -> bool:
+        now = time.monotonic()
+        with self.lock:
+            buckets = self.buckets.setdefault(call_sid, {})
+            bucket = buckets.get(message)
+            if bucket is None:
+                buckets[message] = [self.burst - 1.0, now]
+                return True
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+            if tokens >= 1.0:
+                bucket[0] = tokens - 1.0
+                return True
+            bucket[0] = tokens
+            self.suppressed[call_sid] = self.suppressed.get(call_sid, 0) + 1
+            return False
+
+    def end_call(self, call_sid: str) -> int:
+        """Forgets the call and returns how many of its records were suppressed."""
+        with self.lock:
+            self.buckets.pop(call_sid, None)
+            return self.suppressed.pop(call_sid, 0)
+
+
+call_log_sampler = CallLogSampler()
+
+
+def log_sampled(
+    logger: logging.Logger, level: int, call_sid: str, message: str, *args: Any
+) -> None:
+    """
+    Logs `message % args` for a call, subject to the per-call rate limit. Nothing
+    is formatted when the level is disabled or the record is sampled out.
+    """
+    if logger.isEnabledFor(level) and call_log_sampler.allow(call_sid, message):
+        logger.log(level, message, *args, extra={"call_sid": call_sid})
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def setup_logging(
+    level: int | str = LOG_LEVEL, mode: str = LOG_MODE
+) -> logging.Logger:
 
     logger = logging.getLogger()
     logger.setLevel(level)
 
-    formatter = logging.Formatter(
-        "%(asctime)s - %(name)s - %(levelname)s - %(message)s",
-        datefmt="%Y-%m-%dT%H:%M:%S%z",
-    )
+    formatter: logging.Formatter
+    if mode == "json":
+        formatter = JSONFormatter(datefmt=LOG_DATE_FORMAT)
+    else:
+        formatter = logging.Formatter(LOG_FORMAT, datefmt=LOG_DATE_FORMAT)
 
-    handler = logging.StreamHandler(sys.stdout)
+    handler: logging.Handler = logging.StreamHandler(sys.stdout)
     handler.setFormatter(formatter)
 
+    _stop_listener()
+    if mode in ("queue", "json"):
+        global _listener
+        log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(LOG_QUEUE_SIZE)
+        _listener = logging.handlers.QueueListener(log_queue, handler)
+        _listener.start()
+        handler = NonBlockingQueueHandler(log_queue)
+    handler.addFilter(CallContextFilter())
+
     logger.handlers.clear()
     logger.addHandler(handler)
 
     return logger
+
+
+# Writes out whatever is still queued when the process exits.
+atexit.register(_stop_listener)
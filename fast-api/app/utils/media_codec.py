@@ -0,0 +1,200 @@
+import binascii
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, Union
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import msgspec
+except ImportError:  # pragma: no cover - optional fast path
+    msgspec = None  # type: ignore[assignment]
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional fast path
+    orjson = None  # type: ignore[assignment]
+
+# auto picks msgspec, then orjson, then the stdlib json module.
+MEDIA_CODEC = os.environ.get("MEDIA_CODEC", "auto")
+
+
+# Typed Twilio media stream events: https://www.twilio.com/docs/voice/media-streams/websocket-messages
+@dataclass(slots=True)
+class StartEvent:
+    stream_sid: str
+    call_sid: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MediaEvent:
+    payload: str
+    timestamp: Optional[str] = None
+
+
+@dataclass(slots=True)
+class StopEvent:
+    stream_sid: Optional[str] = None
+
+
+@dataclass(slots=True)
+class MarkEvent:
+    name: str
+    stream_sid: Optional[str] = None
+
+
+@dataclass(slots=True)
+class OtherEvent:
+    event: Optional[str]
+
+
+TwilioEvent = Union[StartEvent, MediaEvent, StopEvent, MarkEvent, OtherEvent]
+
+
+def _event_from_dict(data: dict[str, Any]) -> TwilioEvent:
+    event = data.get("event")
+    if event == "media":
+        media = data["media"]
+        return MediaEvent(payload=media["payload"], timestamp=media.get("timestamp"))
+    if event == "start":
+        start = data["start"]
+        return StartEvent(stream_sid=start["streamSid"], call_sid=start.get("callSid"))
+    if event == "stop":
+        return StopEvent(stream_sid=data.get("streamSid"))
+    if event == "mark":
+        return MarkEvent(name=data["mark"]["name"], stream_sid=data.get("streamSid"))
+    return OtherEvent(event=event)
+
+
+def decode_audio(payload: str) -> bytes:
+    return binascii.a2b_base64(payload)
+
+
+def encode_audio(audio: bytes) -> str:
+    return binascii.b2a_base64(audio, newline=False).decode("ascii")
+
+
+class MediaMessageTemplate:
+    """
+    Outbound `media` message with everything but the payload serialized up front, so
+    each frame is one base64 encode and a string join instead of a JSON dump.
+    """
+
+    __slots__ = ("prefix", "suffix")
+
+    def __init__(self, stream_sid: str, dumps: Callable[[Any], str]) -> None:
+        # base64 output never needs JSON escaping, only the stream SID does.
+        self.prefix = '{"event":"media","streamSid":%s,"media":{"payload":"' % dumps(
+            stream_sid
+        )
+        self.suffix = '"}}'
+
+    def render(self, audio: bytes) -> str:
+        return self.prefix + encode_audio(audio) + self.suffix
+
+
+class MediaCodec:
+    """Stdlib codec, always available."""
+
+    name = "stdlib"
+
+    def decode(self, message: Union[str, bytes]) -> TwilioEvent:
+        return _event_from_dict(json.loads(message))
+
+    def dumps(self, message: Any) -> str:
+        return json.dumps(message, separators=(",", ":"))
+
+    def media_template(self, stream_sid: str) -> MediaMessageTemplate:
+        return MediaMessageTemplate(stream_sid, self.dumps)
+
+
+class OrjsonMediaCodec(MediaCodec):
+    name = "orjson"
+
+    def decode(self, message: Union[str, bytes]) -> TwilioEvent:
+        return _event_from_dict(orjson.loads(message))
+
+    def dumps(self, message: Any) -> str:
+        return orjson.dumps(message).decode("utf-8")
+
+
+if msgspec is not None:
+
+    class _MediaPayload(msgspec.Struct):
+        payload: str
+        timestamp: Optional[str] = None
+
+    class _StartPayload(msgspec.Struct):
+        streamSid: str
+        callSid: Optional[str] = None
+
+    class _MarkPayload(msgspec.Struct):
+        name: str
+
+    class _MediaWire(msgspec.Struct, tag_field="event", tag="media"):
+        media: _MediaPayload
+
+    class _StartWire(msgspec.Struct, tag_field="event", tag="start"):
+        start: _StartPayload
+
+    class _StopWire(msgspec.Struct, tag_field="event", tag="stop"):
+        streamSid: Optional[str] = None
+
+    class _MarkWire(msgspec.Struct, tag_field="event", tag="mark"):
+        mark: _MarkPayload
+        streamSid: Optional[str] = None
+
+    _Wire = Union[_MediaWire, _StartWire, _StopWire, _MarkWire]
+
+
+class MsgspecMediaCodec(MediaCodec):
+    """
+    Decodes straight into typed structs, skipping the intermediate dicts. Events we
+    do not model (`connected`, `dtmf`, ...) fall back to a generic decode.
+    """
+
+    name = "msgspec"
+
+    def __init__(self) -> None:
+        self.decoder = msgspec.json.Decoder(_Wire)
+        self.encoder = msgspec.json.Encoder()
+
+    def decode(self, message: Union[str, bytes]) -> TwilioEvent:
+        try:
+            wire = self.decoder.decode(message)
+        except msgspec.ValidationError:
+            return _event_from_dict(msgspec.json.decode(message))
+
+        if isinstance(wire, _MediaWire):
+            return MediaEvent(payload=wire.media.payload, timestamp=wire.media.timestamp)
+        if isinstance(wire, _StartWire):
+            return StartEvent(stream_sid=wire.start.streamSid, call_sid=wire.start.callSid)
+        if isinstance(wire, _StopWire):
+            return StopEvent(stream_sid=wire.streamSid)
+        return MarkEvent(name=wire.mark.name, stream_sid=wire.streamSid)
+
+    def dumps(self, message: Any) -> str:
+        return self.encoder.encode(message).decode("utf-8")
+
+
+def create_media_codec(name: str = MEDIA_CODEC) -> MediaCodec:
+    if name in ("auto", "msgspec") and msgspec is not None:
+        return MsgspecMediaCodec()
+    if name in ("auto", "orjson") and orjson is not None:
+        return OrjsonMediaCodec()
+    if name not in ("auto", "stdlib"):
+        logger.warning(f"Media codec {name} is not installed, using stdlib json")
+    return MediaCodec()
+
+
+_media_codec: Optional[MediaCodec] = None
+
+
+def get_media_codec() -> MediaCodec:
+    global _media_codec
+    if _media_codec is None:
+        _media_codec = create_media_codec()
+        logger.info(f"Using {_media_codec.name} media codec")
+    return _media_codec
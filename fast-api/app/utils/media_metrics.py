@@ -0,0 +1,230 @@
+import time
+from bisect import bisect_left
+from typing import Any, List, Optional, Sequence
+
+# Bucket upper bounds. Per-call histograms share them with the process-wide ones so
+# a finished call can be merged in by adding counts.
+DECODE_BUCKETS = (1e-6, 2.5e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 1e-3, 1e-2)
+SEND_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+FIRST_AUDIO_BUCKETS = (0.1, 0.25, 0.5, 1.0, 1.5, 2.0, 3.0, 5.0, 10.0, 30.0)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200, 500)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram. `observe` is a bisect and two additions, cheap enough to
+    call for every 20 ms media frame.
+    """
+
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # The last slot is +Inf.
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def merge(self, other: "Histogram") -> None:
+        for i, count in enumerate(other.counts):
+            self.counts[i] += count
+        self.sum += other.sum
+        self.count += other.count
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Upper bound of the bucket holding the q-quantile, None if empty."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+    def summary(self, scale: float = 1.0) -> dict[str, Any]:
+        def scaled(value: Optional[float]) -> Optional[float]:
+            return None if value is None else round(value * scale, 3)
+
+        return {
+            "count": self.count,
+            "avg": scaled(self.sum / self.count) if self.count else None,
+            "p50": scaled(self.quantile(0.5)),
+            "p99": scaled(self.quantile(0.99)),
+        }
+
+
+class CallMediaMetrics:
+    """
+    Media stream measurements for one call. Histograms are only touched from the
+    event loop; the counters bumped by the ElevenLabs thread are plain ints.
+    """
+
+    def __init__(self) -> None:
+        self.started_at = time.monotonic()
+        self.stream_started_at: Optional[float] = None
+        self.first_audio_seconds: Optional[float] = None
+        self.inbound_frames = 0
+        self.outbound_messages = 0
+        self.dropped_chunks = 0
+        self.cleared_frames = 0
+        self.interruptions = 0
+        self.message_decode = Histogram(DECODE_BUCKETS)
+        self.audio_decode = Histogram(DECODE_BUCKETS)
+        self.input_callback = Histogram(DECODE_BUCKETS)
+        self.queue_depth = Histogram(QUEUE_DEPTH_BUCKETS)
+        self.send_latency = Histogram(SEND_LATENCY_BUCKETS)
+
+    def stream_started(self) -> None:
+        self.stream_started_at = time.monotonic()
+
+    def audio_sent(self, now: float) -> None:
+        self.outbound_messages += 1
+        if self.first_audio_seconds is None:
+            self.first_audio_seconds = now - (self.stream_started_at or self.started_at)
+
+    def summary(self) -> dict[str, Any]:
+        duration = time.monotonic() - self.started_at
+        return {
+            "duration_s": round(duration, 3),
+            "inbound_frames": self.inbound_frames,
+            "inbound_fps": round(self.inbound_frames / duration, 1) if duration else 0,
+            "outbound_messages": self.outbound_messages,
+            "first_audio_ms": (
+                round(self.first_audio_seconds * 1000, 1)
+                if self.first_audio_seconds is not None
+                else None
+            ),
+            "dropped_chunks": self.dropped_chunks,
+            "cleared_frames": self.cleared_frames,
+            "interruptions": self.interruptions,
+            "message_decode_us": self.message_decode.summary(scale=1e6),
+            "audio_decode_us": self.audio_decode.summary(scale=1e6),
+            "input_callback_us": self.input_callback.summary(scale=1e6),
+            "queue_depth": self.queue_depth.summary(),
+            "send_latency_ms": self.send_latency.summary(scale=1e3),
+        }
+
+
+class MediaMetrics:
+    """
+    Process-wide totals. Calls are merged in when they end, so a scrape costs the
+    same however many frames have been handled.
+    """
+
+    HISTOGRAMS = (
+        (
+            "message_decode",
+            "twilio_media_message_decode_seconds",
+            "Media message JSON decode time",
+        ),
+        (
+            "audio_decode",
+            "twilio_media_audio_decode_seconds",
+            "Inbound audio base64 decode time",
+        ),
+        (
+            "input_callback",
+            "twilio_media_input_callback_seconds",
+            "Time spent in the ElevenLabs input callback",
+        ),
+        (
+            "queue_depth",
+            "twilio_media_output_queue_depth",
+            "Output queue depth when agent audio is enqueued",
+        ),
+        (
+            "send_latency",
+            "twilio_media_send_latency_seconds",
+            "Agent audio enqueue to send latency",
+        ),
+    )
+    COUNTERS = (
+        ("inbound_frames", "twilio_media_inbound_frames_total", "Inbound media frames"),
+        (
+            "outbound_messages",
+            "twilio_media_outbound_messages_total",
+            "Outbound media messages",
+        ),
+        (
+            "dropped_chunks",
+            "twilio_media_dropped_chunks_total",
+            "Agent audio chunks dropped on backpressure",
+        ),
+        (
+            "cleared_frames",
+            "twilio_media_cleared_frames_total",
+            "Queued agent audio frames discarded by interruptions",
+        ),
+        ("interruptions", "twilio_media_interruptions_total", "Agent interruptions"),
+    )
+
+    def __init__(self) -> None:
+        self.active_calls = 0
+        self.calls = 0
+        self.totals = {attribute: 0 for attribute, _, _ in self.COUNTERS}
+        self.histograms = CallMediaMetrics()
+        self.first_audio = Histogram(FIRST_AUDIO_BUCKETS)
+
+    def call_started(self) -> None:
+        self.active_calls += 1
+
+    def call_finished(self, call: CallMediaMetrics) -> None:
+        self.active_calls -= 1
+        self.calls += 1
+        for attribute in self.totals:
+            self.totals[attribute] += getattr(call, attribute)
+        for attribute, _, _ in self.HISTOGRAMS:
+            getattr(self.histograms, attribute).merge(getattr(call, attribute))
+        if call.first_audio_seconds is not None:
+            self.first_audio.observe(call.first_audio_seconds)
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def metric(name: str, kind: str, help_text: str, value: float) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {value}")
+
+        def histogram(name: str, help_text: str, values: Histogram) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            cumulative = 0
+            for bound, count in zip(values.buckets, values.counts):
+                cumulative += count
+                lines.append(f'{name}_bucket{{le="{bound}"}} {cumulative}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {values.count}')
+            lines.append(f"{name}_sum {values.sum}")
+            lines.append(f"{name}_count {values.count}")
+
+        metric(
+            "twilio_media_active_calls",
+            "gauge",
+            "Media streams in progress",
+            self.active_calls,
+        )
+        metric(
+            "twilio_media_calls_total", "counter", "Media streams finished", self.calls
+        )
+        for attribute, name, help_text in self.COUNTERS:
+            metric(name, "counter", help_text, self.totals[attribute])
+        for attribute, name, help_text in self.HISTOGRAMS:
+            histogram(name, help_text, getattr(self.histograms, attribute))
+        histogram(
+            "twilio_media_first_audio_seconds",
+            "Stream start to first agent audio sent",
+            self.first_audio,
+        )
+        return "\n".join(lines) + "\n"
+
+
+media_metrics = MediaMetrics()
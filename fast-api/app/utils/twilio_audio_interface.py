@@ -1,96 +1,393 @@
 import asyncio
+from collections import deque
 from typing import Any, Callable, Optional
-import queue
 import threading
-import base64
+import time
 from elevenlabs.conversational_ai.conversation import AudioInterface
 from fastapi import WebSocket
+from app.utils.env import env_float, env_int
+from app.utils.logger import log_sampled
+from app.utils.audio_transcoder import AudioTranscoder, create_transcoders
+from app.utils.media_metrics import CallMediaMetrics
+from app.utils.media_codec import (
+    MediaCodec,
+    MediaEvent,
+    MediaMessageTemplate,
+    StartEvent,
+    TwilioEvent,
+    decode_audio,
+    get_media_codec,
+)
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Upper bound on audio chunks waiting to be sent to Twilio. Once it is reached, `output`
+# blocks the ElevenLabs receive thread (for at most the backpressure timeout) instead
+# of letting the queue grow without limit.
+OUTPUT_QUEUE_MAX_CHUNKS = env_int("TWILIO_OUTPUT_QUEUE_MAX_CHUNKS", 500)
+OUTPUT_BACKPRESSURE_TIMEOUT = env_float("TWILIO_OUTPUT_BACKPRESSURE_TIMEOUT", 1.0)
+# Outbound audio is re-chunked into 20 ms frames. Several frames can be batched into
+# one `media` message, and the pacer may run up to the jitter buffer depth ahead of
+# real-time playout so that Twilio never starves.
+OUTPUT_FRAMES_PER_MESSAGE = env_int("TWILIO_OUTPUT_FRAMES_PER_MESSAGE", 1)
+JITTER_BUFFER_FRAMES = env_int("TWILIO_JITTER_BUFFER_FRAMES", 5)
+# Agent audio kept while the websocket is detached, waiting for Twilio to reconnect.
+# Only the most recent frames are kept (default 5 s).
+RESUME_BUFFER_FRAMES = env_int("TWILIO_RESUME_BUFFER_FRAMES", 250)
+
+FRAME_DURATION = 0.02
+FRAME_BYTES = 160  # 20 ms of 8 kHz mu-law
+MULAW_SILENCE = b"\xff"
+
+
+class OutboundFramePacer:
+    """
+    Re-chunks outbound mu-law audio into fixed-size frames and paces them on a
+    real-time clock. `playout_end` tracks when Twilio will have played everything
+    sent so far; the next message is due once that is within the jitter buffer lead.
+    """
+
+    def __init__(
+        self,
+        frames_per_message: int = OUTPUT_FRAMES_PER_MESSAGE,
+        jitter_buffer_frames: int = JITTER_BUFFER_FRAMES,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.buffer = bytearray()
+        self.message_bytes = FRAME_BYTES * max(frames_per_message, 1)
+        self.message_duration = FRAME_DURATION * max(frames_per_message, 1)
+        self.lead = FRAME_DURATION * max(jitter_buffer_frames, 0)
+        self.clock = clock
+        self.playout_end: Optional[float] = None
+
+    def write(self, audio: bytes) -> None:
+        self.buffer += audio
+
+    def ready(self) -> bool:
+        return len(self.buffer) >= self.message_bytes
+
+    def pending(self) -> bool:
+        return len(self.buffer) > 0
+
+    def pad(self) -> None:
+        """
+        Completes a trailing partial message with silence so the tail of an utterance
+        is not held back waiting for audio that may never come.
+        """
+        remainder = len(self.buffer) % self.message_bytes
+        if remainder:
+            self.buffer += MULAW_SILENCE * (self.message_bytes - remainder)
+
+    def delay(self) -> float:
+        if self.playout_end is None:
+            return 0.0
+        return max(0.0, self.playout_end - self.lead - self.clock())
+
+    def take(self) -> bytes:
+        message = bytes(self.buffer[: self.message_bytes])
+        del self.buffer[: self.message_bytes]
+        now = self.clock()
+        start = now if self.playout_end is None else max(self.playout_end, now)
+        self.playout_end = start + FRAME_DURATION * len(message) / FRAME_BYTES
+        return message
+
+    def reset(self) -> None:
+        self.buffer.clear()
+        self.playout_end = None
+
 
 class TwilioAudioInterface(AudioInterface):
+    """
+    Bridges the ElevenLabs `Conversation` and a Twilio media stream websocket.
+
+    ElevenLabs calls `start`, `output` and `interrupt` from its own session thread. Those
+    calls are handed to the event loop that owns the websocket, where a single sender
+    task per call drains the output queue, so no extra thread or event loop is created.
+    """
 
-    def __init__(self, websocket: WebSocket) -> None:
+    def __init__(
+        self,
+        websocket: WebSocket,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        codec: Optional[MediaCodec] = None,
+        call_sid: Optional[str] = None,
+        transcoders: Optional[tuple[AudioTranscoder, AudioTranscoder]] = None,
+        resumable: bool = False,
+    ) -> None:
         self.websocket: WebSocket = websocket
-        self.output_queue: queue.Queue[bytes] = queue.Queue()
-        self.should_stop: threading.Event = threading.Event()
+        # Sent with every log record, which may come from the ElevenLabs thread.
+        self.call_sid = call_sid
+        self.log_extra = {"call_sid": call_sid}
+        self.loop: asyncio.AbstractEventLoop = loop or asyncio.get_running_loop()
+        self.codec: MediaCodec = codec or get_media_codec()
+        self.media_template: Optional[MediaMessageTemplate] = None
+        # Caller audio to the agent's input format, and agent audio back to mu-law.
+        # Both pass audio through untouched when the agent uses ulaw_8000.
+        self.input_transcoder, self.output_transcoder = (
+            transcoders or create_transcoders()
+        )
+        # Chunks are queued with the monotonic time `output` received them.
+        self.output_queue: asyncio.Queue[tuple[bytes, float]] = asyncio.Queue()
+        self.output_slots = threading.BoundedSemaphore(OUTPUT_QUEUE_MAX_CHUNKS)
         self.stream_sid: Optional[str] = None
         self.input_callback: Optional[Callable[[bytes], None]] = None
-        self.output_thread: Optional[threading.Thread] = None
+        self.sender_task: Optional[asyncio.Task[None]] = None
+        self.clear_task: Optional[asyncio.Task[None]] = None
+        self.pacer = OutboundFramePacer()
         self.is_running: bool = False
+        self.metrics = CallMediaMetrics()
+        # Pacer byte offset at which each buffered chunk starts, with its enqueue
+        # time, so the send of its first byte can be timed.
+        self.chunk_offsets: deque[tuple[int, float]] = deque()
+        self.bytes_buffered = 0
+        self.bytes_sent = 0
+        # Set while the websocket has dropped and the call may still resume. Agent
+        # audio then goes to a ring buffer instead of the sender.
+        self.detached = False
+        # With resume enabled, a failed send detaches instead of stopping, so the
+        # agent keeps talking and listening if the call resumes.
+        self.resumable = resumable
+        self.resume_buffer: deque[bytes] = deque()
+        self.resume_buffer_bytes = 0
+        self.resume_buffer_limit = RESUME_BUFFER_FRAMES * FRAME_BYTES
+        self._loop_thread_id: int = threading.get_ident()
+
+    def _log_sampled(self, level: int, message: str, *args: Any) -> None:
+        # Repeated per-chunk messages are rate limited for each call.
+        log_sampled(logger, level, self.call_sid or "", message, *args)
+
+    def _call_on_loop(self, callback: Callable[[], None]) -> None:
+        if threading.get_ident() == self._loop_thread_id:
+            callback()
+        elif not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(callback)
 
     def start(self, input_callback: Callable[[bytes], None]) -> None:
-        logger.info("Starting audio interface")
-        self.should_stop.clear()
+        logger.info("Starting audio interface", extra=self.log_extra)
         self.input_callback = input_callback
-        self.is_running = True  # Set before starting thread
-        self.output_thread = threading.Thread(target=self._output_thread)
-        self.output_thread.daemon = True
-        self.output_thread.start()
-        logger.info("Audio interface started")
+        self.is_running = True
+        self._call_on_loop(self._start_sender)
+        logger.info("Audio interface started", extra=self.log_extra)
+
+    def _start_sender(self) -> None:
+        if self.sender_task is None or self.sender_task.done():
+            self.sender_task = self.loop.create_task(self._sender())
 
     def stop(self) -> None:
         self.is_running = False
-        self.should_stop.set()
-        self.interrupt()
+        self._call_on_loop(lambda: self._flush_output(send_clear=False))
+        self._call_on_loop(self._stop_sender)
         self.input_callback = None
         self.stream_sid = None
+        self.media_template = None
+
+    def _stop_sender(self) -> None:
+        if self.sender_task is not None:
+            self.sender_task.cancel()
+            self.sender_task = None
 
     def output(self, audio: bytes) -> None:
-        if self.is_running:
-            self.output_queue.put(audio)
+        if not self.is_running:
+            return
+        # Converted on the ElevenLabs thread, so the event loop only sees mu-law.
+        audio = self.output_transcoder.convert(audio)
+        if not audio:
+            return
+        # Never block the event loop itself; only the ElevenLabs thread waits for room.
+        timeout = (
+            0 if threading.get_ident() == self._loop_thread_id else OUTPUT_BACKPRESSURE_TIMEOUT
+        )
+        if not self.output_slots.acquire(timeout=timeout):
+            self.metrics.dropped_chunks += 1
+            self._log_sampled(logging.WARNING, "Output queue full, dropping audio chunk")
+            return
+        enqueued_at = time.monotonic()
+        self._call_on_loop(lambda: self._enqueue(audio, enqueued_at))
+
+    def _enqueue(self, audio: bytes, enqueued_at: float) -> None:
+        if self.detached:
+            self.output_slots.release()
+            self._buffer_for_resume(audio)
+            return
+        self.output_queue.put_nowait((audio, enqueued_at))
+        self.metrics.queue_depth.observe(self.output_queue.qsize())
 
     def interrupt(self) -> None:
-        try:
-            while True:
-                self.output_queue.get_nowait()
-        except queue.Empty:
-            pass
+        self.output_transcoder.reset()
+        self._call_on_loop(lambda: self._flush_output(send_clear=True))
+
+    def _flush_output(self, send_clear: bool) -> None:
+        """
+        Drops all queued and paced audio. On an interruption Twilio is also told to
+        clear what it has already buffered so the agent stops talking immediately.
+        """
+        discarded = len(self.pacer.buffer)
+        while True:
+            try:
+                audio, _ = self.output_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            discarded += len(audio)
+            self.output_slots.release()
+        self.pacer.reset()
+        self.chunk_offsets.clear()
+        self.bytes_buffered = self.bytes_sent = 0
+        discarded += self.resume_buffer_bytes
+        self.resume_buffer.clear()
+        self.resume_buffer_bytes = 0
+        if send_clear:
+            self.metrics.interruptions += 1
+            self.metrics.cleared_frames += discarded // FRAME_BYTES
+        if send_clear and self.is_running:
+            self.clear_task = self.loop.create_task(self._send_clear_message())
 
-    async def handle_twilio_message(self, data: dict[str, Any]) -> None:
+    async def handle_twilio_message(self, event: TwilioEvent) -> None:
         try:
-            event_type = data.get("event")
-            if event_type == "start":
-                self.stream_sid = data["start"]["streamSid"]
+            if isinstance(event, MediaEvent):
+                if self.input_callback and self.is_running:
+                    metrics = self.metrics
+                    metrics.inbound_frames += 1
+                    started = time.perf_counter()
+                    audio = self.input_transcoder.convert(decode_audio(event.payload))
+                    decoded = time.perf_counter()
+                    self.input_callback(audio)
+                    metrics.audio_decode.observe(decoded - started)
+                    metrics.input_callback.observe(time.perf_counter() - decoded)
+            elif isinstance(event, StartEvent):
+                if not self.detached:
+                    # A resumed stream keeps timing from the first start.
+                    self.metrics.stream_started()
+                self.stream_sid = event.stream_sid
+                self.media_template = self.codec.media_template(event.stream_sid)
                 self.is_running = True  # Ensure running on start event
-                logger.info(f"Started stream with stream_sid: {self.stream_sid}")
-            elif event_type == "media" and self.input_callback and self.is_running:
-                audio_data = base64.b64decode(data["media"]["payload"])
-                self.input_callback(audio_data)
+                if self.detached:
+                    self._resume_output()
+                logger.info(
+                    "Started stream with stream_sid: %s",
+                    self.stream_sid,
+                    extra=self.log_extra,
+                )
         except Exception as e:
-            logger.error(f"Error in input_callback: {e}")
+            logger.error("Error in input_callback: %s", e, extra=self.log_extra)
             self.stop()
 
-    def _output_thread(self) -> None:
-        while not self.should_stop.is_set():
+    def detach(self) -> None:
+        """
+        Called on the event loop when the websocket drops but the conversation is kept
+        for the call to resume, or when sending to it fails first. Audio not yet sent, and any the agent produces until
+        the stream starts again, is kept in a ring buffer of the most recent
+        `TWILIO_RESUME_BUFFER_FRAMES` frames.
+        """
+        self.detached = True
+        self._stop_sender()
+        if self.pacer.pending():
+            self._buffer_for_resume(bytes(self.pacer.buffer))
+        while True:
             try:
-                audio = self.output_queue.get(timeout=0.2)
-                if self.stream_sid and self.is_running:
-                    audio_payload = base64.b64encode(audio).decode("utf-8")
-                    audio_delta = {
-                        "event": "media",
-                        "streamSid": self.stream_sid,
-                        "media": {"payload": audio_payload},
-                    }
-                    asyncio.run(self._send_audio_message(audio_delta))
-            except queue.Empty:
+                audio, _ = self.output_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                break
+            self.output_slots.release()
+            self._buffer_for_resume(audio)
+        self.pacer.reset()
+        self.chunk_offsets.clear()
+        self.bytes_buffered = self.bytes_sent = 0
+        self.stream_sid = None
+        self.media_template = None
+
+    def attach(self, websocket: WebSocket) -> None:
+        """
+        Switches to a reconnected websocket. The buffered audio is sent once Twilio
+        starts the new stream.
+        """
+        self.websocket = websocket
+
+    def _buffer_for_resume(self, audio: bytes) -> None:
+        self.resume_buffer.append(audio)
+        self.resume_buffer_bytes += len(audio)
+        while self.resume_buffer_bytes > self.resume_buffer_limit:
+            dropped = self.resume_buffer.popleft()
+            self.resume_buffer_bytes -= len(dropped)
+            self.metrics.dropped_chunks += 1
+
+    def _resume_output(self) -> None:
+        self.detached = False
+        resumed_at = time.monotonic()
+        while self.resume_buffer:
+            self._write_pacer(self.resume_buffer.popleft(), resumed_at)
+        self.resume_buffer_bytes = 0
+        self._start_sender()
+
+    def _buffer_audio(self, chunk: tuple[bytes, float]) -> None:
+        audio, enqueued_at = chunk
+        self.output_slots.release()
+        self._write_pacer(audio, enqueued_at)
+
+    def _write_pacer(self, audio: bytes, enqueued_at: float) -> None:
+        self.chunk_offsets.append((self.bytes_buffered, enqueued_at))
+        self.bytes_buffered += len(audio)
+        self.pacer.write(audio)
+
+    def _record_sent(self, sent_bytes: int) -> None:
+        now = time.monotonic()
+        self.bytes_sent += sent_bytes
+        while self.chunk_offsets and self.chunk_offsets[0][0] < self.bytes_sent:
+            _, enqueued_at = self.chunk_offsets.popleft()
+            self.metrics.send_latency.observe(now - enqueued_at)
+        self.metrics.audio_sent(now)
+
+    async def _sender(self) -> None:
+        pacer = self.pacer
+        while True:
+            if not pacer.ready():
+                if not pacer.pending():
+                    self._buffer_audio(await self.output_queue.get())
+                    continue
+                try:
+                    chunk = await asyncio.wait_for(
+                        self.output_queue.get(), timeout=pacer.message_duration
+                    )
+                except asyncio.TimeoutError:
+                    buffered = len(pacer.buffer)
+                    pacer.pad()
+                    self.bytes_buffered += len(pacer.buffer) - buffered
+                else:
+                    self._buffer_audio(chunk)
+                    continue
+
+            delay = pacer.delay()
+            if delay > 0:
+                # Re-check after sleeping, an interruption may have flushed the buffer.
+                await asyncio.sleep(delay)
                 continue
+
+            audio = pacer.take()
+            try:
+                if self.media_template and self.is_running:
+                    self._record_sent(len(audio))
+                    await self._send_audio_message(self.media_template.render(audio))
+                else:
+                    self.bytes_sent += len(audio)
             except Exception as e:
-                logger.error(f"Error in output thread: {e}")
+                self._log_sampled(logging.ERROR, "Error in output sender: %s", e)
 
-    async def _send_audio_message(self, message: dict[str, Any]) -> None:
+    async def _send_audio_message(self, message: str) -> None:
         try:
-            await self.websocket.send_json(message)
+            await self.websocket.send_text(message)
         except Exception as e:
-            logger.error(f"Error sending audio message: {e}")
-            self.stop()
+            self._log_sampled(logging.ERROR, "Error sending audio message: %s", e)
+            if self.resumable:
+                # The media stream handler decides whether the call resumes once it
+                # sees the websocket close. Until then agent audio is buffered.
+                self.detach()
+            else:
+                self.stop()
 
     async def _send_clear_message(self) -> None:
         if self.stream_sid:
             try:
                 clear_message = {"event": "clear", "streamSid": self.stream_sid}
-                await self.websocket.send_json(clear_message)
+                await self.websocket.send_text(self.codec.dumps(clear_message))
             except Exception as e:
-                logger.error(f"Error sending clear message: {e}")
+                self._log_sampled(logging.ERROR, "Error sending clear message: %s", e)
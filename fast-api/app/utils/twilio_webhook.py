@@ -0,0 +1,160 @@
+import base64
+import hashlib
+import hmac
+import os
+from dataclasses import dataclass
+from typing import Optional, Sequence
+from urllib.parse import parse_qsl, urlsplit
+from fastapi import HTTPException, Request
+from app.utils.env import env_int
+
+# Twilio signs each webhook with the account's auth token. When it is set, webhooks
+# without a valid X-Twilio-Signature are rejected before any other work is done.
+TWILIO_AUTH_TOKEN = os.environ.get("TWILIO_AUTH_TOKEN")
+# Public base URL Twilio calls, e.g. https://example.ngrok-free.app. Signatures cover
+# the full URL, so set this when a proxy rewrites the scheme or host.
+TWILIO_WEBHOOK_BASE_URL = os.environ.get("TWILIO_WEBHOOK_BASE_URL")
+# Twilio's form posts are a few KB at most.
+TWILIO_WEBHOOK_MAX_BODY = env_int("TWILIO_WEBHOOK_MAX_BODY", 16 * 1024)
+
+FORM_CONTENT_TYPE = "application/x-www-form-urlencoded"
+
+Params = Sequence[tuple[str, str]]
+
+
+@dataclass(slots=True, frozen=True)
+class IncomingCallWebhook:
+    call_sid: str
+    from_number: str
+    to_number: str
+
+    @classmethod
+    def from_params(cls, params: dict[str, str]) -> Optional["IncomingCallWebhook"]:
+        call_sid = params.get("CallSid")
+        from_number = params.get("From")
+        to_number = params.get("To")
+        if not call_sid or not from_number or not to_number:
+            return None
+        return cls(call_sid=call_sid, from_number=from_number, to_number=to_number)
+
+
+@dataclass(slots=True, frozen=True)
+class CallStatusWebhook:
+    call_sid: str
+    stream_event: str
+
+    @classmethod
+    def from_params(cls, params: dict[str, str]) -> Optional["CallStatusWebhook"]:
+        call_sid = params.get("CallSid")
+        stream_event = params.get("StreamEvent")
+        if not call_sid or not stream_event:
+            return None
+        return cls(call_sid=call_sid, stream_event=stream_event)
+
+
+class TwilioSignatureValidator:
+    """
+    Checks X-Twilio-Signature the way twilio's `RequestValidator` does (HMAC-SHA1 of
+    the URL followed by the sorted parameters, tried with and without the port). The
+    keyed HMAC is built once and copied per request.
+    """
+
+    def __init__(self, auth_token: str) -> None:
+        self.mac = hmac.new(auth_token.encode("utf-8"), digestmod=hashlib.sha1)
+
+    def signature(self, url: str, signed_params: bytes) -> str:
+        mac = self.mac.copy()
+        mac.update(url.encode("utf-8"))
+        mac.update(signed_params)
+        return base64.b64encode(mac.digest()).decode("ascii")
+
+    def is_valid(self, url: str, params: Params, signature: Optional[str]) -> bool:
+        if not signature:
+            return False
+        signed_params = _signed_params(params)
+        return any(
+            hmac.compare_digest(self.signature(candidate, signed_params), signature)
+            for candidate in _url_variants(url)
+        )
+
+
+def _signed_params(params: Params) -> bytes:
+    values: dict[str, set[str]] = {}
+    for name, value in params:
+        values.setdefault(name, set()).add(value)
+    return "".join(
+        name + value for name in sorted(values) for value in sorted(values[name])
+    ).encode("utf-8")
+
+
+def _url_variants(url: str) -> tuple[str, str]:
+    """The URL as requested and with its default port removed or added."""
+    parts = urlsplit(url)
+    if parts.port:
+        host = parts.netloc.rsplit(":", 1)[0]
+        return url, parts._replace(netloc=host).geturl()
+    port = 443 if parts.scheme == "https" else 80
+    return url, parts._replace(netloc=f"{parts.netloc}:{port}").geturl()
+
+
+twilio_signature_validator: Optional[TwilioSignatureValidator] = (
+    TwilioSignatureValidator(TWILIO_AUTH_TOKEN) if TWILIO_AUTH_TOKEN else None
+)
+
+
+def webhook_url(request: Request) -> str:
+    """The URL Twilio requested, which is what it signed."""
+    path = request.url.path
+    if request.url.query:
+        path += "?" + request.url.query
+    if TWILIO_WEBHOOK_BASE_URL:
+        return TWILIO_WEBHOOK_BASE_URL.rstrip("/") + path
+    scheme = request.headers.get("x-forwarded-proto", request.url.scheme)
+    host = request.headers.get("host", request.url.netloc)
+    return f"{scheme.split(',')[0].strip()}://{host}{path}"
+
+
+async def _read_body(request: Request, limit: int) -> bytes:
+    content_length = request.headers.get("content-length")
+    if content_length and content_length.isdigit() and int(content_length) > limit:
+        raise HTTPException(status_code=413, detail="Webhook body too large")
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > limit:
+            raise HTTPException(status_code=413, detail="Webhook body too large")
+    return bytes(body)
+
+
+async def read_webhook_params(
+    request: Request,
+    validator: Optional[TwilioSignatureValidator] = twilio_signature_validator,
+    limit: int = TWILIO_WEBHOOK_MAX_BODY,
+) -> dict[str, str]:
+    """
+    Parses a Twilio webhook's urlencoded form (or query string for GET) without
+    building a multipart `FormData`, enforcing the size limit and, when an auth
+    token is configured, the request signature.
+    """
+    signed: list[tuple[str, str]] = []
+    if request.method == "GET":
+        params = parse_qsl(request.url.query, keep_blank_values=True)
+    else:
+        content_type = request.headers.get("content-type", "")
+        if content_type.split(";", 1)[0].strip().lower() != FORM_CONTENT_TYPE:
+            raise HTTPException(status_code=415, detail="Expected a form-encoded body")
+        body = await _read_body(request, limit)
+        try:
+            params = parse_qsl(
+                body.decode("utf-8"), keep_blank_values=True, strict_parsing=False
+            )
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="Invalid form encoding")
+        # For POSTs the form fields are signed; for GETs they are part of the URL.
+        signed = params
+
+    if validator is not None and not validator.is_valid(
+        webhook_url(request), signed, request.headers.get("x-twilio-signature")
+    ):
+        raise HTTPException(status_code=403, detail="Invalid Twilio signature")
+    return dict(params)
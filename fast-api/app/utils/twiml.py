@@ -0,0 +1,59 @@
+from functools import lru_cache
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from twilio.twiml.voice_response import VoiceResponse
+
+# Stands in for the call SID while a host's response is rendered. Only letters and
+# digits, so XML escaping leaves it unchanged and it splits the output cleanly.
+CALL_SID_PLACEHOLDER = "CALLSIDPLACEHOLDER0123456789"
+TWIML_TEMPLATE_CACHE_SIZE = 64
+
+
+def build_media_stream_twiml(call_sid: str, host: str) -> "VoiceResponse":
+    """
+    The TwiML that connects a call to our media stream websocket. The twilio library
+    is only imported the first time a host's template is built.
+    """
+    from twilio.twiml.voice_response import Connect, VoiceResponse
+
+    voice_response = VoiceResponse()
+    connect = Connect()
+    connect.stream(
+        url=f"wss://{host}/media-stream-eleven/{call_sid}",
+        status_callback=f"https://{host}/call-status-eleven",
+        status_callback_method="POST",
+    )
+    voice_response.append(connect)
+    return voice_response
+
+
+@lru_cache(maxsize=TWIML_TEMPLATE_CACHE_SIZE)
+def _media_stream_template(host: str) -> tuple[str, str]:
+    """
+    Renders the response once per host with the twilio library and splits it
+    around the call SID, so later calls are a string concatenation.
+    """
+    xml = str(build_media_stream_twiml(CALL_SID_PLACEHOLDER, host))
+    prefix, placeholder, suffix = xml.partition(CALL_SID_PLACEHOLDER)
+    if not placeholder or CALL_SID_PLACEHOLDER in suffix:
+        raise ValueError(f"Cannot build a TwiML template for host {host!r}")
+    return prefix, suffix
+
+
+def render_media_stream_twiml(call_sid: str, host: str) -> str:
+    """
+    Byte-identical to `str(build_media_stream_twiml(call_sid, host))`.
+
+    Twilio call SIDs are alphanumeric, which XML escaping leaves alone, so they are
+    spliced into the cached template as-is. Anything else, or a host the template
+    cannot be built for, goes through the twilio library.
+    """
+    if call_sid.isascii() and call_sid.isalnum():
+        try:
+            prefix, suffix = _media_stream_template(host)
+        except ValueError:
+            pass
+        else:
+            return prefix + call_sid + suffix
+    return str(build_media_stream_twiml(call_sid, host))
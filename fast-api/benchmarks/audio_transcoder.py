@@ -0,0 +1,126 @@
+"""
+Throughput per core of the audio transcoding stage, for each agent format a call
+can be converted to and from.
+
+Streams synthetic speech-band audio through both directions of a call in 20 ms
+Twilio frames (and agent chunks of the same duration), and reports the cost per
+frame, how many times faster than realtime one core runs, and so how many calls one
+core could transcode. Also checks that the steady state keeps no memory per frame
+and that each frame only allocates its returned bytes and a few array views.
+
+    python -m benchmarks.audio_transcoder --seconds 60
+"""
+
+import argparse
+import itertools
+import time
+import tracemalloc
+
+import numpy as np
+
+from app.utils.audio_transcoder import AudioFormat, AudioTranscoder
+
+FRAME_SECONDS = 0.02
+AGENT_FORMATS = ("pcm_8000", "pcm_16000", "pcm_24000")
+TWILIO = AudioFormat.parse("ulaw_8000")
+# Frames converted before memory is measured.
+WARMUP_FRAMES = 20_000
+
+
+def speech(format: AudioFormat, seconds: float) -> bytes:
+    """A few tones across the speech band plus noise, as 16-bit PCM or mu-law."""
+    t = np.arange(int(format.sample_rate * seconds)) / format.sample_rate
+    signal = sum(
+        np.sin(2 * np.pi * frequency * t) for frequency in (220.0, 1100.0, 2900.0)
+    )
+    signal = signal * 6000 + np.random.default_rng(0).normal(0, 300, len(t))
+    pcm = np.clip(signal, -32768, 32767).astype("<i2").tobytes()
+    if format.encoding == "ulaw":
+        return AudioTranscoder(AudioFormat("pcm", 8000), TWILIO).convert(pcm)
+    return pcm
+
+
+def frames(audio: bytes, format: AudioFormat) -> list[bytes]:
+    width = 1 if format.encoding == "ulaw" else 2
+    size = int(format.sample_rate * FRAME_SECONDS) * width
+    return [audio[i : i + size] for i in range(0, len(audio) - size + 1, size)]
+
+
+def run(transcoder: AudioTranscoder, chunks: list[bytes]) -> float:
+    started = time.perf_counter()
+    for chunk in chunks:
+        transcoder.convert(chunk)
+    return time.perf_counter() - started
+
+
+def allocated_per_frame(transcoder: AudioTranscoder, chunks: list[bytes]) -> float:
+    """
+    Bytes still allocated per frame in the steady state, with the outputs dropped.
+
+    One-time allocations happen during a traced warm-up, before the baseline is
+    read, so they are not spread over the measured frames. Besides the grown
+    buffers, numpy makes one allocation of about 1 MB several thousand frames in.
+    The traced totals are compared rather than snapshots, which allocate as well.
+    """
+    tracemalloc.start()
+    for chunk in itertools.islice(itertools.cycle(chunks), WARMUP_FRAMES):
+        transcoder.convert(chunk)
+    before = tracemalloc.get_traced_memory()[0]
+    for chunk in chunks:
+        transcoder.convert(chunk)
+    growth = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return growth / len(chunks)
+
+
+def peak_per_frame(transcoder: AudioTranscoder, chunk: bytes) -> int:
+    """
+    Peak traced memory while converting one frame: the returned bytes plus a few
+    short-lived array views. The sample buffers themselves are reused.
+    """
+    transcoder.convert(chunk)
+    tracemalloc.start()
+    transcoder.convert(chunk)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def report(name: str, transcoder: AudioTranscoder, chunks: list[bytes]) -> float:
+    seconds = run(transcoder, chunks)
+    audio_seconds = len(chunks) * FRAME_SECONDS
+    per_frame_us = seconds / len(chunks) * 1e6
+    leaked = allocated_per_frame(transcoder, chunks)
+    peak = peak_per_frame(transcoder, chunks[len(chunks) // 2])
+    print(
+        f"  {name:<26} {per_frame_us:6.2f} us/frame  "
+        f"{audio_seconds / seconds:8.0f}x realtime  "
+        f"peak {peak:5d} B/frame  retained {leaked:+.1f} B/frame"
+    )
+    return seconds
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--seconds", type=float, default=60.0)
+    args = parser.parse_args()
+
+    caller = frames(speech(TWILIO, args.seconds), TWILIO)
+    for name in AGENT_FORMATS:
+        agent = AudioFormat.parse(name)
+        print(f"{name}:")
+        inbound = report(
+            f"ulaw_8000 -> {name}", AudioTranscoder(TWILIO, agent), caller
+        )
+        outbound = report(
+            f"{name} -> ulaw_8000",
+            AudioTranscoder(agent, TWILIO),
+            frames(speech(agent, args.seconds), agent),
+        )
+        # Both directions carry the whole call's duration of audio.
+        per_call = (inbound + outbound) / args.seconds
+        print(f"  calls per core (both directions): {1 / per_call:,.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+"""
+Memory use of the streaming call export.
+
+Inserts generated calls into DATABASE_URL, in a window far in the past so real
+calls are untouched, then streams them through `export_calls` and samples the
+process RSS as rows go by. The streamed export should stay flat; the buffered
+baseline (every row loaded before encoding, as a page-by-page scrape ends up
+doing) grows with the row count. The generated rows are deleted afterwards.
+
+    python -m benchmarks.call_export [rows]
+
+Needs the async engine (the default, DATABASE_ASYNC=true).
+"""
+
+import asyncio
+import datetime
+import resource
+import sys
+import time
+import uuid
+from typing import Any, List
+
+from sqlalchemy import delete, insert
+from sqlalchemy import select as sa_select
+
+from app.database import engine, init_db
+from app.enums import CallStatus, ExportFormat
+from app.repositories.calls import calls_table
+from app.services.call_export import _encode_ndjson, export_calls
+
+ROWS = 1_000_000
+INSERT_BATCH = 10_000
+WINDOW_START = datetime.datetime(2000, 1, 1, tzinfo=datetime.timezone.utc)
+WINDOW_END = WINDOW_START + datetime.timedelta(days=365)
+
+
+def rss_mb() -> float:
+    """Current resident set size, falling back to the peak where /proc is missing."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * resource.getpagesize() / 1024 / 1024
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generated_rows(start: int, count: int) -> List[dict[str, Any]]:
+    return [
+        {
+            "id": uuid.uuid4(),
+            "created_at": WINDOW_START + datetime.timedelta(seconds=i),
+            "updated_at": WINDOW_START + datetime.timedelta(seconds=i),
+            "sid": f"CABENCH{i:010d}",
+            "from_number": "+15550100",
+            "to_number": "+15550199",
+            "status": CallStatus.COMPLETED,
+            "eleven_labs_conversation_id": None,
+        }
+        for i in range(start, start + count)
+    ]
+
+
+async def execute(statement: Any, rows: Any = None) -> None:
+    async with engine.begin() as connection:  # type: ignore[union-attr]
+        await connection.execute(statement, rows)
+
+
+async def populate(rows: int) -> None:
+    for start in range(0, rows, INSERT_BATCH):
+        batch = generated_rows(start, min(INSERT_BATCH, rows - start))
+        await execute(insert(calls_table), batch)
+
+
+async def streamed(rows: int) -> None:
+    exported = 0
+    size = 0
+    samples: List[tuple[int, float]] = []
+    started = time.perf_counter()
+    async for chunk in export_calls(
+        ExportFormat.NDJSON, created_after=WINDOW_START, created_before=WINDOW_END
+    ):
+        size += len(chunk)
+        exported += chunk.count(b"\n")
+        if not samples or exported >= samples[-1][0] + rows // 10:
+            samples.append((exported, rss_mb()))
+    elapsed = time.perf_counter() - started
+    print(f"streamed: {exported} rows, {size / 1024 / 1024:.0f} MiB in {elapsed:.1f}s")
+    for count, mb in samples:
+        print(f"  {count:>9} rows  rss {mb:7.1f} MiB")
+
+
+async def buffered() -> None:
+    before = rss_mb()
+    started = time.perf_counter()
+    statement = sa_select(calls_table).where(
+        calls_table.c.created_at >= WINDOW_START, calls_table.c.created_at < WINDOW_END
+    )
+    async with engine.connect() as connection:  # type: ignore[union-attr]
+        result = await connection.execute(statement)
+        rows = [dict(row) for row in result.mappings().all()]
+    body = _encode_ndjson(rows)
+    elapsed = time.perf_counter() - started
+    print(
+        f"buffered: {len(rows)} rows, {len(body) / 1024 / 1024:.0f} MiB in {elapsed:.1f}s"
+        f"  rss {before:.1f} -> {rss_mb():.1f} MiB"
+    )
+
+
+async def main(rows: int) -> None:
+    await init_db()
+    await execute(delete(calls_table).where(calls_table.c.created_at < WINDOW_END))
+    print(f"inserting {rows} calls...")
+    await populate(rows)
+    try:
+        await streamed(rows)
+        await buffered()
+    finally:
+        await execute(delete(calls_table).where(calls_table.c.created_at < WINDOW_END))
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else ROWS))
@@ -0,0 +1,80 @@
+"""
+Local stand-in for the ElevenLabs `Conversation`, for load tests.
+
+Like the real one it runs a thread per call, starts the audio interface from that
+thread and feeds agent audio back through `AudioInterface.output`. Nothing leaves
+the machine.
+
+- `echo` sends every inbound chunk straight back, so the load generator can time
+  each frame end to end.
+- `synth` answers every `TURN_SECONDS` of caller audio with `REPLY_SECONDS` of
+  agent audio, in chunks the size ElevenLabs sends.
+"""
+
+import queue
+import threading
+import uuid
+from typing import Any, Optional
+
+from app.utils.twilio_audio_interface import TwilioAudioInterface
+
+SAMPLE_RATE = 8000  # mu-law bytes per second
+TURN_SECONDS = 2.0
+REPLY_SECONDS = 1.0
+REPLY_CHUNK_BYTES = 2000  # 250 ms
+REPLY_TONE = bytes([0x00, 0x80] * (REPLY_CHUNK_BYTES // 2))
+
+
+class FakeConversation:
+    def __init__(
+        self,
+        *,
+        audio_interface: TwilioAudioInterface,
+        mode: str = "echo",
+        callback_agent_response: Any = None,
+        callback_user_transcript: Any = None,
+        **kwargs: Any,
+    ) -> None:
+        self.audio_interface = audio_interface
+        self.mode = mode
+        self.callback_agent_response = callback_agent_response
+        self.callback_user_transcript = callback_user_transcript
+        self.inbound: queue.SimpleQueue[Optional[bytes]] = queue.SimpleQueue()
+        self.thread: Optional[threading.Thread] = None
+        self._conversation_id = f"fake-{uuid.uuid4().hex}"
+
+    def start_session(self) -> None:
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def end_session(self) -> None:
+        self.audio_interface.stop()
+        self.inbound.put(None)
+
+    def wait_for_session_end(self) -> Optional[str]:
+        if self.thread is not None:
+            self.thread.join()
+        return self._conversation_id
+
+    def _run(self) -> None:
+        self.audio_interface.start(self.inbound.put)
+        caller_bytes = 0
+        while True:
+            audio = self.inbound.get()
+            if audio is None:
+                return
+            if self.mode == "echo":
+                self.audio_interface.output(audio)
+                continue
+            caller_bytes += len(audio)
+            if caller_bytes >= TURN_SECONDS * SAMPLE_RATE:
+                caller_bytes = 0
+                self._reply()
+
+    def _reply(self) -> None:
+        if self.callback_user_transcript:
+            self.callback_user_transcript("Synthetic caller turn.")
+        if self.callback_agent_response:
+            self.callback_agent_response("Synthetic agent reply.")
+        for _ in range(int(REPLY_SECONDS * SAMPLE_RATE / REPLY_CHUNK_BYTES)):
+            self.audio_interface.output(REPLY_TONE)
@@ -0,0 +1,103 @@
+"""
+Worker cold start: how long `import app.main` takes and how long until uvicorn
+answers its first request, each measured in fresh interpreters.
+
+Also lists which heavy SDKs are still imported with the app; the ElevenLabs SDK,
+twilio and httpx should only load once they are used. Runs with the admin
+dashboard mounted and with `ADMIN_ENABLED=false`, and exits non-zero if the median
+import time is over `--target-ms`. DATABASE_URL defaults to a throwaway SQLite
+file, as in the load test, so aiosqlite from requirements.txt is needed.
+
+    python -m benchmarks.import_time --runs 10 --target-ms 800
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from typing import List
+
+from benchmarks.media_stream_load import default_environment, free_port
+
+HEAVY_MODULES = ("elevenlabs", "twilio", "httpx", "sqladmin", "jinja2")
+READY_TIMEOUT_SECONDS = 30.0
+
+IMPORT_SCRIPT = f"""
+import sys, time
+started = time.perf_counter()
+import app.main
+print(time.perf_counter() - started)
+print(",".join(name for name in {HEAVY_MODULES!r} if name in sys.modules))
+"""
+
+
+def measure_import(environment: dict[str, str]) -> tuple[float, str]:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SCRIPT],
+        env=environment,
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.splitlines()
+    return float(output[-2]), output[-1]
+
+
+def measure_ready(environment: dict[str, str]) -> float:
+    """Seconds from starting uvicorn to the first successful response."""
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port)],
+        env=environment,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - started < READY_TIMEOUT_SECONDS:
+            try:
+                with urllib.request.urlopen(
+                    f"http://127.0.0.1:{port}/unprotected", timeout=1.0
+                ) as response:
+                    if response.status == 200:
+                        return time.perf_counter() - started
+            except OSError:
+                time.sleep(0.005)
+        raise TimeoutError("uvicorn did not become ready")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=800.0)
+    args = parser.parse_args()
+
+    default_environment("import_time")
+    over_target = False
+    for admin in ("true", "false"):
+        environment = {**os.environ, "ADMIN_ENABLED": admin}
+        imports: List[float] = []
+        loaded = ""
+        for _ in range(args.runs):
+            seconds, loaded = measure_import(environment)
+            imports.append(seconds)
+        ready = [measure_ready(environment) for _ in range(args.runs)]
+        median_ms = statistics.median(imports) * 1000
+        over_target = over_target or median_ms > args.target_ms
+        print(f"ADMIN_ENABLED={admin}")
+        print(
+            f"  import app.main: median {median_ms:.0f} ms, "
+            f"max {max(imports) * 1000:.0f} ms (target {args.target_ms:.0f} ms)"
+        )
+        print(f"  uvicorn ready:   median {statistics.median(ready) * 1000:.0f} ms")
+        print(f"  heavy modules imported: {loaded or 'none'}")
+    sys.exit(1 if over_target else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+What a log call costs the thread that makes it, in each `LOG_MODE`, when stdout is
+slow to drain (a busy terminal, a blocked pipe or a log shipper applying
+backpressure).
+
+Stdout is replaced by a stream that takes `--write-delay-ms` per write. Several
+threads then log at once, as the event loop and the ElevenLabs threads do during
+calls, and the per-call latency seen by the callers is reported. Also compares an
+f-string with lazy `%` arguments on a disabled level.
+
+    python -m benchmarks.logging_pipeline --threads 8 --records 2000
+"""
+
+import argparse
+import io
+import logging
+import statistics
+import sys
+import threading
+import time
+from typing import List
+
+from app.utils.logger import setup_logging
+
+
+class SlowStream(io.TextIOBase):
+    def __init__(self, delay: float) -> None:
+        self.delay = delay
+        self.lock = threading.Lock()
+
+    def write(self, text: str) -> int:
+        with self.lock:
+            time.sleep(self.delay)
+        return len(text)
+
+    def flush(self) -> None:
+        pass
+
+
+def run_mode(mode: str, threads: int, records: int, delay: float) -> None:
+    stdout = sys.stdout
+    sys.stdout = SlowStream(delay)
+    try:
+        setup_logging(mode=mode)
+        logger = logging.getLogger("benchmark")
+        latencies: List[float] = []
+        lock = threading.Lock()
+
+        def worker(index: int) -> None:
+            own: List[float] = []
+            for i in range(records):
+                started = time.perf_counter()
+                logger.info(
+                    "Agent said: %s",
+                    "synthetic reply",
+                    extra={"call_sid": f"CA{index:032d}"},
+                )
+                own.append(time.perf_counter() - started)
+            with lock:
+                latencies.extend(own)
+
+        workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+        started = time.perf_counter()
+        for thread in workers:
+            thread.start()
+        for thread in workers:
+            thread.join()
+        elapsed = time.perf_counter() - started
+        # Drains the queue for the queued modes before stdout is restored.
+        setup_logging(mode="text")
+    finally:
+        sys.stdout = stdout
+
+    latencies.sort()
+    print(
+        f"{mode:>6}: p50 {statistics.median(latencies) * 1e6:9.1f} us  "
+        f"p99 {latencies[int(len(latencies) * 0.99)] * 1e6:9.1f} us  "
+        f"max {latencies[-1] * 1e3:8.1f} ms  "
+        f"callers done in {elapsed:6.2f} s"
+    )
+
+
+def disabled_level(iterations: int) -> None:
+    setup_logging(level=logging.WARNING, mode="text")
+    logger = logging.getLogger("benchmark")
+    metrics = {"inbound_frames": 1500, "dropped_chunks": 0, "p99_ms": 12.5}
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        logger.info(f"Media stats for Call SID CA1: {metrics}")
+    eager = (time.perf_counter() - started) / iterations
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        logger.info("Media stats for Call SID %s: %s", "CA1", metrics)
+    lazy = (time.perf_counter() - started) / iterations
+    print(
+        f"disabled INFO: f-string {eager * 1e9:6.0f} ns, "
+        f"% args {lazy * 1e9:6.0f} ns ({eager / lazy:.1f}x)"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--records", type=int, default=500)
+    parser.add_argument("--write-delay-ms", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for mode in ("text", "queue", "json"):
+        run_mode(mode, args.threads, args.records, args.write_delay_ms / 1000)
+    disabled_level(200_000)
+
+
+if __name__ == "__main__":
+    main()
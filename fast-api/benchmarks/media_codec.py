@@ -0,0 +1,85 @@
+"""
+Per-frame cost of the Twilio media stream codecs.
+
+Compares the original path (stdlib json + base64 + a dict per outbound frame) with
+each available codec, for one inbound `media` frame decoded and one outbound frame
+encoded.
+
+    python -m benchmarks.media_codec
+"""
+
+import base64
+import json
+import timeit
+from typing import Callable
+
+from app.utils.media_codec import (
+    MediaCodec,
+    MsgspecMediaCodec,
+    OrjsonMediaCodec,
+    decode_audio,
+    msgspec,
+    orjson,
+)
+
+FRAMES = 200_000
+AUDIO = bytes(range(160))  # one 20 ms mu-law frame
+STREAM_SID = "MZ18ad3ab5a668481ce02b83e7395059f0"
+INBOUND = json.dumps(
+    {
+        "event": "media",
+        "sequenceNumber": "3",
+        "media": {
+            "track": "inbound",
+            "chunk": "1",
+            "timestamp": "5",
+            "payload": base64.b64encode(AUDIO).decode("utf-8"),
+        },
+        "streamSid": STREAM_SID,
+    }
+)
+
+
+def baseline_frame() -> None:
+    data = json.loads(INBOUND)
+    base64.b64decode(data["media"]["payload"])
+    json.dumps(
+        {
+            "event": "media",
+            "streamSid": STREAM_SID,
+            "media": {"payload": base64.b64encode(AUDIO).decode("utf-8")},
+        }
+    )
+
+
+def codec_frame(codec: MediaCodec) -> Callable[[], None]:
+    template = codec.media_template(STREAM_SID)
+
+    def frame() -> None:
+        event = codec.decode(INBOUND)
+        decode_audio(event.payload)  # type: ignore[union-attr]
+        template.render(AUDIO)
+
+    return frame
+
+
+def report(name: str, seconds: float, baseline: float) -> None:
+    per_frame_us = seconds / FRAMES * 1e6
+    print(f"{name:<10} {per_frame_us:7.3f} us/frame  {baseline / seconds:5.2f}x")
+
+
+def main() -> None:
+    baseline = timeit.timeit(baseline_frame, number=FRAMES)
+    report("baseline", baseline, baseline)
+
+    codecs: list[MediaCodec] = [MediaCodec()]
+    if orjson is not None:
+        codecs.append(OrjsonMediaCodec())
+    if msgspec is not None:
+        codecs.append(MsgspecMediaCodec())
+    for codec in codecs:
+        report(codec.name, timeit.timeit(codec_frame(codec), number=FRAMES), baseline)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Overhead of the per-call media instrumentation.
+
+Times the work `handle_media_stream` and `TwilioAudioInterface` add for each
+inbound frame (clock reads, three histogram observations and a counter) and for
+each outbound message and enqueued chunk, then projects it to 1000 frames/sec
+in each direction.
+
+    python -m benchmarks.media_metrics
+"""
+
+import time
+import timeit
+
+from app.utils.media_metrics import CallMediaMetrics
+
+ITERATIONS = 1_000_000
+FRAMES_PER_SECOND = 1000
+
+
+def inbound_frame(metrics: CallMediaMetrics) -> None:
+    started = time.perf_counter()
+    metrics.message_decode.observe(time.perf_counter() - started)
+    metrics.inbound_frames += 1
+    started = time.perf_counter()
+    decoded = time.perf_counter()
+    metrics.audio_decode.observe(decoded - started)
+    metrics.input_callback.observe(time.perf_counter() - decoded)
+
+
+def outbound_message(metrics: CallMediaMetrics) -> None:
+    enqueued_at = time.monotonic()
+    metrics.queue_depth.observe(3)
+    now = time.monotonic()
+    metrics.send_latency.observe(now - enqueued_at)
+    metrics.audio_sent(now)
+
+
+def main() -> None:
+    metrics = CallMediaMetrics()
+    total = 0.0
+    for name, frame in (("inbound", inbound_frame), ("outbound", outbound_message)):
+        seconds = timeit.timeit(lambda: frame(metrics), number=ITERATIONS)
+        per_frame = seconds / ITERATIONS
+        total += per_frame
+        print(f"{name:>9}: {per_frame * 1e6:6.2f} us/frame")
+    share = total * FRAMES_PER_SECOND * 100
+    print(f"at {FRAMES_PER_SECOND} frames/sec each way: {share:.2f}% of one core")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,420 @@
+"""
+Load test for the Twilio webhook and media stream websocket, no phone calls needed.
+
+Starts the app under uvicorn (one worker, production loop/http settings) in a child
+process, with `FakeConversation` swapped in for the ElevenLabs `Conversation`. Then,
+for each concurrency level, runs that many simulated Twilio calls at once. Each
+call POSTs `/incoming-call-eleven`, opens `/media-stream-eleven/{call_sid}` and
+streams 20 ms mu-law frames in real time for `--duration` seconds.
+
+In `echo` mode every frame carries its sequence number and comes straight back,
+so the latency reported is the whole server path: decode, input callback, the
+conversation thread, the output queue, the pacer and the send. Server CPU is read
+from the child process. A level is sustainable while p99 latency, frame loss and
+server CPU stay within the limits below. The run stops at the first level that is
+not.
+
+Results are written as JSON (default `benchmarks/results/`) and `--compare` prints
+the change against an earlier run.
+
+    python -m benchmarks.media_stream_load --levels 10,50,100,200 --duration 20
+    python -m benchmarks.media_stream_load --compare benchmarks/results/<run>.json
+
+DATABASE_URL defaults to a throwaway SQLite file, through the aiosqlite driver in
+requirements.txt; point it at a scratch Postgres database to include real database
+writes.
+"""
+
+import argparse
+import asyncio
+import base64
+import datetime
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import uuid
+from dataclasses import dataclass, field
+from typing import Any, List, Optional
+
+FRAME_DURATION = 0.02
+FRAME_BYTES = 160
+SILENCE = b"\xff" * FRAME_BYTES
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+WARMUP_SECONDS = 1.0
+DRAIN_SECONDS = 0.5
+
+
+def default_environment(name: str = "media_stream_load") -> None:
+    """
+    Settings the app needs at import, for a self-contained run. The database is a
+    throwaway SQLite file named after the benchmark, opened through aiosqlite.
+    """
+    database = os.path.join(tempfile.gettempdir(), f"{name}.db")
+    secret = name.replace("_", "-")
+    os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{database}")
+    os.environ.setdefault("JWT_SECRET", secret)
+    os.environ.setdefault("ADMIN_SECRET_KEY", secret)
+    os.environ.setdefault("ELEVENLABS_AGENT_ID", secret)
+    os.environ.setdefault("ELEVENLABS_API_KEY", secret)
+
+
+def serve(port: int, mode: str) -> None:
+    """Runs in the child process: the real app, with the fake conversation."""
+    import functools
+    import uvicorn
+    from fastapi.responses import JSONResponse
+
+    from app.database import engine, init_db
+    import elevenlabs.conversational_ai.conversation as conversation
+    from benchmarks.fake_conversation import FakeConversation
+
+    async def create_tables() -> None:
+        await init_db()
+        if hasattr(engine, "dispose"):
+            result = engine.dispose()
+            if asyncio.iscoroutine(result):
+                await result
+
+    asyncio.run(create_tables())
+    # CallService imports Conversation from the SDK module when a stream starts.
+    conversation.Conversation = functools.partial(  # type: ignore
+        FakeConversation, mode=mode
+    )
+
+    from app.main import app
+
+    async def cpu_seconds() -> JSONResponse:
+        return JSONResponse({"cpu_seconds": time.process_time()})
+
+    app.add_api_route("/benchmark/cpu", cpu_seconds)
+    uvicorn.run(
+        app,
+        host="127.0.0.1",
+        port=port,
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        log_level="warning",
+    )
+
+
+def percentile(values: List[float], q: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def rounded(value: Optional[float], digits: int = 2) -> Optional[float]:
+    return None if value is None else round(value, digits)
+
+
+@dataclass
+class LevelStats:
+    calls: int
+    echo: bool
+    failed_calls: int = 0
+    frames_sent: int = 0
+    frames_received: int = 0
+    latencies_ms: List[float] = field(default_factory=list)
+    send_lag_ms: List[float] = field(default_factory=list)
+    webhook_ms: List[float] = field(default_factory=list)
+
+    def result(self, wall_seconds: float, cpu_seconds: float) -> dict[str, Any]:
+        cpu_percent = cpu_seconds / wall_seconds * 100
+        return {
+            "calls": self.calls,
+            "failed_calls": self.failed_calls,
+            "frames_sent": self.frames_sent,
+            "frames_received": self.frames_received,
+            # Only meaningful when every frame is echoed back.
+            "frame_loss_percent": rounded(
+                100 - self.frames_received / self.frames_sent * 100
+                if self.echo and self.frames_sent
+                else None
+            ),
+            "latency_ms_p50": rounded(percentile(self.latencies_ms, 0.5)),
+            "latency_ms_p99": rounded(percentile(self.latencies_ms, 0.99)),
+            "latency_ms_max": rounded(max(self.latencies_ms, default=None)),
+            "client_send_lag_ms_p99": rounded(percentile(self.send_lag_ms, 0.99)),
+            "webhook_ms_p50": rounded(percentile(self.webhook_ms, 0.5)),
+            "webhook_ms_p99": rounded(percentile(self.webhook_ms, 0.99)),
+            "server_cpu_percent": rounded(cpu_percent),
+            "server_cpu_percent_per_call": rounded(cpu_percent / self.calls, 3),
+        }
+
+
+class LoadGenerator:
+    def __init__(self, port: int, duration: float, mode: str) -> None:
+        import httpx
+        import jwt
+
+        self.base_url = f"http://127.0.0.1:{port}"
+        self.ws_url = f"ws://127.0.0.1:{port}"
+        self.duration = duration
+        self.mode = mode
+        token = jwt.encode(
+            {
+                "sub": "media-stream-load",
+                "aud": "authenticated",
+                "exp": time.time() + 86400,
+            },
+            os.environ["JWT_SECRET"],
+            algorithm="HS256",
+        )
+        self.client = httpx.AsyncClient(
+            base_url=self.base_url,
+            headers={"Authorization": f"Bearer {token}"},
+            timeout=30.0,
+            limits=httpx.Limits(max_connections=None),
+        )
+
+    async def wait_until_ready(self, timeout: float = 30.0) -> None:
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                await self.cpu_seconds()
+                return
+            except Exception:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.2)
+
+    async def cpu_seconds(self) -> float:
+        response = await self.client.get("/benchmark/cpu")
+        response.raise_for_status()
+        seconds: float = response.json()["cpu_seconds"]
+        return seconds
+
+    async def run_level(self, calls: int) -> dict[str, Any]:
+        stats = LevelStats(calls=calls, echo=self.mode == "echo")
+        cpu_before = await self.cpu_seconds()
+        started = time.perf_counter()
+        await asyncio.gather(*(self.simulate_call(stats) for _ in range(calls)))
+        wall = time.perf_counter() - started
+        cpu = await self.cpu_seconds() - cpu_before
+        return stats.result(wall, cpu)
+
+    async def simulate_call(self, stats: LevelStats) -> None:
+        import websockets
+
+        call_sid = f"CA{uuid.uuid4().hex}"
+        stream_sid = f"MZ{uuid.uuid4().hex}"
+        started = time.perf_counter()
+        try:
+            response = await self.client.post(
+                "/incoming-call-eleven",
+                data={"CallSid": call_sid, "From": "+15550100", "To": "+15550199"},
+            )
+            stats.webhook_ms.append((time.perf_counter() - started) * 1000)
+            response.raise_for_status()
+
+            async with websockets.connect(
+                f"{self.ws_url}/media-stream-eleven/{call_sid}", max_size=None
+            ) as websocket:
+                await websocket.send(json.dumps({"event": "connected"}))
+                await websocket.send(
+                    json.dumps(
+                        {
+                            "event": "start",
+                            "start": {"streamSid": stream_sid, "callSid": call_sid},
+                            "streamSid": stream_sid,
+                        }
+                    )
+                )
+                sent_at: dict[int, float] = {}
+                receiver = asyncio.create_task(self.receive(websocket, sent_at, stats))
+                await self.send_frames(websocket, stream_sid, sent_at, stats)
+                await asyncio.sleep(DRAIN_SECONDS)
+                await websocket.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+                receiver.cancel()
+        except Exception as e:
+            stats.failed_calls += 1
+            print(f"call {call_sid} failed: {e!r}", file=sys.stderr)
+
+    async def send_frames(
+        self,
+        websocket: Any,
+        stream_sid: str,
+        sent_at: dict[int, float],
+        stats: LevelStats,
+    ) -> None:
+        prefix = '{"event":"media","streamSid":"%s","media":{"payload":"' % stream_sid
+        loop = asyncio.get_running_loop()
+        frames = int(self.duration / FRAME_DURATION)
+        start = loop.time()
+        for sequence in range(frames):
+            due = start + sequence * FRAME_DURATION
+            delay = due - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            # How far behind schedule the client itself is; if this grows, the load
+            # generator rather than the server is the bottleneck.
+            stats.send_lag_ms.append(max(0.0, loop.time() - due) * 1000)
+            audio = sequence.to_bytes(4, "big") + SILENCE[4:]
+            sent_at[sequence] = time.perf_counter()
+            await websocket.send(prefix + base64.b64encode(audio).decode("ascii") + '"}}')
+            stats.frames_sent += 1
+
+    async def receive(
+        self, websocket: Any, sent_at: dict[int, float], stats: LevelStats
+    ) -> None:
+        warmup_frames = int(WARMUP_SECONDS / FRAME_DURATION)
+        async for message in websocket:
+            data = json.loads(message)
+            if data.get("event") != "media":
+                continue
+            stats.frames_received += 1
+            if not stats.echo:
+                continue
+            audio = base64.b64decode(data["media"]["payload"])
+            sequence = int.from_bytes(audio[:4], "big")
+            sent = sent_at.pop(sequence, None)
+            if sent is not None and sequence >= warmup_frames:
+                stats.latencies_ms.append((time.perf_counter() - sent) * 1000)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def sustainable(level: dict[str, Any], args: argparse.Namespace) -> bool:
+    if level["failed_calls"] or level["server_cpu_percent"] > args.max_cpu_percent:
+        return False
+    if args.mode != "echo":
+        return True
+    return (
+        level["frame_loss_percent"] is not None
+        and level["frame_loss_percent"] <= args.max_loss_percent
+        and level["latency_ms_p99"] is not None
+        and level["latency_ms_p99"] <= args.max_p99_ms
+    )
+
+
+def revision() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(previous_path: str, results: dict[str, Any]) -> None:
+    with open(previous_path) as f:
+        previous = json.load(f)
+    before = {level["calls"]: level for level in previous["levels"]}
+    print(f"\nchange since {previous.get('revision')} ({previous_path}):")
+    for level in results["levels"]:
+        old = before.get(level["calls"])
+        if old is None:
+            continue
+        changes = []
+        for key in ("latency_ms_p99", "server_cpu_percent_per_call", "frame_loss_percent"):
+            if old.get(key) is not None and level.get(key) is not None:
+                changes.append(f"{key} {old[key]} -> {level[key]}")
+        print(f"  {level['calls']:>5} calls: " + ", ".join(changes))
+    print(
+        "  max sustainable calls: "
+        f"{previous.get('max_sustainable_calls')} -> {results['max_sustainable_calls']}"
+    )
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port: int = s.getsockname()[1]
+        return port
+
+
+async def run(args: argparse.Namespace, port: int) -> dict[str, Any]:
+    generator = LoadGenerator(port, args.duration, args.mode)
+    results: dict[str, Any] = {
+        "benchmark": "media_stream_load",
+        "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "revision": revision(),
+        "config": {
+            "mode": args.mode,
+            "duration": args.duration,
+            "levels": args.levels,
+            "max_p99_ms": args.max_p99_ms,
+            "max_loss_percent": args.max_loss_percent,
+            "max_cpu_percent": args.max_cpu_percent,
+            "database": os.environ["DATABASE_URL"].split(":", 1)[0],
+            "cpu_count": os.cpu_count(),
+        },
+        "levels": [],
+        "max_sustainable_calls": 0,
+    }
+    try:
+        await generator.wait_until_ready()
+        for calls in args.levels:
+            level = await generator.run_level(calls)
+            level["sustainable"] = sustainable(level, args)
+            results["levels"].append(level)
+            print(json.dumps(level))
+            if not level["sustainable"]:
+                break
+            results["max_sustainable_calls"] = calls
+            await asyncio.sleep(1.0)  # Let the previous level's calls finish ending.
+    finally:
+        await generator.close()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, default=0)
+    parser.add_argument("--mode", choices=["echo", "synth"], default="echo")
+    parser.add_argument(
+        "--levels",
+        type=lambda value: [int(level) for level in value.split(",")],
+        default=[1, 10, 25, 50, 100, 200],
+        help="comma separated concurrent call counts",
+    )
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds per call")
+    parser.add_argument("--max-p99-ms", type=float, default=100.0)
+    parser.add_argument("--max-loss-percent", type=float, default=1.0)
+    parser.add_argument("--max-cpu-percent", type=float, default=90.0)
+    parser.add_argument("--output", help="results file (default benchmarks/results/)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    parser.add_argument("--verbose", action="store_true", help="show server logs")
+    args = parser.parse_args()
+
+    default_environment()
+    if args.serve:
+        serve(args.port, args.mode)
+        return
+
+    port = args.port or free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "benchmarks.media_stream_load", "--serve"]
+        + ["--port", str(port), "--mode", args.mode],
+        stdout=None if args.verbose else subprocess.DEVNULL,
+        stderr=None if args.verbose else subprocess.DEVNULL,
+    )
+    try:
+        results = asyncio.run(run(args, port))
+    finally:
+        server.terminate()
+        server.wait()
+
+    output = args.output or os.path.join(
+        RESULTS_DIR,
+        f"media_stream_load-{datetime.datetime.now():%Y%m%dT%H%M%S}.json",
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"max sustainable calls per worker: {results['max_sustainable_calls']}")
+    print(f"results written to {output}")
+    if args.compare:
+        compare(args.compare, results)
+
+
+if __name__ == "__main__":
+    main()
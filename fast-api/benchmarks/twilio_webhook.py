@@ -0,0 +1,136 @@
+"""
+Per-request cost of parsing and authenticating a Twilio webhook.
+
+Compares `await request.form()` plus the field checks the routes used to do with
+`read_webhook_params` and `IncomingCallWebhook.from_params`, and the twilio
+library's `RequestValidator` with the cached-key `TwilioSignatureValidator`, on a
+realistic incoming-call form post.
+
+    python -m benchmarks.twilio_webhook
+"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable
+from urllib.parse import urlencode
+
+from starlette.requests import Request
+from twilio.request_validator import RequestValidator
+
+from app.utils.twilio_webhook import (
+    IncomingCallWebhook,
+    TwilioSignatureValidator,
+    read_webhook_params,
+)
+
+ITERATIONS = 20_000
+AUTH_TOKEN = "12345678901234567890123456789012"
+URL = "https://example.ngrok-free.app/incoming-call-eleven"
+PARAMS = {
+    "AccountSid": "AC" + "0" * 32,
+    "ApiVersion": "2010-04-01",
+    "CallSid": "CA" + "1" * 32,
+    "CallStatus": "ringing",
+    "Called": "+15550199",
+    "CalledCity": "",
+    "CalledCountry": "US",
+    "CalledState": "CA",
+    "CalledZip": "",
+    "Caller": "+15550100",
+    "CallerCity": "SAN FRANCISCO",
+    "CallerCountry": "US",
+    "CallerState": "CA",
+    "CallerZip": "94105",
+    "Direction": "inbound",
+    "From": "+15550100",
+    "FromCity": "SAN FRANCISCO",
+    "FromCountry": "US",
+    "FromState": "CA",
+    "FromZip": "94105",
+    "To": "+15550199",
+    "ToCity": "",
+    "ToCountry": "US",
+    "ToState": "CA",
+    "ToZip": "",
+}
+BODY = urlencode(PARAMS).encode("ascii")
+SIGNATURE = RequestValidator(AUTH_TOKEN).compute_signature(URL, PARAMS)
+
+
+def make_request() -> Request:
+    scope = {
+        "type": "http",
+        "method": "POST",
+        "scheme": "https",
+        "server": ("example.ngrok-free.app", 443),
+        "path": "/incoming-call-eleven",
+        "query_string": b"",
+        "headers": [
+            (b"host", b"example.ngrok-free.app"),
+            (b"content-type", b"application/x-www-form-urlencoded"),
+            (b"content-length", str(len(BODY)).encode("ascii")),
+            (b"x-twilio-signature", SIGNATURE.encode("ascii")),
+        ],
+    }
+
+    async def receive() -> dict[str, Any]:
+        return {"type": "http.request", "body": BODY, "more_body": False}
+
+    return Request(scope, receive)
+
+
+async def form_baseline() -> None:
+    form_data = await make_request().form()
+    call_sid = form_data.get("CallSid")
+    from_number = form_data.get("From")
+    to_number = form_data.get("To")
+    assert (
+        call_sid
+        and isinstance(call_sid, str)
+        and from_number
+        and isinstance(from_number, str)
+        and to_number
+        and isinstance(to_number, str)
+    )
+
+
+async def form_fast_path() -> None:
+    params = await read_webhook_params(make_request(), validator=None)
+    assert IncomingCallWebhook.from_params(params) is not None
+
+
+async def signed_baseline() -> None:
+    form_data = await make_request().form()
+    assert RequestValidator(AUTH_TOKEN).validate(URL, form_data, SIGNATURE)
+
+
+validator = TwilioSignatureValidator(AUTH_TOKEN)
+
+
+async def signed_fast_path() -> None:
+    params = await read_webhook_params(make_request(), validator=validator)
+    assert IncomingCallWebhook.from_params(params) is not None
+
+
+async def measure(name: str, operation: Callable[[], Awaitable[None]]) -> float:
+    for _ in range(100):
+        await operation()
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        await operation()
+    per_request = (time.perf_counter() - started) / ITERATIONS
+    print(f"{name:>28}: {per_request * 1e6:7.2f} us/request")
+    return per_request
+
+
+async def main() -> None:
+    baseline = await measure("request.form() + checks", form_baseline)
+    fast = await measure("read_webhook_params", form_fast_path)
+    print(f"{'speedup':>28}: {baseline / fast:7.1f}x")
+    baseline = await measure("form + RequestValidator", signed_baseline)
+    fast = await measure("read_webhook_params + HMAC", signed_fast_path)
+    print(f"{'speedup':>28}: {baseline / fast:7.1f}x")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
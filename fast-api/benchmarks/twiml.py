@@ -0,0 +1,43 @@
+"""
+Per-webhook cost of the incoming call TwiML.
+
+Compares building the `VoiceResponse` tree with the twilio library and
+serialising it (the original path) with splicing the call SID into the cached
+per-host template, after checking that both produce the same bytes.
+
+    python -m benchmarks.twiml
+"""
+
+import timeit
+import uuid
+
+from app.utils.twiml import build_media_stream_twiml, render_media_stream_twiml
+
+ITERATIONS = 20_000
+HOST = "example.ngrok-free.app"
+
+
+def main() -> None:
+    call_sids = [f"CA{uuid.uuid4().hex}" for _ in range(ITERATIONS)]
+    for call_sid in call_sids[:1000]:
+        expected = str(build_media_stream_twiml(call_sid, HOST))
+        assert render_media_stream_twiml(call_sid, HOST) == expected
+
+    def library(call_sid: str) -> str:
+        return str(build_media_stream_twiml(call_sid, HOST))
+
+    def template(call_sid: str) -> str:
+        return render_media_stream_twiml(call_sid, HOST)
+
+    results = {}
+    for name, render in (("twilio library", library), ("template", template)):
+        sids = iter(call_sids)
+        seconds = timeit.timeit(lambda: render(next(sids)), number=ITERATIONS)
+        results[name] = seconds / ITERATIONS
+        print(f"{name:>15}: {results[name] * 1e6:7.2f} us/webhook")
+    speedup = results["twilio library"] / results["template"]
+    print(f"{'speedup':>15}: {speedup:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Exports calls for a time window to a file, e.g. for billing reconciliation.
+
+    python export_calls.py --format csv --created-after 2024-01-01 \
+        --created-before 2024-02-01 --gzip -o calls-2024-01.csv.gz
+
+Uses the same streaming export as `GET /calls/export`, so memory stays flat
+however many calls are in the window.
+"""
+
+from app.enums import ExportFormat
+from app.services.call_export import export_calls, export_filename
+from typing import Optional
+import argparse
+import asyncio
+import datetime
+
+
+async def export_to_file(
+    path: str,
+    export_format: ExportFormat,
+    created_after: Optional[datetime.datetime],
+    created_before: Optional[datetime.datetime],
+    compress: bool,
+) -> None:
+    with open(path, "wb") as f:
+        async for chunk in export_calls(
+            export_format,
+            created_after=created_after,
+            created_before=created_before,
+            compress=compress,
+        ):
+            f.write(chunk)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export calls as NDJSON or CSV.")
+    parser.add_argument(
+        "--format",
+        choices=[export_format.value for export_format in ExportFormat],
+        default=ExportFormat.NDJSON.value,
+    )
+    parser.add_argument("--created-after", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--created-before", type=datetime.datetime.fromisoformat)
+    parser.add_argument("--gzip", action="store_true", help="gzip the output")
+    parser.add_argument("-o", "--output", help="output path (default calls.<format>)")
+    args = parser.parse_args()
+
+    export_format = ExportFormat(args.format)
+    path = args.output or export_filename(export_format, args.gzip)
+    asyncio.run(
+        export_to_file(
+            path, export_format, args.created_after, args.created_before, args.gzip
+        )
+    )
+    print(f"Exported calls to {path}")
+
+
+if __name__ == "__main__":
+    main()
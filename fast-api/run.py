@@ -1,6 +1,53 @@
 from app.main import app
+from app.services.conversation_registry import CONVERSATION_REGISTRY
+from app.utils.env import env_bool, env_float, env_int
+import logging
+import os
 import uvicorn
 
+logger = logging.getLogger(__name__)
+
+# development runs a single auto-reloading process, production a tuned multi-worker server.
+SERVER_MODE = os.environ.get("SERVER_MODE", "development")
+HOST = os.environ.get("HOST", "0.0.0.0")
+PORT = env_int("PORT", 8000)
+
+
+def production_workers() -> int:
+    workers = env_int("WEB_CONCURRENCY", os.cpu_count() or 1)
+    if workers > 1 and CONVERSATION_REGISTRY == "memory":
+        # Live conversations are per-process state; without a shared registry the
+        # stream-stopped callback may land on a worker that cannot end the session.
+        logger.warning(
+            "CONVERSATION_REGISTRY=memory only supports one worker, "
+            "set CONVERSATION_REGISTRY=postgres to run more. Starting 1 worker."
+        )
+        return 1
+    return workers
+
+
+def run_production() -> None:
+    uvicorn.run(
+        "app.main:app",
+        host=HOST,
+        port=PORT,
+        workers=production_workers(),
+        loop="uvloop",
+        http="httptools",
+        ws="websockets",
+        ws_max_size=env_int("WS_MAX_SIZE", 1024 * 1024),
+        ws_ping_interval=env_float("WS_PING_INTERVAL", 20.0),
+        ws_ping_timeout=env_float("WS_PING_TIMEOUT", 20.0),
+        timeout_keep_alive=env_int("TIMEOUT_KEEP_ALIVE", 5),
+        timeout_graceful_shutdown=env_int("TIMEOUT_GRACEFUL_SHUTDOWN", 30),
+        backlog=env_int("BACKLOG", 2048),
+        access_log=env_bool("ACCESS_LOG", False),
+    )
+
+
 # Replit is able to pull in modules when our run script is run from the root.
 if __name__ == "__main__":
-    uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
+    if SERVER_MODE == "production":
+        run_production()
+    else:
+        uvicorn.run("app.main:app", host=HOST, port=PORT, reload=True)
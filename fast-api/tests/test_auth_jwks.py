@@ -0,0 +1,108 @@
+import asyncio
+import json
+import time
+from pathlib import Path
+from typing import Any
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from app.middleware.auth_middleware import AuthError, AuthMiddleware, VerifiedTokenCache
+from app.utils.jwks import JWKSKeySet
+
+JWT_SECRET = "test-secret"
+AUDIENCE = "authenticated"
+
+
+async def _app(scope: Any, receive: Any, send: Any) -> None:
+    pass
+
+
+def _signing_key() -> rsa.RSAPrivateKey:
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+def _write_jwks(path: Path, keys: dict[str, rsa.RSAPrivateKey]) -> None:
+    """Writes the public halves of `keys`, by kid, as a JWKS document."""
+    jwks = []
+    for kid, key in keys.items():
+        jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(key.public_key()))
+        jwks.append({**jwk, "kid": kid, "alg": "RS256", "use": "sig"})
+    path.write_text(json.dumps({"keys": jwks}))
+
+
+def _token(key: Any, algorithm: str, kid: str | None = None) -> str:
+    claims = {"sub": "user-1", "aud": AUDIENCE, "exp": int(time.time()) + 60}
+    headers = {"kid": kid} if kid else None
+    return jwt.encode(claims, key, algorithm=algorithm, headers=headers)
+
+
+@pytest.fixture
+def jwks_path(tmp_path: Path) -> Path:
+    return tmp_path / "jwks.json"
+
+
+@pytest.fixture
+def middleware(
+    monkeypatch: pytest.MonkeyPatch, jwks_path: Path
+) -> tuple[AuthMiddleware, rsa.RSAPrivateKey]:
+    monkeypatch.setenv("JWT_SECRET", JWT_SECRET)
+    key = _signing_key()
+    _write_jwks(jwks_path, {"key-1": key})
+    key_set = JWKSKeySet(str(jwks_path), min_refresh_interval=0.0)
+    asyncio.run(key_set.refresh())
+    return AuthMiddleware(_app, cache=VerifiedTokenCache(), key_set=key_set), key
+
+
+def test_rs256_token_from_jwks_is_accepted(
+    middleware: tuple[AuthMiddleware, rsa.RSAPrivateKey],
+) -> None:
+    auth, key = middleware
+
+    claims = auth.authenticate(f"Bearer {_token(key, 'RS256', kid='key-1')}")
+
+    assert claims["sub"] == "user-1"
+
+
+def test_unknown_kid_is_rejected_and_refreshes_in_background(
+    middleware: tuple[AuthMiddleware, rsa.RSAPrivateKey], jwks_path: Path
+) -> None:
+    auth, _ = middleware
+    assert auth.key_set is not None
+    key_set = auth.key_set
+    rotated = _signing_key()
+    token = _token(rotated, "RS256", kid="key-2")
+    loads = 0
+    load = key_set._load
+
+    async def counting_load() -> dict[str, Any]:
+        nonlocal loads
+        loads += 1
+        return await load()
+
+    key_set._load = counting_load  # type: ignore[method-assign]
+
+    async def scenario() -> None:
+        with pytest.raises(AuthError, match="Unknown signing key"):
+            auth.authenticate(f"Bearer {token}")
+        # The refresh is only scheduled; the request itself never loads the JWKS.
+        assert loads == 0
+        assert key_set.refresh_task is not None
+
+        _write_jwks(jwks_path, {"key-2": rotated})
+        await key_set.refresh_task
+        assert loads == 1
+
+    asyncio.run(scenario())
+    assert auth.authenticate(f"Bearer {token}")["sub"] == "user-1"
+
+
+def test_hs256_token_is_checked_against_jwt_secret(
+    middleware: tuple[AuthMiddleware, rsa.RSAPrivateKey],
+) -> None:
+    auth, _ = middleware
+
+    assert auth.authenticate(f"Bearer {_token(JWT_SECRET, 'HS256')}")["sub"] == "user-1"
+    with pytest.raises(AuthError, match="Invalid token"):
+        auth.authenticate(f"Bearer {_token('wrong-secret', 'HS256')}")
@@ -0,0 +1,69 @@
+import asyncio
+from typing import Any, List
+
+from app.services.conversation_registry import ConversationRegistry
+from app.services.session_supervisor import SessionSupervisor
+
+
+class FakeConversation:
+    def __init__(self) -> None:
+        self.ended = False
+
+    def end_session(self) -> None:
+        self.ended = True
+
+
+async def _close() -> None:
+    pass
+
+
+def _detached_supervisor(
+    ended: List[tuple[str, bool]],
+) -> tuple[SessionSupervisor, ConversationRegistry]:
+    registry = ConversationRegistry()
+    supervisor = SessionSupervisor(registry, resume_grace=1.0)
+
+    async def end_session(call_sid: str, completed: bool = True) -> None:
+        ended.append((call_sid, completed))
+        registry.pop(call_sid)
+
+    supervisor.end_session_handler = end_session
+    conversation: Any = FakeConversation()
+    registry.register("CA1", conversation)
+    supervisor.track("CA1", _close)
+    assert supervisor.detach("CA1")
+    return supervisor, registry
+
+
+def test_detached_call_claimed_elsewhere_is_not_completed() -> None:
+    ended: List[tuple[str, bool]] = []
+    supervisor, registry = _detached_supervisor(ended)
+
+    async def scenario() -> None:
+        await supervisor.reap()
+        assert ended == []  # Still within the grace window.
+
+        # Twilio reconnected the stream to another worker, which registered it.
+        registry.claimed_elsewhere.add("CA1")
+        await supervisor.reap()
+
+    asyncio.run(scenario())
+    assert ended == [("CA1", False)]
+    assert supervisor.sessions == {}
+    assert supervisor.handed_off == 1
+    assert supervisor.resume_expired == 0
+    assert registry.claimed_elsewhere == set()
+
+
+def test_detached_call_not_resumed_is_completed_after_grace() -> None:
+    ended: List[tuple[str, bool]] = []
+    supervisor, _ = _detached_supervisor(ended)
+    detached_at = supervisor.sessions["CA1"].detached_at
+    assert detached_at is not None
+    supervisor.sessions["CA1"].detached_at = detached_at - 2.0
+
+    asyncio.run(supervisor.reap())
+
+    assert ended == [("CA1", True)]
+    assert supervisor.resume_expired == 1
+    assert supervisor.handed_off == 0
@@ -0,0 +1,80 @@
+import asyncio
+from typing import Any, List
+
+from app.utils.media_codec import MediaEvent, StartEvent, encode_audio
+from app.utils.twilio_audio_interface import FRAME_BYTES, TwilioAudioInterface
+
+FRAME = b"\x7f" * FRAME_BYTES
+
+
+class FakeWebSocket:
+    def __init__(self, fail: bool = False) -> None:
+        self.fail = fail
+        self.sent: List[str] = []
+
+    async def send_text(self, message: str) -> None:
+        if self.fail:
+            raise RuntimeError("Cannot call send once a close message has been sent")
+        self.sent.append(message)
+
+
+async def _wait_for(condition: Any, timeout: float = 2.0) -> None:
+    deadline = asyncio.get_running_loop().time() + timeout
+    while not condition():
+        assert asyncio.get_running_loop().time() < deadline, "timed out"
+        await asyncio.sleep(0.01)
+
+
+def test_failed_send_keeps_the_call_resumable() -> None:
+    async def scenario() -> None:
+        dropped = FakeWebSocket(fail=True)
+        audio_interface = TwilioAudioInterface(
+            dropped,  # type: ignore[arg-type]
+            call_sid="CA1",
+            resumable=True,
+        )
+        heard: List[bytes] = []
+        audio_interface.start(heard.append)
+        await audio_interface.handle_twilio_message(StartEvent(stream_sid="MZ1"))
+
+        # The sender sees the drop before the receive loop does.
+        audio_interface.output(FRAME)
+        await _wait_for(lambda: audio_interface.detached)
+        assert audio_interface.is_running
+        assert audio_interface.input_callback is not None
+
+        # Agent audio produced meanwhile is kept for the resumed stream.
+        audio_interface.output(FRAME * 2)
+        await _wait_for(lambda: audio_interface.resume_buffer_bytes == 2 * FRAME_BYTES)
+
+        reconnected = FakeWebSocket()
+        audio_interface.attach(reconnected)  # type: ignore[arg-type]
+        await audio_interface.handle_twilio_message(StartEvent(stream_sid="MZ2"))
+        await _wait_for(lambda: len(reconnected.sent) == 2)
+        assert all('"MZ2"' in message for message in reconnected.sent)
+
+        # The caller is still heard by the agent.
+        await audio_interface.handle_twilio_message(
+            MediaEvent(payload=encode_audio(FRAME))
+        )
+        assert heard == [FRAME]
+        audio_interface.stop()
+
+    asyncio.run(scenario())
+
+
+def test_failed_send_stops_without_resume() -> None:
+    async def scenario() -> None:
+        audio_interface = TwilioAudioInterface(
+            FakeWebSocket(fail=True),  # type: ignore[arg-type]
+            call_sid="CA2",
+        )
+        audio_interface.start(lambda audio: None)
+        await audio_interface.handle_twilio_message(StartEvent(stream_sid="MZ1"))
+
+        audio_interface.output(FRAME)
+        await _wait_for(lambda: not audio_interface.is_running)
+        assert not audio_interface.detached
+        assert audio_interface.input_callback is None
+
+    asyncio.run(scenario())